@@ -3,12 +3,13 @@ from fastapi import APIRouter, Depends, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.services.contract_services import (
+    handle_contract_components_update,
     handle_contract_creation,
     handle_contract_deletion,
     handle_contract_retrieval,
 )
 from app.db.session import get_async_session
-from app.dto.contract import ContractPayload, ContractResponse
+from app.dto.contract import ContractComponentsPatch, ContractPayload, ContractResponse
 
 router = APIRouter(
     prefix="/contract",
@@ -35,6 +36,20 @@ async def get_contract_endpoint(
     return await handle_contract_retrieval(db, contract_number)
 
 
+@router.patch(
+    "/{contract_number}",
+    response_model=ContractResponse,
+    status_code=status.HTTP_200_OK,
+    responses={409: {"description": "A removed component has an active timeline"}},
+)
+async def update_contract_components_endpoint(
+    contract_number: str,
+    payload: ContractComponentsPatch,
+    db: AsyncSession = Depends(get_async_session),
+) -> ContractResponse:
+    return await handle_contract_components_update(db, contract_number, payload)
+
+
 @router.delete("/{contract_number}", status_code=status.HTTP_200_OK)
 async def delete_contract_endpoint(
     contract_number: str,
@@ -0,0 +1,44 @@
+import re
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from app.config import settings
+from app.core.memory import memory_report
+from app.core.profiling import profile_path
+
+router = APIRouter(
+    prefix="/debug",
+    responses={404: {"description": "Not found"}},
+    tags=["Debug"],
+)
+
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+@router.get("/profiles/{profile_id}", include_in_schema=False)
+async def get_profile_endpoint(profile_id: str) -> FileResponse:
+    """
+    Download a request profile captured with the profiling header.
+    """
+    if not settings.PROFILING_ENABLED or not _PROFILE_ID.match(profile_id):
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    path = profile_path(profile_id)
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    return FileResponse(path, media_type="application/json", filename=path.name)
+
+
+@router.get("/memory", include_in_schema=False)
+async def get_memory_endpoint(
+    top: int = Query(10, ge=1, le=100),
+    diff: bool = False,
+) -> dict:
+    """
+    Process RSS, sizes of in-process structures and, while tracemalloc runs,
+    the top allocation sites. With ``diff``, also what changed since the
+    previous call that asked for a diff.
+    """
+    if not settings.MEMORY_DIAGNOSTICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return await memory_report(top, diff)
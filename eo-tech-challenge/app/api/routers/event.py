@@ -1,12 +1,24 @@
-from fastapi import APIRouter, Depends, status
-from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, WebSocket, status
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app.api.services.event_services import (
+    IDEMPOTENCY_KEY_CONFLICT,
+    handle_event_batch,
     handle_event_creation,
+    handle_history_retrieval,
     handle_timeline_retrieval,
 )
-from app.db.session import get_async_session
-from app.dto.event import ContractTimelineResponse, EventPayload, EventResponse
+from app.api.services.event_stream_services import serve_event_stream
+from app.config import settings
+from app.db.session import get_async_session, get_session_factory
+from app.dto.event import (
+    ContractHistoryResponse,
+    ContractTimelineResponse,
+    EventPayload,
+    EventResponse,
+)
 
 router = APIRouter(
     responses={404: {"description": "Not found"}},
@@ -14,17 +26,66 @@ router = APIRouter(
 )
 
 
-@router.post("/event", response_model=EventResponse, status_code=status.HTTP_200_OK)
+@router.post(
+    "/event",
+    response_model=EventResponse,
+    status_code=status.HTTP_200_OK,
+    responses={409: {"description": "The idempotency key was used for a different event"}},
+)
 async def create_event_endpoint(
     payload: EventPayload,
-    db: AsyncSession = Depends(get_async_session),
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    session_factory: async_sessionmaker[AsyncSession] = Depends(get_session_factory),
 ) -> EventResponse:
     """
     Import a single event into the system.
 
     Validates the event against business rules and returns accepted/rejected status.
+    Retries can be deduplicated with an `Idempotency-Key` header or body field.
+    Returns 409 if the key was already used for an event of another type or date.
+    """
+    if idempotency_key and not payload.idempotency_key:
+        payload = payload.model_copy(update={"idempotency_key": idempotency_key})
+    # Opened only once the payload is valid, so malformed events cost no session
+    async with session_factory() as db:
+        response = await handle_event_creation(db, payload)
+    if response.reason == IDEMPOTENCY_KEY_CONFLICT:
+        raise HTTPException(status_code=409, detail=response.message)
+    return response
+
+
+@router.post(
+    "/event/batch", response_model=list[EventResponse], status_code=status.HTTP_200_OK
+)
+async def create_event_batch_endpoint(
+    payloads: list[EventPayload],
+    session_factory: async_sessionmaker[AsyncSession] = Depends(get_session_factory),
+) -> list[EventResponse]:
+    """
+    Import several events in one request.
+
+    Events are processed in order and get one accepted/rejected status each.
+    A batch with a malformed event, including an unknown type, is refused as a whole.
+    """
+    async with session_factory() as db:
+        return await handle_event_batch(db, payloads)
+
+
+@router.websocket("/ws/events")
+async def event_stream_endpoint(
+    websocket: WebSocket,
+    session_factory: async_sessionmaker[AsyncSession] = Depends(get_session_factory),
+) -> None:
+    """
+    Import a stream of events over a WebSocket.
+
+    Every message is a `POST /event` body with an optional `correlation_id` and
+    gets an acknowledgement `{"correlation_id", "status", "message"}`. Up to
+    WS_INGEST_MAX_IN_FLIGHT events may await their acknowledgement.
     """
-    return await handle_event_creation(db, payload)
+    await serve_event_stream(
+        websocket, session_factory, settings.WS_INGEST_MAX_IN_FLIGHT, settings.WS_INGEST_WORKERS
+    )
 
 
 @router.get(
@@ -34,6 +95,7 @@ async def create_event_endpoint(
 )
 async def get_timeline_endpoint(
     contract_number: str,
+    full_history: bool = Query(False, description="Read archived events instead of their summary"),
     db: AsyncSession = Depends(get_async_session),
 ) -> ContractTimelineResponse:
     """
@@ -42,4 +104,23 @@ async def get_timeline_endpoint(
     Returns start and end dates for each component.
     Returns 404 if contract not found.
     """
-    return await handle_timeline_retrieval(db, contract_number)
+    return await handle_timeline_retrieval(db, contract_number, full_history)
+
+
+@router.get(
+    "/{contract_number}/history",
+    response_model=ContractHistoryResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def get_history_endpoint(
+    contract_number: str,
+    full_history: bool = Query(False, description="Include archived events"),
+    db: AsyncSession = Depends(get_async_session),
+) -> ContractHistoryResponse:
+    """
+    List the events of a contract in created_at order.
+
+    Events of terminated components that were archived are only included with
+    `full_history=true`. Returns 404 if contract not found.
+    """
+    return await handle_history_retrieval(db, contract_number, full_history)
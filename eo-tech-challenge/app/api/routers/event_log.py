@@ -0,0 +1,55 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, status
+from fastapi.responses import StreamingResponse
+
+from app.api.services.event_log_services import (
+    handle_event_log_page,
+    parse_cursor,
+    stream_event_log,
+)
+from app.db.session import get_shard_set
+from app.db.sharding import ShardSet
+from app.dto.event_log import EventLogResponse
+
+router = APIRouter(
+    prefix="/events",
+    tags=["Event log"],
+)
+
+
+@router.get("", response_model=EventLogResponse, status_code=status.HTTP_200_OK)
+async def get_event_log_endpoint(
+    cursor: Optional[str] = Query(None, description="Cursor of the previous page"),
+    limit: int = Query(1000, ge=1, le=10000),
+    contract_number: Optional[str] = None,
+    component: Optional[str] = None,
+    shard_set: ShardSet = Depends(get_shard_set),
+) -> EventLogResponse:
+    """
+    Page through stored events in sequence order, for incremental replication.
+
+    Start without a cursor and pass the returned cursor to get the next page;
+    every page is an index seek, however far into the log it is. Events of
+    terminated components that were archived are no longer part of the log.
+    """
+    return await handle_event_log_page(shard_set, cursor, limit, contract_number, component)
+
+
+@router.get("/stream", status_code=status.HTTP_200_OK)
+async def stream_event_log_endpoint(
+    cursor: Optional[str] = Query(None, description="Resume after this cursor"),
+    contract_number: Optional[str] = None,
+    component: Optional[str] = None,
+    shard_set: ShardSet = Depends(get_shard_set),
+) -> StreamingResponse:
+    """
+    Download the event log after `cursor` as newline-delimited JSON.
+
+    The last line holds the cursor to continue from on the next sync.
+    """
+    positions = parse_cursor(cursor, shard_set.count)
+    return StreamingResponse(
+        stream_event_log(shard_set, positions, contract_number, component),
+        media_type="application/x-ndjson",
+    )
@@ -0,0 +1,50 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, Query, status
+from fastapi.responses import StreamingResponse
+
+from app.api.services.feed_services import handle_change_poll, stream_changes
+from app.core.change_feed import change_feed
+from app.dto.feed import ChangeFeedResponse
+
+router = APIRouter(
+    prefix="/changes",
+    tags=["Changes"],
+)
+
+
+@router.get("", response_model=ChangeFeedResponse, status_code=status.HTTP_200_OK)
+async def poll_changes_endpoint(
+    cursor: Optional[str] = Query(None, description="Cursor of the previous response"),
+    timeout: float = Query(25.0, ge=0, description="Seconds to wait for a change"),
+    contract_number: Optional[str] = None,
+    component: Optional[str] = None,
+) -> ChangeFeedResponse:
+    """
+    Long-poll for timeline changes.
+
+    Without a cursor, only changes from now on are returned. When `reset` is
+    true the cursor could not be resumed (too old, or the server restarted):
+    reload the timelines you follow and continue with the returned cursor.
+    """
+    return await handle_change_poll(change_feed, cursor, timeout, contract_number, component)
+
+
+@router.get("/stream", status_code=status.HTTP_200_OK)
+async def stream_changes_endpoint(
+    cursor: Optional[str] = Query(None, description="Resume after this cursor"),
+    contract_number: Optional[str] = None,
+    component: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None),
+) -> StreamingResponse:
+    """
+    Stream timeline changes as Server-Sent Events.
+
+    Each `timeline` event carries the new start and end of one component. On
+    reconnect, `Last-Event-ID` (or `cursor`) resumes the stream.
+    """
+    return StreamingResponse(
+        stream_changes(change_feed, last_event_id or cursor, contract_number, component),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
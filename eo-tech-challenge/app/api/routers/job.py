@@ -0,0 +1,65 @@
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api.services.job_services import (
+    handle_job_progress,
+    handle_job_upload,
+    stream_job_results,
+)
+from app.db.crud.job import get_job
+from app.db.session import get_async_session, get_session_factory
+from app.dto.job import JobCreatedResponse, JobProgressResponse
+
+router = APIRouter(
+    prefix="/jobs",
+    responses={404: {"description": "Not found"}},
+    tags=["Jobs"],
+)
+
+
+@router.post(
+    "/{kind}", response_model=JobCreatedResponse, status_code=status.HTTP_202_ACCEPTED
+)
+async def create_job_endpoint(
+    kind: str,
+    request: Request,
+    db: AsyncSession = Depends(get_async_session),
+    session_factory: async_sessionmaker[AsyncSession] = Depends(get_session_factory),
+) -> JobCreatedResponse:
+    """
+    Upload a file of events or contracts (`kind` is `events` or `contracts`).
+
+    The body is newline-delimited JSON, one object per line, in the same shape
+    as `POST /event` or `POST /contract/`. Returns immediately with the job id.
+    """
+    return await handle_job_upload(request, kind, db, session_factory)
+
+
+@router.get("/{job_id}", response_model=JobProgressResponse, status_code=status.HTTP_200_OK)
+async def get_job_endpoint(
+    job_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_session),
+) -> JobProgressResponse:
+    """
+    Report progress: processed/accepted/rejected counts, throughput and ETA.
+    """
+    return await handle_job_progress(db, job_id)
+
+
+@router.get("/{job_id}/results", status_code=status.HTTP_200_OK)
+async def get_job_results_endpoint(
+    job_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_session),
+    session_factory: async_sessionmaker[AsyncSession] = Depends(get_session_factory),
+) -> StreamingResponse:
+    """
+    Download the per-line results of a job as newline-delimited JSON.
+    """
+    if await get_job(db, job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return StreamingResponse(
+        stream_job_results(session_factory, job_id), media_type="application/x-ndjson"
+    )
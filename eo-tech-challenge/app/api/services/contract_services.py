@@ -1,48 +1,153 @@
-from typing import Dict, Optional
+from typing import Dict, Optional, Union
 
 from loguru import logger
+from sqlalchemy import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
 
-from app.db.crud.contract import create_contract, delete_contract, get_contract
+from app.api.services.event_services import (
+    ALLOWED_COMPONENTS,
+    COMPONENT_TO_EVENT_PREFIX,
+    build_timeline,
+    merge_by_created_at,
+    summary_events,
+)
+from app.archive.store import ArchivedEvent
+from app.core.change_feed import change_feed
+from app.core.logging import info_sampled
+from app.core.tracing import traced
+from app.db.crud.contract import create_contract, delete_contract, get_contract, update_contract_components
+from app.db.crud.event import get_latest_events
 from app.db.models.contract import Contract
-from app.dto.contract import ContractPayload, ContractResponse
+from app.dto.contract import ContractComponentsPatch, ContractPayload, ContractResponse
+from app.state.contract_filter import contract_filter
+from app.state.store import state_store
 
 
+@traced()
 async def handle_contract_creation(
     db: AsyncSession, payload: ContractPayload
 ) -> ContractResponse:
     """
     Handles the creation of a new contract.
     """
-    logger.info(f"Handling contract creation for {payload.contract_number}")
-    result: Contract = await create_contract(db, payload)
+    with state_store.writing():
+        result: Contract = await create_contract(db, payload)
+        state_store.put_contract(result.contract_number, result.components)
+    contract_filter.add(result.contract_number)
     result_contract: ContractResponse = ContractResponse.model_validate(result)
-    logger.info(f"Successfully added a new contract with number {result_contract.contract_number}")
+    logger.info("Contract created", contract_number=result_contract.contract_number)
     return result_contract
 
 
+@traced()
 async def handle_contract_deletion(db: AsyncSession, contract_number: str) -> Dict[str, str]:
     """
     Handles deletion of a single contract by its contract_number.
     """
-    logger.info(f"Handling contract deletion for {contract_number}")
+    if contract_filter.definitely_absent(contract_number):
+        raise HTTPException(status_code=404, detail=f"Contract {contract_number} not found")
     contract = await get_contract(db, contract_number)
     if contract is None:
+        contract_filter.record_false_positive()
         raise HTTPException(status_code=404, detail=f"Contract {contract_number} not found")
-    await delete_contract(db, contract_number)
-    logger.info(f"Successfully deleted contract with number {contract_number}")
+    with state_store.writing():
+        deleted = await delete_contract(db, contract_number)
+        state_store.discard(contract_number)
+    if deleted:
+        contract_filter.remove(contract_number)
+    logger.info("Contract deleted", contract_number=contract_number)
     return {"detail": f"Contract {contract_number} deleted successfully"}
 
 
+@traced()
 async def handle_contract_retrieval(db: AsyncSession, contract_number: str) -> ContractResponse:
     """
     Handles retrieval of a single contract by its contract_number.
     """
-    logger.info(f"Handling contract retrieval for {contract_number}")
+    if contract_filter.definitely_absent(contract_number):
+        raise HTTPException(status_code=404, detail=f"Contract {contract_number} not found")
     result: Optional[Contract] = await get_contract(db, contract_number)
     if result is None:
+        contract_filter.record_false_positive()
         raise HTTPException(status_code=404, detail=f"Contract {contract_number} not found")
     result_contract = ContractResponse.model_validate(result)
-    logger.info(f"Successfully retrieved contract with number {result_contract.contract_number}")
+    info_sampled("Contract retrieved", contract_number=result_contract.contract_number)
     return result_contract
+
+
+async def _latest_component_events(
+    db: AsyncSession, contract: Contract, component: str
+) -> list[Union[ArchivedEvent, Row]]:
+    """Latest start and end of one component, hot or archived, by created_at."""
+    prefix = COMPONENT_TO_EVENT_PREFIX[component]
+    hot = await get_latest_events(db, contract.contract_number, [f"{prefix}_start", f"{prefix}_end"])
+    archived = [event for event in summary_events(contract) if event.component_name == component]
+    return merge_by_created_at(archived, hot)
+
+
+@traced()
+async def handle_contract_components_update(
+    db: AsyncSession, contract_number: str, payload: ContractComponentsPatch
+) -> ContractResponse:
+    """
+    Adds and removes components of a contract.
+
+    Only the changed components are looked at, from the state store or from
+    their latest start and end events, never from the contract's history. A
+    component with an active timeline (started, not ended) cannot be removed.
+    """
+    unsupported = sorted(set(payload.add) - set(ALLOWED_COMPONENTS))
+    if unsupported:
+        raise HTTPException(status_code=422, detail=f"Unsupported components: {', '.join(unsupported)}")
+    conflicting = sorted(set(payload.add) & set(payload.remove))
+    if conflicting:
+        raise HTTPException(
+            status_code=422, detail=f"Components both added and removed: {', '.join(conflicting)}"
+        )
+    if contract_filter.definitely_absent(contract_number):
+        raise HTTPException(status_code=404, detail=f"Contract {contract_number} not found")
+    contract = await get_contract(db, contract_number)
+    if contract is None:
+        contract_filter.record_false_positive()
+        raise HTTPException(status_code=404, detail=f"Contract {contract_number} not found")
+
+    added = [component for component in dict.fromkeys(payload.add) if component not in contract.components]
+    removed = [component for component in dict.fromkeys(payload.remove) if component in contract.components]
+    if not added and not removed:
+        return ContractResponse.model_validate(contract)
+
+    # Timeline of every changed component, and the events the store needs for added ones
+    state = state_store.get(contract_number)
+    timelines = {}
+    latest_events = []
+    for component in (*added, *removed):
+        if state is not None and component in state.components:
+            current = state.component(component)
+            timelines[component] = (current.start, current.end)
+            continue
+        events = await _latest_component_events(db, contract, component)
+        timeline = build_timeline(events).get(component, {"start": None, "end": None})
+        timelines[component] = (timeline["start"], timeline["end"])
+        latest_events.extend((component, event.type, event.date, event.created_at) for event in events)
+
+    for component in removed:
+        start, end = timelines[component]
+        if start is not None and end is None:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Component '{component}' of contract {contract_number} has an active timeline.",
+            )
+
+    components = [component for component in contract.components if component not in removed] + added
+    with state_store.writing():
+        contract = await update_contract_components(db, contract, components)
+        state_store.set_components(contract_number, components, latest_events)
+
+    # Followers of the contract's timelines see components come and go
+    for component in removed:
+        change_feed.publish(contract_number, component, None, None, "component_removed")
+    for component in added:
+        change_feed.publish(contract_number, component, *timelines[component], "component_added")
+    logger.info("Contract components updated", contract_number=contract_number, added=added, removed=removed)
+    return ContractResponse.model_validate(contract)
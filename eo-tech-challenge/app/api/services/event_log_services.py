@@ -0,0 +1,136 @@
+import asyncio
+import json
+from typing import AsyncIterator, NamedTuple, Optional
+
+from fastapi import HTTPException, status
+
+from app.db.crud.event import get_events_after
+from app.db.models.event import Event
+from app.db.sharding import ShardSet
+from app.dto.event_log import EventLogEntry, EventLogResponse
+
+# Events per page of GET /events/stream
+STREAM_PAGE_SIZE = 1000
+
+
+class EventLogPage(NamedTuple):
+    events: list[Event]
+    # Last sequence read per shard
+    positions: list[int]
+    has_more: bool
+
+
+def parse_cursor(cursor: Optional[str], shard_count: int) -> list[int]:
+    """
+    A cursor is the last sequence read on every shard, joined with dots.
+
+    Sequences are only ordered within one database, so each shard keeps its
+    own position; with a single database the cursor is a plain number.
+    """
+    if not cursor:
+        return [0] * shard_count
+    try:
+        positions = [int(part) for part in cursor.split(".")]
+    except ValueError:
+        positions = []
+    if len(positions) != shard_count or any(position < 0 for position in positions):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor, start again without one.",
+        )
+    return positions
+
+
+def format_cursor(positions: list[int]) -> str:
+    return ".".join(str(position) for position in positions)
+
+
+async def read_event_log(
+    shard_set: ShardSet,
+    positions: list[int],
+    limit: int,
+    contract_number: Optional[str] = None,
+    component_name: Optional[str] = None,
+) -> EventLogPage:
+    """
+    Read the next ``limit`` events after ``positions``.
+
+    Every shard is asked for one row more than the page holds, which tells
+    whether anything is left without a count query. Pages interleave the
+    shards by sequence.
+    """
+    shards = (
+        [shard_set.shard_for(contract_number)]
+        if contract_number is not None
+        else list(range(shard_set.count))
+    )
+
+    async def read(shard: int) -> list[Event]:
+        return await shard_set.run_on(
+            shard,
+            lambda db: get_events_after(
+                db, positions[shard], limit + 1, contract_number, component_name
+            ),
+        )
+
+    pages = await asyncio.gather(*(read(shard) for shard in shards))
+    merged = sorted(
+        ((event, shard) for shard, events in zip(shards, pages) for event in events),
+        key=lambda item: (item[0].sequence, item[1]),
+    )
+    taken = merged[:limit]
+    new_positions = list(positions)
+    for event, shard in taken:
+        new_positions[shard] = event.sequence
+    return EventLogPage([event for event, _ in taken], new_positions, len(merged) > limit)
+
+
+def _entry(event: Event) -> EventLogEntry:
+    return EventLogEntry(
+        id=str(event.id),
+        sequence=event.sequence,
+        contract_number=event.contract_number,
+        component_name=event.component_name,
+        type=event.type,
+        date=event.date,
+        created_at=event.created_at,
+    )
+
+
+async def handle_event_log_page(
+    shard_set: ShardSet,
+    cursor: Optional[str],
+    limit: int,
+    contract_number: Optional[str],
+    component_name: Optional[str],
+) -> EventLogResponse:
+    positions = parse_cursor(cursor, shard_set.count)
+    page = await read_event_log(shard_set, positions, limit, contract_number, component_name)
+    return EventLogResponse(
+        events=[_entry(event) for event in page.events],
+        cursor=format_cursor(page.positions),
+        has_more=page.has_more,
+    )
+
+
+async def stream_event_log(
+    shard_set: ShardSet,
+    positions: list[int],
+    contract_number: Optional[str],
+    component_name: Optional[str],
+) -> AsyncIterator[bytes]:
+    """
+    Yield the event log after ``positions`` as NDJSON until it is exhausted.
+
+    The last line is ``{"cursor": ...}`` to resume from on the next sync.
+    """
+    while True:
+        page = await read_event_log(
+            shard_set, positions, STREAM_PAGE_SIZE, contract_number, component_name
+        )
+        positions = page.positions
+        if page.events:
+            yield "".join(_entry(event).model_dump_json() + "\n" for event in page.events).encode()
+        if not page.has_more:
+            break
+    yield (json.dumps({"cursor": format_cursor(positions)}) + "\n").encode()
@@ -1,18 +1,41 @@
-from datetime import date
+import asyncio
+import hashlib
+import time
+from datetime import date, datetime
+from typing import Any, Sequence, get_args
 
 from fastapi import HTTPException
 from loguru import logger
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.archive.store import ArchivedEvent, read_events
+from app.config import settings
+from app.core.change_feed import change_feed
+from app.core.logging import info_sampled
+from app.core.metrics import EVENTS_TOTAL, HISTORY_LOADS_OVERSIZED
+from app.core.tracing import traced
 from app.db.crud.contract import get_contract
-from app.db.crud.event import create_event, get_events_for_contract
+from app.db.crud.event import (
+    create_event,
+    get_archived_payload_digest,
+    get_events_for_contract,
+    get_payload_digest,
+    get_recent_events_for_contract,
+)
+from app.db.models.contract import Contract
 from app.db.models.event import Event
 from app.dto.event import (
     ComponentTimeline,
+    ContractHistoryResponse,
     ContractTimelineResponse,
     EventPayload,
+    EventRecord,
     EventResponse,
+    EventType,
 )
+from app.state.contract_filter import contract_filter
+from app.state.store import ContractState, micros, state_store
 
 # Allowed components
 ALLOWED_COMPONENTS = [
@@ -21,15 +44,8 @@ ALLOWED_COMPONENTS = [
     "heatpump_optimization",
 ]
 
-# Supported event types
-VALID_EVENT_TYPES = [
-    "supply_energy_start",
-    "supply_energy_end",
-    "battery_optimization_start",
-    "battery_optimization_end",
-    "heatpump_optimization_start",
-    "heatpump_optimization_end",
-]
+# Supported event types, enforced by EventPayload
+VALID_EVENT_TYPES = list(get_args(EventType))
 
 # Mapping from event type prefix to component name
 EVENT_TYPE_TO_COMPONENT = {
@@ -38,6 +54,11 @@ EVENT_TYPE_TO_COMPONENT = {
     "heatpump_optimization": "heatpump_optimization",
 }
 
+COMPONENT_TO_EVENT_PREFIX = {component: prefix for prefix, component in EVENT_TYPE_TO_COMPONENT.items()}
+
+# Rejection reason of an idempotency key reused for a different event
+IDEMPOTENCY_KEY_CONFLICT = "idempotency_key_conflict"
+
 
 def get_component_name(event_type: str) -> str | None:
     """
@@ -60,7 +81,73 @@ def get_component_name(event_type: str) -> str | None:
     return None
 
 
-def build_timeline(events: list[Event]) -> dict[str, dict[str, date | None]]:
+@traced()
+def idempotency_key(payload: EventPayload) -> str:
+    """
+    Return the client-supplied idempotency key, or derive one from the event.
+
+    Derived keys hash (contract_number, type, date, created_at), so a producer
+    retrying the very same event always maps to the same key.
+    """
+    if payload.idempotency_key:
+        return payload.idempotency_key
+    raw = "|".join(
+        (
+            payload.contract_number,
+            payload.type,
+            payload.date.isoformat(),
+            payload.created_at.isoformat(),
+        )
+    )
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def payload_digest(event_type: str, day: date) -> str:
+    """
+    Digest of the event an idempotency key was first used for.
+
+    Covers type and date; created_at is left out, producers may re-stamp it
+    when they retry.
+    """
+    return hashlib.blake2b(f"{event_type}|{day.isoformat()}".encode(), digest_size=8).hexdigest()
+
+
+def summary_events(contract: Contract) -> list[ArchivedEvent]:
+    """
+    Stand-in events for a contract's archive summary.
+
+    Per archived component, the latest start and the latest end are all that
+    build_timeline needs from the archived events.
+    """
+    events = []
+    for component, summary in (contract.archive_summary or {}).items():
+        prefix = COMPONENT_TO_EVENT_PREFIX[component]
+        for action in ("start", "end"):
+            if summary.get(action) is not None:
+                events.append(
+                    ArchivedEvent(
+                        id=None,
+                        contract_number=contract.contract_number,
+                        component_name=component,
+                        type=f"{prefix}_{action}",
+                        date=date.fromisoformat(summary[action]),
+                        created_at=datetime.fromisoformat(summary[f"{action}_at"]),
+                    )
+                )
+    return events
+
+
+def merge_by_created_at(
+    archived: Sequence[ArchivedEvent], events: Sequence[Event]
+) -> list[Event | ArchivedEvent]:
+    """Interleave archived and hot events; hot events win created_at ties."""
+    if not archived:
+        return list(events)
+    return sorted([*archived, *events], key=lambda event: event.created_at)
+
+
+@traced()
+def build_timeline(events: Sequence[Event | ArchivedEvent]) -> dict[str, dict[str, date | None]]:
     """
     Build component timeline from events.
     Events must be sorted by created_at (ascending order).
@@ -94,6 +181,172 @@ def build_timeline(events: list[Event]) -> dict[str, dict[str, date | None]]:
     return timeline
 
 
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 3)
+
+
+def _duplicate(payload: EventPayload, started: float) -> EventResponse:
+    """Answer a retried event that was already accepted."""
+    EVENTS_TOTAL.inc(payload.type, "duplicate", "")
+    info_sampled(
+        "Duplicate event",
+        contract_number=payload.contract_number,
+        event_type=payload.type,
+        verdict="accepted",
+        latency_ms=_elapsed_ms(started),
+    )
+    return EventResponse(status="accepted", message="Event processed successfully.")
+
+
+def _retried(payload: EventPayload, key: str, stored_digest: str, started: float) -> EventResponse:
+    """Answer an event whose idempotency key is already stored, with ``stored_digest``."""
+    if stored_digest and stored_digest != payload_digest(payload.type, payload.date):
+        return _reject(
+            payload,
+            IDEMPOTENCY_KEY_CONFLICT,
+            f"Idempotency key '{key}' was already used for a different event.",
+            started,
+        )
+    return _duplicate(payload, started)
+
+
+def _superseded(payload: EventPayload, history: Sequence[Event | ArchivedEvent]) -> bool:
+    """Whether a stored event of the same type is newer than ``payload``."""
+    # The timeline is last-write-wins by created_at, an event older than the
+    # latest one of the same type leaves it unchanged
+    created_at = payload.created_at.replace(tzinfo=None)
+    return any(
+        event.type == payload.type and event.created_at.replace(tzinfo=None) > created_at
+        for event in history
+    )
+
+
+def _publish_change(
+    payload: EventPayload,
+    component_name: str,
+    component_state: dict[str, date | None],
+    superseded: bool,
+) -> None:
+    """Publish the component's timeline after an accepted event, if it changed."""
+    if superseded:
+        return
+    action = "start" if payload.type.endswith("_start") else "end"
+    new_state = {**component_state, action: payload.date}
+    if new_state != component_state:
+        change_feed.publish(
+            payload.contract_number,
+            component_name,
+            new_state["start"],
+            new_state["end"],
+            payload.type,
+        )
+
+
+def rule_violation(
+    event_type: str, event_date: date, current_start: date | None, current_end: date | None
+) -> tuple[str, str] | None:
+    """The (reason, message) of the first timeline rule the event breaks, if any."""
+    if event_type.endswith("_start"):
+        # Rule: Component cannot be restarted once terminated
+        # A component is terminated if it has both start and end dates
+        if current_start and current_end:
+            return "restart_after_termination", "Component cannot be restarted after termination."
+
+        # Rule: Start event cannot come after end event
+        if current_end and event_date > current_end:
+            return "start_after_end", "Start event cannot occur after end event."
+    else:
+        # Rule: End event requires a start event first
+        if not current_start:
+            return "end_without_start", "End event requires a start event first."
+
+        # Rule: End event cannot come before start event
+        if event_date < current_start:
+            return "end_before_start", "End event cannot occur before start event."
+    return None
+
+
+def _reject(
+    payload: EventPayload, reason: str, message: str, started: float
+) -> EventResponse:
+    """Log and count a rejected event, then build the response."""
+    EVENTS_TOTAL.inc(payload.type, "rejected", reason)
+    logger.warning(
+        "Event rejected",
+        contract_number=payload.contract_number,
+        event_type=payload.type,
+        verdict="rejected",
+        reason=reason,
+        latency_ms=_elapsed_ms(started),
+    )
+    return EventResponse(status="rejected", message=message, reason=reason)
+
+
+def invalid_type_rejection(error: dict[str, Any], contract_number: Any) -> EventResponse | None:
+    """Rejection for a payload refused for its event type, None for other validation errors."""
+    if tuple(error.get("loc", ()))[-1:] != ("type",) or error.get("type") != "literal_error":
+        return None
+    event_type = error.get("input")
+    # Unknown types are client input, keep them out of the metric labels
+    EVENTS_TOTAL.inc("invalid", "rejected", "invalid_type")
+    logger.warning(
+        "Event rejected",
+        contract_number=contract_number,
+        event_type=event_type,
+        verdict="rejected",
+        reason="invalid_type",
+    )
+    return EventResponse(status="rejected", message=f"Invalid event type: {event_type}")
+
+
+def validation_rejection(error: dict[str, Any], contract_number: Any = None) -> EventResponse:
+    """
+    The rejection of a payload refused by EventPayload, from its first error.
+
+    Shared by POST /event (see validation_exception_handler) and the WebSocket
+    ingest channel.
+    """
+    rejection = invalid_type_rejection(error, contract_number)
+    if rejection is not None:
+        return rejection
+
+    field = error.get("loc", [])[-1] if error.get("loc") else "unknown"
+    error_type = error.get("type", "")
+    raw_msg = error.get("msg", "Validation error")
+
+    # Create user-friendly messages based on field and error type
+    if field == "date":
+        if "required" in error_type or "missing" in error_type:
+            message = "Date field is required."
+        elif "too short" in raw_msg.lower():
+            message = "Invalid date format. Expected format: YYYY-MM-DD"
+        elif "separator" in raw_msg.lower():
+            message = "Invalid date format. Expected format: YYYY-MM-DD (use dashes, not slashes)"
+        elif "outside expected range" in raw_msg.lower():
+            message = "Invalid date. Day value is outside expected range."
+        else:
+            message = f"Invalid date format. {raw_msg}"
+    elif field == "type":
+        if "required" in error_type or "missing" in error_type:
+            message = "Event type is required."
+        else:
+            message = "Invalid event type format."
+    elif field == "contract_number":
+        if "required" in error_type or "missing" in error_type:
+            message = "Contract number is required."
+        else:
+            message = "Invalid contract number format."
+    elif field == "created_at":
+        if "required" in error_type or "missing" in error_type:
+            message = "Created at timestamp is required."
+        else:
+            message = "Invalid created_at format. Expected ISO datetime format."
+    else:
+        message = f"Invalid {field}: {raw_msg}"
+    return EventResponse(status="rejected", message=message)
+
+
+@traced()
 async def handle_event_creation(
     db: AsyncSession, payload: EventPayload
 ) -> EventResponse:
@@ -102,141 +355,269 @@ async def handle_event_creation(
 
     Business Rules:
     1. Contract must exist
-    2. Event type must be valid
+    2. Event type must be valid (checked by EventPayload)
     3. End event cannot come before start event
     4. Start event cannot come after end event
     5. End event requires a start event first
-    """
-    logger.info(
-        f"Processing event: {payload.type} for contract {payload.contract_number}"
-    )
 
-    # 1. Validate event type
-    if payload.type not in VALID_EVENT_TYPES:
-        logger.warning(f"Invalid event type: {payload.type}")
-        return EventResponse(
-            status="rejected", message=f"Invalid event type: {payload.type}"
-        )
+    An event whose idempotency key is already stored for the contract was
+    accepted before; it is answered from the unique index without being
+    validated or written again, unless its type or date differ from the
+    stored event's, which is rejected as a reuse of the key. Rejected events
+    leave nothing behind, so their retries are validated again. With the
+    state store enabled, the contract and its timeline come from memory
+    instead of the database.
+    """
+    started = time.perf_counter()
 
-    # 2. Validate component (extract and check if allowed)
+    # 1. The event type was validated with the payload
+    # 2. Extract the component and check it is allowed
     component_name = get_component_name(payload.type)
     if component_name is None:
-        logger.warning(f"Unsupported component for event type: {payload.type}")
-        return EventResponse(
-            status="rejected",
-            message=f"Unsupported component for event type: {payload.type}",
+        return _reject(
+            payload,
+            "unsupported_component",
+            f"Unsupported component for event type: {payload.type}",
+            started,
+        )
+
+    # Unknown contract numbers are rejected without a query
+    if contract_filter.definitely_absent(payload.contract_number):
+        return _reject(
+            payload,
+            "contract_not_found",
+            f"Contract {payload.contract_number} not found.",
+            started,
         )
 
-    # 3. Check if contract exists
+    # 3. Contracts held by the state store are validated in memory
+    key = idempotency_key(payload)
+    state = state_store.get(payload.contract_number)
+    if state is not None or state_store.knows_absent(payload.contract_number):
+        return await _create_from_state(db, payload, component_name, key, state, started)
+
+    # 4. Retried delivery of an accepted event
+    stored_digest = await get_payload_digest(db, payload.contract_number, key)
+    if stored_digest is not None:
+        return _retried(payload, key, stored_digest, started)
+
+    # 5. Check if contract exists
     contract = await get_contract(db, payload.contract_number)
     if not contract:
-        logger.warning(f"Contract {payload.contract_number} not found")
-        return EventResponse(
-            status="rejected",
-            message=f"Contract {payload.contract_number} not found.",
+        contract_filter.record_false_positive()
+        return _reject(
+            payload,
+            "contract_not_found",
+            f"Contract {payload.contract_number} not found.",
+            started,
         )
 
-    # 4. Validate component is in the contract
+    # 6. Validate component is in the contract
     if component_name not in contract.components:
-        logger.warning(
-            f"Component {component_name} not available in contract {payload.contract_number}"
-        )
-        return EventResponse(
-            status="rejected",
-            message=f"Component '{component_name}' is not available in contract {payload.contract_number}.",
+        return _reject(
+            payload,
+            "component_not_in_contract",
+            f"Component '{component_name}' is not available in contract {payload.contract_number}.",
+            started,
         )
 
-    # 5. Get all existing events for this contract (sorted by created_at)
+    # 7. Archived components: the hot table no longer holds their keys
+    if component_name in (contract.archive_summary or {}):
+        stored_digest = await get_archived_payload_digest(db, payload.contract_number, key)
+        if stored_digest is not None:
+            return _retried(payload, key, stored_digest, started)
+
+    # 8. Build current timeline state from existing events and the archive summary
     events = await get_events_for_contract(db, payload.contract_number)
+    history = merge_by_created_at(summary_events(contract), events)
+    timeline = build_timeline(history)
 
-    # 6. Build current timeline state from existing events
-    timeline = build_timeline(events)
+    # 9. Get current state for this component
+    component_state = timeline.get(component_name, {"start": None, "end": None})
 
-    # 7. Determine if this is a start or end event
-    is_start_event = payload.type.endswith("_start")
+    # 10. Validate the new event against current timeline state
+    violation = rule_violation(
+        payload.type, payload.date, component_state["start"], component_state["end"]
+    )
+    if violation is not None:
+        return _reject(payload, *violation, started)
+
+    # 11. All validations passed - save the event with component_name
+    try:
+        await create_event(db, payload, component_name, key, payload_digest(payload.type, payload.date))
+    except IntegrityError:
+        # A concurrent delivery of the same event may have stored the key
+        # first; any other integrity error is not a duplicate
+        stored_digest = await get_payload_digest(db, payload.contract_number, key)
+        if stored_digest is None:
+            raise
+        return _retried(payload, key, stored_digest, started)
+
+    # 12. Tell change feed subscribers about the new timeline state
+    _publish_change(payload, component_name, component_state, _superseded(payload, history))
+    return _accepted(payload, started)
+
+
+def _accepted(payload: EventPayload, started: float) -> EventResponse:
+    EVENTS_TOTAL.inc(payload.type, "accepted", "")
+    info_sampled(
+        "Event accepted",
+        contract_number=payload.contract_number,
+        event_type=payload.type,
+        verdict="accepted",
+        latency_ms=_elapsed_ms(started),
+    )
+    return EventResponse(status="accepted", message="Event processed successfully.")
 
-    # 8. Get current state for this component
-    component_state = timeline.get(component_name, {"start": None, "end": None})
-    current_start = component_state["start"]
-    current_end = component_state["end"]
 
-    # 9. Validate the new event against current timeline state
-    if is_start_event:
-        # Start event validation
+async def _create_from_state(
+    db: AsyncSession,
+    payload: EventPayload,
+    component_name: str,
+    key: str,
+    state: ContractState | None,
+    started: float,
+) -> EventResponse:
+    """
+    handle_event_creation for contracts known to the state store.
 
-        # Rule: Component cannot be restarted once terminated
-        # A component is terminated if it has both start and end dates
-        if current_start and current_end:
-            logger.warning(
-                f"Cannot restart component {component_name} - already terminated"
-            )
-            return EventResponse(
-                status="rejected",
-                message="Component cannot be restarted after termination.",
-            )
+    The store answers everything but the idempotency key. Accepted events
+    find out on insert, through the unique index; rejected events look the
+    key up before answering, as a retry of an accepted event must not be
+    rejected because of what was accepted since.
+    """
+    if state is None:
+        return _reject(
+            payload,
+            "contract_not_found",
+            f"Contract {payload.contract_number} not found.",
+            started,
+        )
 
-        # Rule: Start event cannot come after end event
-        if current_end and payload.date > current_end:
-            logger.warning(
-                f"Start event date {payload.date} is after end event date {current_end}"
-            )
-            return EventResponse(
-                status="rejected",
-                message="Start event cannot occur after end event.",
-            )
+    if component_name not in state.components:
+        violation = (
+            "component_not_in_contract",
+            f"Component '{component_name}' is not available in contract {payload.contract_number}.",
+        )
     else:
-        # End event validation
+        current = state.component(component_name)
+        # Archived components: the hot table no longer holds their keys. The
+        # archive CLI runs in another process, so a terminated component may
+        # have been archived without the store knowing yet
+        if component_name in state.archived or (current.start and current.end):
+            stored_digest = await get_archived_payload_digest(db, payload.contract_number, key)
+            if stored_digest is not None:
+                return _retried(payload, key, stored_digest, started)
+        violation = rule_violation(payload.type, payload.date, current.start, current.end)
+
+    if violation is not None:
+        stored_digest = await get_payload_digest(db, payload.contract_number, key)
+        if stored_digest is not None:
+            return _retried(payload, key, stored_digest, started)
+        return _reject(payload, *violation, started)
+
+    with state_store.writing():
+        try:
+            await create_event(db, payload, component_name, key, payload_digest(payload.type, payload.date))
+        except IntegrityError:
+            stored_digest = await get_payload_digest(db, payload.contract_number, key)
+            if stored_digest is None:
+                raise
+            return _retried(payload, key, stored_digest, started)
+        state_store.apply_event(
+            payload.contract_number, component_name, payload.type, payload.date, payload.created_at
+        )
 
-        # Rule: End event requires a start event first
-        if not current_start:
-            logger.warning(f"End event without start event for {component_name}")
-            return EventResponse(
-                status="rejected", message="End event requires a start event first."
-            )
+    latest_at = current.start_at if payload.type.endswith("_start") else current.end_at
+    _publish_change(
+        payload,
+        component_name,
+        {"start": current.start, "end": current.end},
+        latest_at > micros(payload.created_at),
+    )
+    return _accepted(payload, started)
 
-        # Rule: End event cannot come before start event
-        if payload.date < current_start:
-            logger.warning(
-                f"End event date {payload.date} is before start event date {current_start}"
-            )
-            return EventResponse(
-                status="rejected",
-                message="End event cannot occur before start event.",
-            )
 
-    # 10. All validations passed - save the event with component_name
-    await create_event(db, payload, component_name)
+@traced()
+async def handle_event_batch(
+    db: AsyncSession, payloads: list[EventPayload]
+) -> list[EventResponse]:
+    """
+    Process several events in request order with the same rules as a single event.
 
-    logger.info(
-        f"Event accepted: {payload.type} for contract {payload.contract_number}"
-    )
-    return EventResponse(status="accepted", message="Event processed successfully.")
+    Each event is validated against the state left by the previous ones, so a
+    batch behaves exactly like posting its events one by one.
+    """
+    if len(payloads) > settings.EVENT_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds the maximum of {settings.EVENT_BATCH_MAX_SIZE} events.",
+        )
+    return [await handle_event_creation(db, payload) for payload in payloads]
+
+
+async def _contract_or_404(db: AsyncSession, contract_number: str) -> Contract:
+    contract = None
+    if not contract_filter.definitely_absent(contract_number):
+        contract = await get_contract(db, contract_number)
+        if not contract:
+            contract_filter.record_false_positive()
+    if not contract:
+        logger.warning("Contract not found", contract_number=contract_number)
+        raise HTTPException(
+            status_code=404, detail=f"Contract {contract_number} not found."
+        )
+    return contract
+
+
+async def _archived_events(contract: Contract, full_history: bool) -> list[ArchivedEvent]:
+    """Archived events when the full history is asked for, else the summary."""
+    if not contract.archive_summary:
+        return []
+    if full_history:
+        return await asyncio.to_thread(read_events, contract.contract_number)
+    return summary_events(contract)
 
 
+@traced()
 async def handle_timeline_retrieval(
-    db: AsyncSession, contract_number: str
+    db: AsyncSession, contract_number: str, full_history: bool = False
 ) -> ContractTimelineResponse:
     """
     Get timeline for all components of a contract.
 
     Returns the start and end dates for each component defined in the contract.
-    Components without events will have null start and end dates.
+    Components without events will have null start and end dates. Archived
+    components are folded in from their summary, or from the archived events
+    themselves with ``full_history``; both give the same timeline, which is
+    served by the state store when it holds the contract.
     """
-    logger.info(f"Retrieving timeline for contract {contract_number}")
+    started = time.perf_counter()
+
+    if not full_history:
+        state = state_store.get(contract_number)
+        if state is not None:
+            return ContractTimelineResponse(
+                contract_number=contract_number,
+                components={
+                    component: ComponentTimeline(start=start, end=end)
+                    for component, (start, end) in state.timeline().items()
+                },
+            )
+        if state_store.knows_absent(contract_number):
+            logger.warning("Contract not found", contract_number=contract_number)
+            raise HTTPException(status_code=404, detail=f"Contract {contract_number} not found.")
 
     # 1. Check if contract exists
-    contract = await get_contract(db, contract_number)
-    if not contract:
-        logger.warning(f"Contract {contract_number} not found")
-        raise HTTPException(
-            status_code=404, detail=f"Contract {contract_number} not found."
-        )
+    contract = await _contract_or_404(db, contract_number)
 
     # 2. Get all events for this contract
     events = await get_events_for_contract(db, contract_number)
 
     # 3. Build timeline from events
-    timeline = build_timeline(events)
+    timeline = build_timeline(
+        merge_by_created_at(await _archived_events(contract, full_history), events)
+    )
 
     # 4. Format response - include all components from contract
     components: dict[str, ComponentTimeline] = {}
@@ -250,7 +631,53 @@ async def handle_timeline_retrieval(
             # Component has no events yet
             components[component] = ComponentTimeline(start=None, end=None)
 
-    logger.info(f"Timeline retrieved for contract {contract_number}")
+    info_sampled(
+        "Timeline retrieved",
+        contract_number=contract_number,
+        events=len(events),
+        latency_ms=_elapsed_ms(started),
+    )
     return ContractTimelineResponse(
         contract_number=contract_number, components=components
     )
+
+
+@traced()
+async def handle_history_retrieval(
+    db: AsyncSession, contract_number: str, full_history: bool = False
+) -> ContractHistoryResponse:
+    """
+    List the stored events of a contract in created_at order.
+
+    Archived events are read from the archive only with ``full_history``.
+    Only the newest HISTORY_LOAD_MAX_EVENTS are listed, older ones are cut
+    and the response says so.
+    """
+    contract = await _contract_or_404(db, contract_number)
+    limit = settings.HISTORY_LOAD_MAX_EVENTS
+    events, truncated = await get_recent_events_for_contract(db, contract_number, limit)
+    archived = (
+        await asyncio.to_thread(read_events, contract_number)
+        if full_history and contract.archive_summary
+        else []
+    )
+    history = merge_by_created_at(archived, events)
+    if len(history) > limit:
+        history = history[-limit:]
+        truncated = True
+    if truncated:
+        HISTORY_LOADS_OVERSIZED.inc("truncated")
+        logger.warning("Large history load truncated", contract_number=contract_number, limit=limit)
+    return ContractHistoryResponse(
+        contract_number=contract_number,
+        truncated=truncated,
+        events=[
+            EventRecord(
+                type=event.type,
+                date=event.date,
+                created_at=event.created_at,
+                archived=isinstance(event, ArchivedEvent),
+            )
+            for event in history
+        ],
+    )
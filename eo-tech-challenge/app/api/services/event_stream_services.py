@@ -0,0 +1,151 @@
+"""
+WebSocket ingest channel: a stream of events in, one acknowledgement per event out.
+
+Each text message is a POST /event body, optionally with a ``correlation_id``
+(else the message's 1-based position in the stream), and is answered with an
+EventAck carrying that id and the verdict of handle_event_creation, or
+status ``error`` when processing the event failed; being idempotent, it can
+be sent again. Events are processed by ``workers`` tasks partitioned by
+contract_number, so the events of one contract keep their order while
+acknowledgements of different contracts may overtake each other.
+
+At most ``max_in_flight`` events may be unacknowledged. Beyond that the
+server stops reading from the socket until acknowledgements went out, so a
+client sending faster than the server keeps up is slowed down by the
+transport instead of queueing without bound.
+"""
+import asyncio
+import json
+from typing import Any, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+from loguru import logger
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api.services.event_services import handle_event_creation, validation_rejection
+from app.core.metrics import WS_INGEST_CONNECTIONS
+from app.core.partitioning import stable_partition
+from app.dto.event import EventAck, EventPayload, EventResponse
+
+# (correlation id, payload)
+Item = tuple[str, EventPayload]
+
+
+def _parse(text: str, position: int) -> tuple[str, Optional[EventPayload], Optional[EventResponse]]:
+    """The correlation id and either the payload or the rejection of one message."""
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return str(position), None, EventResponse(status="rejected", message="Invalid JSON.")
+    if not isinstance(data, dict):
+        return str(position), None, EventResponse(status="rejected", message="Expected a JSON object.")
+    correlation_id = data.pop("correlation_id", None)
+    correlation_id = str(position) if correlation_id is None else str(correlation_id)
+    try:
+        return correlation_id, EventPayload.model_validate(data), None
+    except ValidationError as exc:
+        return correlation_id, None, validation_rejection(exc.errors()[0], data.get("contract_number"))
+
+
+class _EventStream:
+    def __init__(
+        self,
+        websocket: WebSocket,
+        session_factory: async_sessionmaker[AsyncSession],
+        max_in_flight: int,
+        workers: int,
+    ):
+        self.websocket = websocket
+        self.session_factory = session_factory
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+        self.partitions: list[asyncio.Queue[Item]] = [asyncio.Queue() for _ in range(workers)]
+        self.acks: asyncio.Queue[EventAck] = asyncio.Queue()
+        self.received = 0
+        self.acknowledged = 0
+
+    async def receive(self) -> None:
+        """Read messages while fewer than max_in_flight are unacknowledged."""
+        while True:
+            await self.in_flight.acquire()
+            try:
+                text = await self.websocket.receive_text()
+            except BaseException:
+                self.in_flight.release()
+                raise
+            self.received += 1
+            correlation_id, payload, rejection = _parse(text, self.received)
+            if rejection is not None:
+                self.acks.put_nowait(EventAck(correlation_id=correlation_id, **rejection.model_dump()))
+                continue
+            partition = stable_partition(payload.contract_number, len(self.partitions))
+            self.partitions[partition].put_nowait((correlation_id, payload))
+
+    async def process(self, partition: asyncio.Queue[Item]) -> None:
+        while True:
+            correlation_id, payload = await partition.get()
+            try:
+                # A session per event, so an idle stream holds no connection
+                async with self.session_factory() as db:
+                    response = await handle_event_creation(db, payload)
+            except Exception:
+                # The other events of the stream go on
+                logger.exception(
+                    "Stream event failed", correlation_id=correlation_id, contract_number=payload.contract_number
+                )
+                response = EventResponse(status="error", message="Event could not be processed, send it again.")
+            self.acks.put_nowait(EventAck(correlation_id=correlation_id, **response.model_dump()))
+
+    async def send(self) -> None:
+        while True:
+            ack = await self.acks.get()
+            await self.websocket.send_text(ack.model_dump_json())
+            self.acknowledged += 1
+            self.in_flight.release()
+
+    async def run(self) -> None:
+        tasks = [
+            asyncio.create_task(self.receive()),
+            asyncio.create_task(self.send()),
+            *(asyncio.create_task(self.process(partition)) for partition in self.partitions),
+        ]
+        try:
+            # Only ends with the connection, or with an error in a task
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Not gather: when this task is cancelled meanwhile, that cancellation
+            # must propagate as is for the server's cancel scope to absorb it
+            await asyncio.wait(tasks)
+
+
+async def serve_event_stream(
+    websocket: WebSocket,
+    session_factory: async_sessionmaker[AsyncSession],
+    max_in_flight: int,
+    workers: int,
+) -> None:
+    """Ingest events from ``websocket`` until the client disconnects."""
+    await websocket.accept()
+    stream = _EventStream(websocket, session_factory, max_in_flight, workers)
+    WS_INGEST_CONNECTIONS.inc()
+    logger.info("Event stream opened", client=_client(websocket))
+    try:
+        await stream.run()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        WS_INGEST_CONNECTIONS.dec()
+        logger.info(
+            "Event stream closed",
+            client=_client(websocket),
+            received=stream.received,
+            acknowledged=stream.acknowledged,
+        )
+
+
+def _client(websocket: WebSocket) -> Any:
+    return websocket.client.host if websocket.client else None
@@ -0,0 +1,89 @@
+import asyncio
+import json
+from typing import AsyncIterator, Optional
+
+from app.config import settings
+from app.core.change_feed import ChangeFeed, FeedPage
+from app.core.metrics import CHANGE_FEED_SUBSCRIBERS
+from app.dto.feed import ChangeFeedResponse, TimelineChangeResponse
+
+# Changes per long-poll response or SSE read
+PAGE_SIZE = 500
+
+
+def _response(page: FeedPage) -> ChangeFeedResponse:
+    return ChangeFeedResponse(
+        cursor=page.cursor,
+        reset=page.reset,
+        changes=[TimelineChangeResponse(**change.to_dict()) for change in page.changes],
+    )
+
+
+async def handle_change_poll(
+    feed: ChangeFeed,
+    cursor: Optional[str],
+    timeout: float,
+    contract_number: Optional[str],
+    component: Optional[str],
+) -> ChangeFeedResponse:
+    """
+    Return changes after ``cursor``, waiting up to ``timeout`` seconds for one.
+
+    An empty page after the timeout still carries the cursor to poll with next.
+    """
+    CHANGE_FEED_SUBSCRIBERS.inc()
+    try:
+        page = await feed.poll(
+            cursor,
+            min(timeout, settings.CHANGE_FEED_MAX_WAIT_SECONDS),
+            contract_number,
+            component,
+            PAGE_SIZE,
+        )
+    finally:
+        CHANGE_FEED_SUBSCRIBERS.dec()
+    return _response(page)
+
+
+def _sse(event: str, data: dict, event_id: Optional[str] = None) -> bytes:
+    lines = [f"id: {event_id}"] if event_id else []
+    lines += [f"event: {event}", f"data: {json.dumps(data)}"]
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+async def stream_changes(
+    feed: ChangeFeed,
+    cursor: Optional[str],
+    contract_number: Optional[str],
+    component: Optional[str],
+) -> AsyncIterator[bytes]:
+    """
+    Server-Sent Events: one ``timeline`` event per change, ids are cursors.
+
+    Browsers reconnect with the last id in ``Last-Event-ID`` and continue
+    where they stopped. A ``reset`` event asks the client to reload the
+    timelines it follows before applying further changes.
+    """
+    CHANGE_FEED_SUBSCRIBERS.inc()
+    try:
+        loop = asyncio.get_running_loop()
+        last_sent = loop.time()
+        while True:
+            page = feed.read(cursor, contract_number, component, PAGE_SIZE)
+            cursor = page.cursor
+            if page.reset:
+                yield _sse("reset", {"cursor": cursor}, cursor)
+                last_sent = loop.time()
+            for change in page.changes:
+                yield _sse("timeline", change.to_dict(), feed.cursor(change.sequence))
+                last_sent = loop.time()
+            if page.changes:
+                continue
+            idle = loop.time() - last_sent
+            if idle >= settings.CHANGE_FEED_KEEPALIVE_SECONDS:
+                yield b": keepalive\n\n"
+                last_sent = loop.time()
+                idle = 0
+            await feed.wait(settings.CHANGE_FEED_KEEPALIVE_SECONDS - idle)
+    finally:
+        CHANGE_FEED_SUBSCRIBERS.dec()
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator
+
+from fastapi import HTTPException, Request
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.db.crud.job import create_job, get_job, get_job_results
+from app.db.models.job import ImportJob
+from app.dto.job import JobCreatedResponse, JobProgressResponse
+from app.jobs.runner import job_runner
+
+JOB_KINDS = ("events", "contracts")
+
+# Results fetched per query while streaming a job's results
+RESULTS_PAGE_SIZE = 1000
+
+
+def _count_records(path: Path) -> int:
+    with path.open("rb") as source:
+        return sum(1 for line in source if line.strip())
+
+
+async def handle_job_upload(
+    request: Request,
+    kind: str,
+    db: AsyncSession,
+    session_factory: async_sessionmaker[AsyncSession],
+) -> JobCreatedResponse:
+    """
+    Store an uploaded NDJSON file and queue it for background processing.
+
+    The body is streamed to JOBS_DIR chunk by chunk, so uploads of any size
+    never sit in memory.
+    """
+    if kind not in JOB_KINDS:
+        raise HTTPException(status_code=404, detail=f"Unknown job kind {kind}")
+
+    job_id = uuid.uuid4()
+    path = Path(settings.JOBS_DIR) / f"{job_id}.ndjson"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as target:
+        async for chunk in request.stream():
+            await asyncio.to_thread(target.write, chunk)
+
+    total = await asyncio.to_thread(_count_records, path)
+    job = await create_job(
+        db, ImportJob(id=job_id, kind=kind, source_path=str(path), total=total)
+    )
+    job_runner.submit(session_factory, job.id)
+    logger.info("Import job queued", job_id=str(job.id), kind=kind, total=total)
+    return JobCreatedResponse(job_id=job.id, kind=job.kind, status=job.status, total=job.total)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes even for timezone-aware columns
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+async def handle_job_progress(db: AsyncSession, job_id: uuid.UUID) -> JobProgressResponse:
+    """
+    Report a job's counters with its throughput and estimated time left.
+    """
+    job = await get_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    throughput = eta = None
+    if job.started_at is not None and job.processed:
+        end = _as_utc(job.finished_at) if job.finished_at else datetime.now(timezone.utc)
+        elapsed = (end - _as_utc(job.started_at)).total_seconds()
+        if elapsed > 0:
+            throughput = round(job.processed / elapsed, 2)
+            eta = round(max(job.total - job.processed, 0) / throughput, 2)
+
+    return JobProgressResponse(
+        job_id=job.id,
+        kind=job.kind,
+        status=job.status,
+        total=job.total,
+        processed=job.processed,
+        accepted=job.accepted,
+        rejected=job.rejected,
+        throughput_per_sec=throughput,
+        eta_seconds=eta,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+    )
+
+
+async def stream_job_results(
+    session_factory: async_sessionmaker[AsyncSession], job_id: uuid.UUID
+) -> AsyncIterator[bytes]:
+    """Yield a job's per-line results as NDJSON, one page per query."""
+    after_line = 0
+    async with session_factory() as db:
+        while True:
+            page = await get_job_results(db, job_id, after_line, RESULTS_PAGE_SIZE)
+            if not page:
+                return
+            yield "".join(
+                json.dumps({"line": r.line, "status": r.status, "message": r.message}) + "\n"
+                for r in page
+            ).encode()
+            after_line = page[-1].line
@@ -0,0 +1,93 @@
+"""
+Moves the events of terminated components out of the hot ``event`` table.
+
+A component with both a start and an end can never be restarted, and its
+timeline only depends on its latest start and latest end. Its events are
+appended to the archive, the latest start/end are kept in the contract's
+``archive_summary`` and the hot rows are deleted. End events that arrive
+after archiving are archived by the next run and merged into the summary.
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api.services.event_services import build_timeline, merge_by_created_at, summary_events
+from app.archive.store import append_events
+from app.core.tracing import traced
+from app.db.crud.contract import get_contract
+from app.db.crud.event import (
+    delete_archived_events,
+    get_contract_numbers_with_end_events,
+    get_events_for_contract,
+)
+from app.db.models.event import Event
+from app.state.store import state_store
+
+
+@dataclass
+class ArchiveReport:
+    contracts: int = 0
+    events: int = 0
+
+
+def _latest(summary: dict, action: str, event: Event) -> None:
+    """Keep the later of the summary's and the event's value, by created_at."""
+    created_at = event.created_at.isoformat()
+    if summary.get(f"{action}_at") is None or created_at >= summary[f"{action}_at"]:
+        summary[action] = event.date.isoformat()
+        summary[f"{action}_at"] = created_at
+
+
+def summarize(archive_summary: Optional[dict], events: Sequence[Event]) -> dict:
+    """Fold newly archived events, in created_at order, into a contract's summary."""
+    merged = {component: dict(summary) for component, summary in (archive_summary or {}).items()}
+    for event in events:
+        summary = merged.setdefault(
+            event.component_name,
+            {"start": None, "start_at": None, "end": None, "end_at": None, "events": 0},
+        )
+        _latest(summary, "start" if event.type.endswith("_start") else "end", event)
+        summary["events"] += 1
+    return merged
+
+
+@traced()
+async def archive_contract(db: AsyncSession, contract_number: str) -> int:
+    """Archive the hot events of a contract's terminated components."""
+    contract = await get_contract(db, contract_number)
+    if contract is None:
+        return 0
+    events = await get_events_for_contract(db, contract_number)
+    timeline = build_timeline(merge_by_created_at(summary_events(contract), events))
+    terminated = {
+        component for component, state in timeline.items() if state["start"] and state["end"]
+    }
+    archivable = [event for event in events if event.component_name in terminated]
+    if not archivable:
+        return 0
+
+    # The segment is durable before the hot rows go away
+    await asyncio.to_thread(append_events, contract_number, archivable)
+    contract.archive_summary = summarize(contract.archive_summary, archivable)
+    with state_store.writing():
+        await delete_archived_events(db, contract, archivable)
+        state_store.mark_archived(contract_number, {event.component_name for event in archivable})
+    return len(archivable)
+
+
+async def archive_terminated(session_factory: async_sessionmaker[AsyncSession]) -> ArchiveReport:
+    """Archive every contract that has a terminated component in the hot table."""
+    report = ArchiveReport()
+    async with session_factory() as db:
+        contract_numbers = await get_contract_numbers_with_end_events(db)
+    for contract_number in contract_numbers:
+        async with session_factory() as db:
+            archived = await archive_contract(db, contract_number)
+        if archived:
+            report.contracts += 1
+            report.events += archived
+            logger.info("Events archived", contract_number=contract_number, events=archived)
+    return report
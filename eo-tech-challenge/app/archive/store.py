@@ -0,0 +1,90 @@
+"""
+Append-only, gzip-compressed archive of event history.
+
+Each contract has a directory of segments, one per archiving run. A segment
+is written to a temporary file and renamed into place, so it is either
+complete or absent, and it is never modified afterwards.
+"""
+import gzip
+import json
+import os
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import NamedTuple, Optional, Sequence
+from urllib.parse import quote
+
+from app.config import settings
+from app.core.partitioning import stable_partition
+from app.db.models.event import Event
+
+
+class ArchivedEvent(NamedTuple):
+    id: Optional[str]
+    contract_number: str
+    component_name: str
+    type: str
+    date: date
+    created_at: datetime
+    idempotency_key: Optional[str] = None
+    payload_digest: Optional[str] = None
+
+
+def archive_dir(contract_number: str) -> Path:
+    # Spread contracts over 256 directories to keep directory listings short
+    bucket = f"{stable_partition(contract_number, 256):02x}"
+    return Path(settings.ARCHIVE_DIR) / bucket / quote(contract_number, safe="")
+
+
+def _record(event: Event) -> dict:
+    return {
+        "id": str(event.id),
+        "contract_number": event.contract_number,
+        "component_name": event.component_name,
+        "type": event.type,
+        "date": event.date.isoformat(),
+        "created_at": event.created_at.isoformat(),
+        "idempotency_key": event.idempotency_key,
+        "payload_digest": event.payload_digest,
+    }
+
+
+def append_events(contract_number: str, events: Sequence[Event]) -> Path:
+    """Write events as a new segment and make it durable before returning."""
+    directory = archive_dir(contract_number)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{time.time_ns()}.ndjson.gz"
+    tmp = path.with_suffix(".tmp")
+    data = "".join(json.dumps(_record(event)) + "\n" for event in events).encode()
+    with tmp.open("wb") as target:
+        target.write(gzip.compress(data))
+        target.flush()
+        os.fsync(target.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def read_events(contract_number: str) -> list[ArchivedEvent]:
+    """
+    All archived events of a contract, ordered by created_at.
+
+    A run interrupted between writing its segment and deleting the hot rows
+    archives the same events again; they are read once.
+    """
+    directory = archive_dir(contract_number)
+    if not directory.exists():
+        return []
+    seen = set()
+    events = []
+    for path in sorted(directory.glob("*.ndjson.gz")):
+        with gzip.open(path, "rt") as source:
+            for line in source:
+                record = json.loads(line)
+                if record["id"] in seen:
+                    continue
+                seen.add(record["id"])
+                record["date"] = date.fromisoformat(record["date"])
+                record["created_at"] = datetime.fromisoformat(record["created_at"])
+                events.append(ArchivedEvent(**record))
+    events.sort(key=lambda event: event.created_at)
+    return events
@@ -0,0 +1,29 @@
+"""
+Archive the events of terminated components:
+
+    python -m app.cli.archive
+
+Safe to run while the service is up and to repeat after an interruption.
+"""
+import argparse
+import asyncio
+
+from app.archive.archiver import archive_terminated
+from app.db.session import AsyncSessionLocal, shard_set
+
+
+async def _run():
+    try:
+        return await archive_terminated(AsyncSessionLocal)
+    finally:
+        await shard_set.dispose()
+
+
+def main() -> None:
+    argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter).parse_args()
+    report = asyncio.run(_run())
+    print(f"Archived {report.events} events of {report.contracts} contracts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,519 @@
+"""
+Export the contract, event and archived key tables of every shard to a
+compact columnar dump, and import such a dump into another environment:
+
+    python -m app.cli.dump export ./dump
+    python -m app.cli.dump verify ./dump
+    python -m app.cli.dump import ./dump     # into empty databases, service stopped
+
+A dump is a directory with one file per table and a manifest.json holding the
+row count, chunk count, size and SHA-256 of each file. A file is a short
+header followed by chunks of up to --chunk-size rows, each zlib-compressed
+with a CRC32, so both directions stream a chunk at a time. Inside a chunk the
+rows are stored column by column: ids as 16 raw bytes, contract numbers,
+component names, event types and component lists as per-chunk dictionaries
+with integer codes, dates as ordinals and timestamps as microseconds, both
+delta-encoded.
+
+Each shard is exported in one read transaction, so the dump is consistent per
+shard. Import verifies the files against the manifest first, then routes the
+rows to the shards of the target's DB_SHARD_COUNT, which may differ from the
+source's, and writes each chunk per shard with one executemany in one
+transaction, rebuilding the secondary event indexes at the end. Events keep
+their order but get new event log sequences, like with app.cli.rebalance.
+The event archive (ARCHIVE_DIR) is not part of the dump, copy it alongside.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import struct
+import sys
+import time
+import zlib
+from array import array
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator, Optional
+
+from loguru import logger
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.cli.load import ShardWriter
+from app.config import settings
+from app.db.migrations import LATEST_VERSION, migrate, schema_versions
+from app.db.models.contract import Contract
+from app.db.models.event import ArchivedEventKey, Event
+from app.db.sharding import ShardSet, shard_for, shard_urls
+from app.state.store import micros
+
+MAGIC = b"EOCD"
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+
+DEFAULT_CHUNK_SIZE = 100_000
+COMPRESSION_LEVEL = 6
+
+# magic, format version
+_FILE_HEADER = struct.Struct("<4sH")
+# rows, compressed length, CRC32 of the compressed bytes
+_CHUNK_HEADER = struct.Struct("<III")
+_U32 = struct.Struct("<I")
+# String length marking NULL
+_NULL = 0xFFFFFFFF
+
+_DIALECT = sqlite.dialect()
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _processors(column) -> tuple[Callable, Callable]:
+    """SQLAlchemy's conversions of ``column`` values to and from SQLite."""
+    impl = column.type.dialect_impl(_DIALECT)
+    return impl.bind_processor(_DIALECT), impl.result_processor(_DIALECT, None)
+
+
+_DATETIME_BIND, _DATETIME_RESULT = _processors(Event.__table__.c.created_at)
+
+
+class DumpError(Exception):
+    pass
+
+
+# Encodings, each a pair of functions between stored values and the bytes of
+# one column of a chunk; decoding gets the row count and returns the values
+# and the offset after the column.
+
+
+def _to_little(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little(typecode: str, view: memoryview, offset: int, count: int) -> tuple[array, int]:
+    values = array(typecode)
+    end = offset + count * values.itemsize
+    values.frombytes(view[offset:end])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values, end
+
+
+def _encode_strings(values: list[Optional[str]]) -> bytes:
+    lengths = array("I")
+    data = bytearray()
+    for value in values:
+        if value is None:
+            lengths.append(_NULL)
+            continue
+        encoded = value.encode()
+        lengths.append(len(encoded))
+        data += encoded
+    return _to_little(lengths) + data
+
+
+def _decode_strings(view: memoryview, offset: int, count: int) -> tuple[list[Optional[str]], int]:
+    lengths, offset = _from_little("I", view, offset, count)
+    values = []
+    for length in lengths:
+        if length == _NULL:
+            values.append(None)
+            continue
+        values.append(str(view[offset:offset + length], "utf-8"))
+        offset += length
+    return values, offset
+
+
+def _encode_dictionary(values: list[str]) -> bytes:
+    codes: dict[str, int] = {}
+    indexes = array("I", (codes.setdefault(value, len(codes)) for value in values))
+    return _U32.pack(len(codes)) + _encode_strings(list(codes)) + _to_little(indexes)
+
+
+def _decode_dictionary(view: memoryview, offset: int, count: int) -> tuple[list[str], int]:
+    (size,) = _U32.unpack_from(view, offset)
+    entries, offset = _decode_strings(view, offset + _U32.size, size)
+    indexes, offset = _from_little("I", view, offset, count)
+    return [entries[index] for index in indexes], offset
+
+
+def _encode_deltas(values: list[int]) -> bytes:
+    deltas = array("q")
+    previous = 0
+    for value in values:
+        deltas.append(value - previous)
+        previous = value
+    return _to_little(deltas)
+
+
+def _decode_deltas(view: memoryview, offset: int, count: int) -> tuple[list[int], int]:
+    deltas, offset = _from_little("q", view, offset, count)
+    values = []
+    current = 0
+    for delta in deltas:
+        current += delta
+        values.append(current)
+    return values, offset
+
+
+def _encode_uuids(values: list[str]) -> bytes:
+    return b"".join(bytes.fromhex(value) for value in values)
+
+
+def _decode_uuids(view: memoryview, offset: int, count: int) -> tuple[list[str], int]:
+    end = offset + 16 * count
+    data = view[offset:end].hex()
+    return [data[index:index + 32] for index in range(0, 32 * count, 32)], end
+
+
+def _encode_dates(values: list[str]) -> bytes:
+    return _encode_deltas([date.fromisoformat(value).toordinal() for value in values])
+
+
+def _decode_dates(view: memoryview, offset: int, count: int) -> tuple[list[str], int]:
+    ordinals, offset = _decode_deltas(view, offset, count)
+    return [date.fromordinal(ordinal).isoformat() for ordinal in ordinals], offset
+
+
+def _encode_timestamps(values: list[str]) -> bytes:
+    return _encode_deltas([micros(_DATETIME_RESULT(value)) for value in values])
+
+
+def _decode_timestamps(view: memoryview, offset: int, count: int) -> tuple[list[str], int]:
+    values, offset = _decode_deltas(view, offset, count)
+    return [_DATETIME_BIND(_EPOCH + timedelta(microseconds=value)) for value in values], offset
+
+
+_ENCODINGS = {
+    "uuid": (_encode_uuids, _decode_uuids),
+    "strings": (_encode_strings, _decode_strings),
+    "dictionary": (_encode_dictionary, _decode_dictionary),
+    "date": (_encode_dates, _decode_dates),
+    "timestamp": (_encode_timestamps, _decode_timestamps),
+}
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    name: str
+    # (column, encoding), in the order of the stored values
+    columns: tuple[tuple[str, str], ...]
+    order_by: str
+
+    @property
+    def file(self) -> str:
+        return f"{self.name}.col"
+
+    def select(self) -> str:
+        return f"SELECT {', '.join(column for column, _ in self.columns)} FROM {self.name} ORDER BY {self.order_by}"
+
+    def insert(self, extra: tuple[str, ...] = ()) -> str:
+        columns = [column for column, _ in self.columns] + list(extra)
+        return f"INSERT INTO {self.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+    def encode(self, rows: list[tuple]) -> bytes:
+        return b"".join(
+            _ENCODINGS[encoding][0](list(values))
+            for (_, encoding), values in zip(self.columns, zip(*rows))
+        )
+
+    def decode(self, payload: bytes, count: int) -> list[tuple]:
+        view = memoryview(payload)
+        offset = 0
+        columns = []
+        for _, encoding in self.columns:
+            values, offset = _ENCODINGS[encoding][1](view, offset, count)
+            columns.append(values)
+        if offset != len(payload):
+            raise DumpError(f"{self.file}: chunk has trailing data")
+        return list(zip(*columns))
+
+
+# Contracts first, imported events need their contract
+TABLES = (
+    TableSpec(
+        Contract.__tablename__,
+        (
+            ("id", "uuid"),
+            ("contract_number", "strings"),
+            # Raw JSON of the component list, few distinct ones
+            ("components", "dictionary"),
+            ("created_at", "timestamp"),
+            ("archive_summary", "strings"),
+        ),
+        "rowid",
+    ),
+    TableSpec(
+        Event.__tablename__,
+        (
+            ("id", "uuid"),
+            ("contract_number", "dictionary"),
+            ("component_name", "dictionary"),
+            ("type", "dictionary"),
+            ("date", "date"),
+            ("created_at", "timestamp"),
+            ("idempotency_key", "strings"),
+            ("payload_digest", "strings"),
+        ),
+        "sequence, rowid",
+    ),
+    TableSpec(
+        ArchivedEventKey.__tablename__,
+        (
+            ("contract_number", "dictionary"),
+            ("idempotency_key", "strings"),
+            ("payload_digest", "strings"),
+        ),
+        "rowid",
+    ),
+)
+
+
+class _TableFile:
+    """Chunks appended to one table file, hashed as they are written."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.target = path.open("wb")
+        self.sha256 = hashlib.sha256()
+        self.rows = 0
+        self.chunks = 0
+        self.bytes = 0
+        self._write(_FILE_HEADER.pack(MAGIC, FORMAT_VERSION))
+
+    def _write(self, data: bytes) -> None:
+        self.target.write(data)
+        self.sha256.update(data)
+        self.bytes += len(data)
+
+    def add(self, spec: TableSpec, rows: list[tuple]) -> None:
+        compressed = zlib.compress(spec.encode(rows), COMPRESSION_LEVEL)
+        self._write(_CHUNK_HEADER.pack(len(rows), len(compressed), zlib.crc32(compressed)))
+        self._write(compressed)
+        self.rows += len(rows)
+        self.chunks += 1
+
+    def close(self) -> dict:
+        self.target.flush()
+        os.fsync(self.target.fileno())
+        self.target.close()
+        return {
+            "file": self.path.name,
+            "rows": self.rows,
+            "chunks": self.chunks,
+            "bytes": self.bytes,
+            "sha256": self.sha256.hexdigest(),
+        }
+
+
+def _read_chunks(source: BinaryIO, name: str) -> Iterator[tuple[int, bytes]]:
+    """Row count and compressed payload of each chunk, CRC checked."""
+    header = source.read(_FILE_HEADER.size)
+    if len(header) != _FILE_HEADER.size or _FILE_HEADER.unpack(header) != (MAGIC, FORMAT_VERSION):
+        raise DumpError(f"{name}: unknown format")
+    while header := source.read(_CHUNK_HEADER.size):
+        if len(header) != _CHUNK_HEADER.size:
+            raise DumpError(f"{name}: truncated chunk header")
+        rows, length, crc = _CHUNK_HEADER.unpack(header)
+        compressed = source.read(length)
+        if len(compressed) != length or zlib.crc32(compressed) != crc:
+            raise DumpError(f"{name}: corrupt chunk")
+        yield rows, compressed
+
+
+def _database(url: str) -> str:
+    return make_url(url).database
+
+
+async def _schema_versions(urls: list[str], upgrade: bool) -> list[int]:
+    shard_set = ShardSet([create_async_engine(url) for url in urls])
+    try:
+        if upgrade:
+            await migrate(shard_set)
+        return await schema_versions(shard_set)
+    finally:
+        await shard_set.dispose()
+
+
+def export_database(directory: Path, urls: Optional[list[str]] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
+    """Dump the shards at ``urls`` (default: the configured ones) into ``directory``; returns the manifest."""
+    urls = urls or shard_urls(settings.DB_SHARD_COUNT)
+    versions = asyncio.run(_schema_versions(urls, upgrade=False))
+    if any(version != LATEST_VERSION for version in versions):
+        raise DumpError(f"Database schema versions {versions} differ from {LATEST_VERSION}, migrate first")
+
+    started = time.perf_counter()
+    directory.mkdir(parents=True, exist_ok=True)
+    # Written last, a dump without one is incomplete
+    (directory / MANIFEST).unlink(missing_ok=True)
+    connections = [
+        sqlite3.connect(f"file:{_database(url)}?mode=ro", uri=True, isolation_level=None) for url in urls
+    ]
+    tables = {}
+    try:
+        for connection in connections:
+            connection.execute("BEGIN")
+        for spec in TABLES:
+            table_started = time.perf_counter()
+            table_file = _TableFile(directory / spec.file)
+            try:
+                for connection in connections:
+                    cursor = connection.execute(spec.select())
+                    while rows := cursor.fetchmany(chunk_size):
+                        table_file.add(spec, rows)
+            finally:
+                tables[spec.name] = table_file.close()
+            logger.info(
+                "Table exported",
+                table=spec.name,
+                rows=table_file.rows,
+                bytes=table_file.bytes,
+                rows_per_sec=round(table_file.rows / max(time.perf_counter() - table_started, 1e-9)),
+            )
+    finally:
+        for connection in connections:
+            connection.close()
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "schema_version": LATEST_VERSION,
+        "shards": len(urls),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "tables": tables,
+    }
+    (directory / MANIFEST).write_text(json.dumps(manifest, indent=2) + "\n")
+    logger.info(
+        "Database exported",
+        directory=str(directory),
+        duration_ms=round((time.perf_counter() - started) * 1000, 3),
+    )
+    return manifest
+
+
+def verify_dump(directory: Path) -> dict:
+    """Check every table file against the manifest; returns the manifest."""
+    try:
+        manifest = json.loads((directory / MANIFEST).read_text())
+    except (OSError, ValueError) as exc:
+        raise DumpError(f"No readable {MANIFEST} in {directory}: {exc}") from exc
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise DumpError(f"Unknown dump format {manifest.get('format_version')}")
+    for spec in TABLES:
+        entry = manifest["tables"][spec.name]
+        sha256 = hashlib.sha256()
+        rows = chunks = 0
+        with (directory / entry["file"]).open("rb") as source:
+            for count, _ in _read_chunks(source, entry["file"]):
+                rows += count
+                chunks += 1
+            size = source.tell()
+            source.seek(0)
+            while block := source.read(1 << 20):
+                sha256.update(block)
+        if (rows, chunks, size, sha256.hexdigest()) != (
+            entry["rows"], entry["chunks"], entry["bytes"], entry["sha256"]
+        ):
+            raise DumpError(f"{entry['file']} does not match the manifest")
+    return manifest
+
+
+def import_database(directory: Path, urls: Optional[list[str]] = None) -> dict[str, int]:
+    """
+    Load the dump in ``directory`` into the empty shards at ``urls`` (default:
+    the configured ones); returns the rows imported per table.
+    """
+    manifest = verify_dump(directory)
+    if manifest["schema_version"] != LATEST_VERSION:
+        raise DumpError(f"Dump of schema version {manifest['schema_version']}, this code is at {LATEST_VERSION}")
+    urls = urls or shard_urls(settings.DB_SHARD_COUNT)
+    asyncio.run(_schema_versions(urls, upgrade=True))
+
+    started = time.perf_counter()
+    writers = [ShardWriter(url) for url in urls]
+    imported = {}
+    try:
+        for url, writer in zip(urls, writers):
+            for spec in TABLES:
+                if writer.connection.execute(f"SELECT 1 FROM {spec.name} LIMIT 1").fetchone():
+                    raise DumpError(f"Table {spec.name} of {_database(url)} is not empty")
+        for writer in writers:
+            writer.drop_indexes()
+        try:
+            for spec in TABLES:
+                imported[spec.name] = _import_table(directory, spec, manifest["tables"][spec.name], writers)
+        finally:
+            for writer in writers:
+                writer.create_indexes()
+    finally:
+        for writer in writers:
+            writer.close()
+    logger.info(
+        "Database imported",
+        directory=str(directory),
+        shards=len(urls),
+        duration_ms=round((time.perf_counter() - started) * 1000, 3),
+    )
+    return imported
+
+
+def _import_table(directory: Path, spec: TableSpec, entry: dict, writers: list[ShardWriter]) -> int:
+    started = time.perf_counter()
+    # Numbered anew per target shard, in the exported order
+    sequenced = spec.name == Event.__tablename__
+    statement = spec.insert(("sequence",) if sequenced else ())
+    key = [column for column, _ in spec.columns].index("contract_number")
+    imported = 0
+    with (directory / entry["file"]).open("rb") as source:
+        for count, compressed in _read_chunks(source, entry["file"]):
+            shards: list[list[tuple]] = [[] for _ in writers]
+            for row in spec.decode(zlib.decompress(compressed), count):
+                shard = shard_for(row[key], len(writers))
+                shards[shard].append(row + (writers[shard].next_sequence(),) if sequenced else row)
+            for writer, rows in zip(writers, shards):
+                imported += writer.write(statement, rows)
+    if imported != entry["rows"]:
+        raise DumpError(f"Imported {imported} {spec.name} rows, the manifest lists {entry['rows']}")
+    logger.info(
+        "Table imported",
+        table=spec.name,
+        rows=imported,
+        rows_per_sec=round(imported / max(time.perf_counter() - started, 1e-9)),
+    )
+    return imported
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="dump the configured databases")
+    export.add_argument("directory", type=Path)
+    export.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per chunk")
+    commands.add_parser("verify", help="check a dump against its manifest").add_argument("directory", type=Path)
+    commands.add_parser("import", help="load a dump into empty databases").add_argument("directory", type=Path)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "export":
+            if args.chunk_size < 1:
+                parser.error("--chunk-size must be at least 1")
+            manifest = export_database(args.directory, chunk_size=args.chunk_size)
+            tables = manifest["tables"]
+            print(", ".join(f"{name}: {entry['rows']} rows, {entry['bytes']} bytes" for name, entry in tables.items()))
+        elif args.command == "verify":
+            tables = verify_dump(args.directory)["tables"]
+            print(", ".join(f"{name}: {entry['rows']} rows" for name, entry in tables.items()) + ", checksums match")
+        else:
+            imported = import_database(args.directory)
+            print(", ".join(f"{name}: {rows} rows imported" for name, rows in imported.items()))
+    except (DumpError, sqlite3.Error) as exc:
+        parser.exit(1, f"{exc}\n")
+
+
+if __name__ == "__main__":
+    main()
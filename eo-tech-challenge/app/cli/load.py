@@ -0,0 +1,455 @@
+"""
+Load contracts and events from NDJSON files straight into the databases, for
+disaster recovery and seeding. Stop the service first, the loader must be the
+only writer:
+
+    python -m app.cli.load events.ndjson --contracts contracts.ndjson --drop-indexes
+
+Lines are POST /contract/ and POST /event bodies. A process pool parses and
+validates the event lines chunk by chunk, then the lifecycle rules of
+handle_event_creation are applied per contract in file order, against the
+contract state read from the databases at the start (see StateStore). Each
+chunk's accepted events are written per shard with one executemany in one
+transaction; the loader numbers their event log sequences itself instead of
+leaving it to the insert trigger. Progress and rows/sec are logged per chunk.
+
+Every event is looked up by idempotency key before the rules are applied:
+an event whose key is already stored or accepted earlier in the file is
+counted as a duplicate, or rejected when the key belongs to an event with
+another type or date. --drop-indexes drops the non-unique indexes of the
+event table for the load and rebuilds them at the end; the unique ones
+enforce deduplication and stay.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sqlite3
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, TextIO
+
+from loguru import logger
+from pydantic import ValidationError
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.schema import CreateIndex
+
+from app.api.services.event_services import get_component_name, idempotency_key, payload_digest, rule_violation
+from app.config import settings
+from app.db.migrations import migrate
+from app.db.models.contract import Contract, utc_now
+from app.db.models.event import Event
+from app.db.sharding import ShardSet, shard_for, shard_urls
+from app.dto.contract import ContractPayload
+from app.dto.event import EventPayload
+from app.state.store import StateStore, micros
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Indexes rebuilt after the load with --drop-indexes
+SECONDARY_INDEXES = sorted(
+    (index for index in Event.__table__.indexes if not index.unique), key=lambda index: index.name
+)
+
+_DIALECT = sqlite.dialect()
+
+
+def _bind(column) -> Callable:
+    """The conversion SQLAlchemy applies to ``column`` values on SQLite."""
+    return column.type.dialect_impl(_DIALECT).bind_processor(_DIALECT)
+
+
+_UUID = _bind(Event.__table__.c.id)
+_DATE = _bind(Event.__table__.c.date)
+_DATETIME = _bind(Event.__table__.c.created_at)
+_JSON = _bind(Contract.__table__.c.components)
+
+_INSERT_EVENT = (
+    "INSERT OR IGNORE INTO event "
+    "(id, contract_number, component_name, type, date, created_at, idempotency_key, payload_digest, sequence) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_INSERT_CONTRACT = (
+    "INSERT INTO contract (id, contract_number, components, created_at) VALUES (?, ?, ?, ?)"
+)
+# Payload digest stored under a key, see get_payload_digest
+_KEY_DIGEST = "SELECT coalesce(payload_digest, '') FROM event WHERE contract_number = ? AND idempotency_key = ?"
+_ARCHIVED_KEY_DIGEST = (
+    "SELECT coalesce(payload_digest, '') FROM archived_event_key WHERE contract_number = ? AND idempotency_key = ?"
+)
+# Same numbering as EVENT_SEQUENCE_TRIGGER
+_LAST_SEQUENCE = (
+    "SELECT max(coalesce((SELECT max(sequence) FROM event), 0), "
+    "coalesce((SELECT sequence_floor FROM event_log_state WHERE id = 1), 0))"
+)
+
+# (line number, contract_number, type, date, created_at, idempotency key)
+ParsedEvent = tuple[int, str, str, date, datetime, str]
+# (line number, message)
+Rejection = tuple[int, str]
+
+
+@dataclass
+class LoadReport:
+    lines: int = 0
+    accepted: int = 0
+    rejected: int = 0
+    duplicates: int = 0
+    contracts: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.accepted / self.seconds if self.seconds else 0.0
+
+
+class LoadError(Exception):
+    pass
+
+
+def _validation_message(exc: ValidationError) -> str:
+    error = exc.errors()[0]
+    if error.get("loc") == ("type",) and error.get("type") == "literal_error":
+        return f"Invalid event type: {error.get('input')}"
+    field = ".".join(str(part) for part in error.get("loc", ())) or "payload"
+    return f"Invalid {field}: {error.get('msg', 'validation error')}"
+
+
+def parse_events(lines: list[tuple[int, str]]) -> tuple[list[ParsedEvent], list[Rejection]]:
+    """Validate event lines like POST /event does; runs in the process pool."""
+    parsed, rejected = [], []
+    for line_no, text in lines:
+        try:
+            payload = EventPayload.model_validate_json(text)
+        except ValidationError as exc:
+            rejected.append((line_no, _validation_message(exc)))
+            continue
+        parsed.append(
+            (
+                line_no,
+                payload.contract_number,
+                payload.type,
+                payload.date,
+                payload.created_at,
+                idempotency_key(payload),
+            )
+        )
+    return parsed, rejected
+
+
+def _read_chunks(path: Path, size: int) -> Iterator[list[tuple[int, str]]]:
+    """Non-blank lines of ``path`` with their 1-based numbers, ``size`` at a time."""
+    chunk = []
+    with path.open(encoding="utf-8", errors="replace") as source:
+        for line_no, text in enumerate(source, start=1):
+            if text.strip():
+                chunk.append((line_no, text))
+                if len(chunk) >= size:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
+
+
+def _parsed_chunks(
+    pool: ProcessPoolExecutor, chunks: Iterable[list[tuple[int, str]]], workers: int
+) -> Iterator[tuple[int, list[ParsedEvent], list[Rejection]]]:
+    """
+    Parse chunks in the pool, in order, one chunk ahead of the caller.
+
+    Yields the line count, the valid events and the rejections of each chunk.
+    """
+    pending: deque[tuple[int, list[Future]]] = deque()
+
+    def collect() -> tuple[int, list[ParsedEvent], list[Rejection]]:
+        count, futures = pending.popleft()
+        parsed, rejected = [], []
+        for future in futures:
+            events, rejections = future.result()
+            parsed += events
+            rejected += rejections
+        return count, parsed, rejected
+
+    for chunk in chunks:
+        step = -(-len(chunk) // workers)
+        futures = [pool.submit(parse_events, chunk[offset:offset + step]) for offset in range(0, len(chunk), step)]
+        pending.append((len(chunk), futures))
+        if len(pending) > 1:
+            yield collect()
+    while pending:
+        yield collect()
+
+
+class ShardWriter:
+    """Bulk inserts into one shard's SQLite database."""
+
+    def __init__(self, url: str):
+        self.connection = sqlite3.connect(make_url(url).database, isolation_level=None)
+        self.sequence = self.connection.execute(_LAST_SEQUENCE).fetchone()[0]
+
+    def next_sequence(self) -> int:
+        """The event log position of the next event written by this writer."""
+        self.sequence += 1
+        return self.sequence
+
+    def event_row(
+        self, contract_number: str, component: str, event_type: str, day: date, created_at: datetime, key: str
+    ) -> tuple:
+        return (
+            _UUID(uuid.uuid4()),
+            contract_number,
+            component,
+            event_type,
+            _DATE(day),
+            _DATETIME(created_at),
+            key,
+            payload_digest(event_type, day),
+            self.next_sequence(),
+        )
+
+    def stored_digest(self, contract_number: str, key: str) -> Optional[str]:
+        row = self.connection.execute(_KEY_DIGEST, (contract_number, key)).fetchone()
+        return row[0] if row is not None else None
+
+    def archived_digest(self, contract_number: str, key: str) -> Optional[str]:
+        row = self.connection.execute(_ARCHIVED_KEY_DIGEST, (contract_number, key)).fetchone()
+        return row[0] if row is not None else None
+
+    def write(self, statement: str, rows: list[tuple]) -> int:
+        """Insert ``rows`` in one transaction; the number actually inserted."""
+        if not rows:
+            return 0
+        self.connection.execute("BEGIN")
+        try:
+            inserted = self.connection.executemany(statement, rows).rowcount
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+        return inserted
+
+    def drop_indexes(self) -> None:
+        for index in SECONDARY_INDEXES:
+            self.connection.execute(f"DROP INDEX IF EXISTS {index.name}")
+
+    def create_indexes(self) -> None:
+        for index in SECONDARY_INDEXES:
+            self.connection.execute(str(CreateIndex(index, if_not_exists=True).compile(dialect=_DIALECT)))
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+async def _load_state(urls: list[str], max_bytes: int) -> StateStore:
+    """Contract state of every shard, after bringing their schema up to date."""
+    shard_set = ShardSet([create_async_engine(url) for url in urls])
+    try:
+        await migrate(shard_set)
+        store = StateStore()
+        await store.warm(shard_set, max_bytes)
+    finally:
+        await shard_set.dispose()
+    if not store.complete:
+        raise LoadError(f"The contract state does not fit in {max_bytes} bytes, raise --max-state-bytes")
+    return store
+
+
+class _Loader:
+    def __init__(self, store: StateStore, writers: list[ShardWriter], rejections: Optional[TextIO]):
+        self.store = store
+        self.writers = writers
+        self.rejections = rejections
+        self.report = LoadReport()
+
+    def reject(self, path: Path, line_no: int, message: str) -> None:
+        self.report.rejected += 1
+        if self.rejections is not None:
+            self.rejections.write(json.dumps({"file": str(path), "line": line_no, "message": message}) + "\n")
+
+    def retried(self, path: Path, line_no: int, key: str, stored: str, digest: str) -> None:
+        """Count an event whose key is stored as a duplicate, unless it reuses the key."""
+        if stored and stored != digest:
+            self.reject(path, line_no, f"Idempotency key '{key}' was already used for a different event.")
+        else:
+            self.report.duplicates += 1
+
+    def load_contracts(self, path: Path) -> None:
+        rows: list[list[tuple]] = [[] for _ in self.writers]
+        for chunk in _read_chunks(path, DEFAULT_CHUNK_SIZE):
+            for line_no, text in chunk:
+                self.report.lines += 1
+                try:
+                    payload = ContractPayload.model_validate_json(text)
+                except ValidationError as exc:
+                    self.reject(path, line_no, _validation_message(exc))
+                    continue
+                if self.store.get(payload.contract_number) is not None:
+                    self.reject(path, line_no, f"Contract {payload.contract_number} already exists.")
+                    continue
+                self.store.put_contract(payload.contract_number, payload.components)
+                rows[shard_for(payload.contract_number, len(self.writers))].append(
+                    (_UUID(uuid.uuid4()), payload.contract_number, _JSON(payload.components), _DATETIME(utc_now()))
+                )
+        if not self.store.complete:
+            raise LoadError("The contract state does not fit in memory, raise --max-state-bytes")
+        for writer, shard_rows in zip(self.writers, rows):
+            self.report.contracts += writer.write(_INSERT_CONTRACT, shard_rows)
+        logger.info("Contracts loaded", file=str(path), contracts=self.report.contracts)
+
+    def apply_rules(self, path: Path, events: list[ParsedEvent]) -> list[list[tuple]]:
+        """handle_event_creation's verdicts, in order; the rows to insert per shard."""
+        rows: list[list[tuple]] = [[] for _ in self.writers]
+        # Accepted in this chunk, not written yet, with their payload digest
+        pending_keys: dict[tuple[str, str], str] = {}
+        for line_no, contract_number, event_type, day, created_at, key in events:
+            component = get_component_name(event_type)
+            digest = payload_digest(event_type, day)
+            state = self.store.get(contract_number)
+            if state is None:
+                self.reject(path, line_no, f"Contract {contract_number} not found.")
+                continue
+            if component not in state.components:
+                self.reject(
+                    path, line_no, f"Component '{component}' is not available in contract {contract_number}."
+                )
+                continue
+            # A retry of an accepted event is answered from its key before the
+            # rules, which would judge it against what was accepted since
+            shard = shard_for(contract_number, len(self.writers))
+            stored = pending_keys.get((contract_number, key))
+            if stored is None:
+                stored = self.writers[shard].stored_digest(contract_number, key)
+            # Archived components: the hot table no longer holds their keys
+            if stored is None and component in state.archived:
+                stored = self.writers[shard].archived_digest(contract_number, key)
+            if stored is not None:
+                self.retried(path, line_no, key, stored, digest)
+                continue
+            current = state.component(component)
+            violation = rule_violation(event_type, day, current.start, current.end)
+            if violation is not None:
+                self.reject(path, line_no, violation[1])
+                continue
+            state.apply(component, event_type.endswith("_start"), day, micros(created_at))
+            pending_keys[(contract_number, key)] = digest
+            rows[shard].append(
+                self.writers[shard].event_row(contract_number, component, event_type, day, created_at, key)
+            )
+        return rows
+
+    def load_events(self, pool: ProcessPoolExecutor, path: Path, workers: int, chunk_size: int) -> None:
+        started = time.perf_counter()
+        for count, events, rejected in _parsed_chunks(pool, _read_chunks(path, chunk_size), workers):
+            chunk_started = time.perf_counter()
+            self.report.lines += count
+            for line_no, message in rejected:
+                self.reject(path, line_no, message)
+            rows = self.apply_rules(path, events)
+            for writer, shard_rows in zip(self.writers, rows):
+                inserted = writer.write(_INSERT_EVENT, shard_rows)
+                self.report.accepted += inserted
+                self.report.duplicates += len(shard_rows) - inserted
+            now = time.perf_counter()
+            logger.info(
+                "Chunk loaded",
+                file=str(path),
+                lines=self.report.lines,
+                accepted=self.report.accepted,
+                rejected=self.report.rejected,
+                duplicates=self.report.duplicates,
+                chunk_rows_per_sec=round(sum(map(len, rows)) / max(now - chunk_started, 1e-9)),
+                rows_per_sec=round(self.report.accepted / max(now - started, 1e-9)),
+            )
+
+
+def load(
+    events: list[Path],
+    contracts: Optional[Path] = None,
+    urls: Optional[list[str]] = None,
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    drop_indexes: bool = False,
+    rejected: Optional[Path] = None,
+    max_state_bytes: int = settings.STATE_STORE_MAX_BYTES,
+) -> LoadReport:
+    """Load ``contracts`` and then ``events`` into the shards at ``urls`` (default: the configured ones)."""
+    started = time.perf_counter()
+    urls = urls or shard_urls(settings.DB_SHARD_COUNT)
+    store = asyncio.run(_load_state(urls, max_state_bytes))
+    writers = [ShardWriter(url) for url in urls]
+    rejections = rejected.open("w") if rejected is not None else None
+    loader = _Loader(store, writers, rejections)
+    try:
+        if contracts is not None:
+            loader.load_contracts(contracts)
+        if drop_indexes:
+            for writer in writers:
+                writer.drop_indexes()
+        try:
+            # Spawned, not forked: the parent may hold database and logging threads
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                for path in events:
+                    loader.load_events(pool, path, workers, chunk_size)
+        finally:
+            if drop_indexes:
+                rebuild_started = time.perf_counter()
+                for writer in writers:
+                    writer.create_indexes()
+                logger.info(
+                    "Indexes rebuilt",
+                    duration_ms=round((time.perf_counter() - rebuild_started) * 1000, 3),
+                )
+    finally:
+        for writer in writers:
+            writer.close()
+        if rejections is not None:
+            rejections.close()
+    loader.report.seconds = time.perf_counter() - started
+    return loader.report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("events", nargs="*", type=Path, help="NDJSON files of POST /event bodies")
+    parser.add_argument("--contracts", type=Path, help="NDJSON file of POST /contract/ bodies, loaded first")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="parsing processes")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="lines per transaction")
+    parser.add_argument("--drop-indexes", action="store_true", help="rebuild secondary indexes after the load")
+    parser.add_argument("--rejected", type=Path, help="write rejected lines with their reason here (NDJSON)")
+    parser.add_argument("--max-state-bytes", type=int, default=settings.STATE_STORE_MAX_BYTES)
+    args = parser.parse_args()
+    if args.workers < 1 or args.chunk_size < 1:
+        parser.error("--workers and --chunk-size must be at least 1")
+    if not args.events and args.contracts is None:
+        parser.error("nothing to load")
+
+    try:
+        report = load(
+            args.events,
+            contracts=args.contracts,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            drop_indexes=args.drop_indexes,
+            rejected=args.rejected,
+            max_state_bytes=args.max_state_bytes,
+        )
+    except LoadError as exc:
+        parser.exit(1, f"{exc}\n")
+    print(
+        f"Loaded {report.contracts} contracts and {report.accepted} events from {report.lines} lines "
+        f"({report.rejected} rejected, {report.duplicates} duplicates) in {report.seconds:.1f}s, "
+        f"{report.rows_per_sec:.0f} rows/sec"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Apply pending schema migrations to every shard:
+
+    python -m app.cli.migrate
+    python -m app.cli.migrate --check   # exit 1 when migrations are pending
+"""
+import argparse
+import asyncio
+import sys
+
+from app.db.migrations import LATEST_VERSION, migrate, schema_versions
+from app.db.session import shard_set
+
+
+async def _run(check: bool) -> int:
+    try:
+        if check:
+            versions = await schema_versions(shard_set)
+            print(f"Schema versions per shard: {versions}, latest: {LATEST_VERSION}")
+            return 0 if all(version == LATEST_VERSION for version in versions) else 1
+        for shard, applied in (await migrate(shard_set)).items():
+            print(f"Shard {shard}: {'applied ' + str(applied) if applied else 'up to date'}")
+        return 0
+    finally:
+        await shard_set.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="only report the schema versions")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(_run(args.check)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Move contracts between shards after DB_SHARD_COUNT changes.
+
+Stop the service first, then run with the old and the new shard count:
+
+    python -m app.cli.rebalance --from-shards 2 --to-shards 4
+
+Each contract is copied to its new shard in one transaction and deleted from
+its old shard in a second one. Copied events get new event log sequences on
+the new shard, in their old order. A contract whose rows already reached the new
+shard is not copied again, so an interrupted run can simply be repeated.
+"""
+import argparse
+import asyncio
+from dataclasses import dataclass
+
+from loguru import logger
+from sqlalchemy import delete, exists, insert, select, union
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.db.crud.event import record_removal
+from app.db.migrations import migrate
+from app.db.sharding import SHARD_KEY, SHARDED_TABLES, ShardSet, create_shard_engines
+
+
+@dataclass
+class RebalanceReport:
+    contracts_scanned: int = 0
+    contracts_moved: int = 0
+    rows_moved: int = 0
+
+
+async def _contract_numbers(engine: AsyncEngine) -> list[str]:
+    query = union(*(select(table.c[SHARD_KEY]) for table in SHARDED_TABLES))
+    async with engine.connect() as conn:
+        return list((await conn.scalars(query)).all())
+
+
+async def _move_contract(source: AsyncEngine, target: AsyncEngine, contract_number: str) -> int:
+    rows_by_table = {}
+    async with source.connect() as conn:
+        for table in SHARDED_TABLES:
+            query = select(table).where(table.c[SHARD_KEY] == contract_number)
+            if "sequence" in table.c:
+                query = query.order_by(table.c.sequence)
+            rows = [dict(row) for row in (await conn.execute(query)).mappings()]
+            for row in rows:
+                # Event log positions are per database, the target numbers them anew
+                row.pop("sequence", None)
+            rows_by_table[table] = rows
+
+    moved = 0
+    async with target.begin() as conn:
+        for table, rows in rows_by_table.items():
+            already_copied = await conn.scalar(
+                select(exists().where(table.c[SHARD_KEY] == contract_number))
+            )
+            if rows and not already_copied:
+                await conn.execute(insert(table), rows)
+                moved += len(rows)
+
+    async with source.begin() as conn:
+        await conn.execute(record_removal(contract_number))
+        for table in reversed(SHARDED_TABLES):
+            await conn.execute(delete(table).where(table.c[SHARD_KEY] == contract_number))
+    return moved
+
+
+async def rebalance(source: ShardSet, target: ShardSet, dry_run: bool = False) -> RebalanceReport:
+    """
+    Move every contract stored on ``source`` to its shard in ``target``.
+
+    Both sets address the same databases by shard index, ``target`` may have
+    more or fewer shards than ``source``.
+    """
+    report = RebalanceReport()
+    if not dry_run:
+        await migrate(target)
+
+    # List every shard before moving anything, source and target share databases
+    contracts = [await _contract_numbers(engine) for engine in source.engines]
+    for shard, engine in enumerate(source.engines):
+        for contract_number in contracts[shard]:
+            report.contracts_scanned += 1
+            destination = target.shard_for(contract_number)
+            if destination == shard:
+                continue
+            report.contracts_moved += 1
+            if not dry_run:
+                report.rows_moved += await _move_contract(
+                    engine, target.engines[destination], contract_number
+                )
+        logger.info("Shard rebalanced", shard=shard, scanned=report.contracts_scanned)
+    return report
+
+
+async def _run(from_shards: int, to_shards: int, dry_run: bool) -> RebalanceReport:
+    engines = create_shard_engines(max(from_shards, to_shards))
+    try:
+        return await rebalance(
+            ShardSet(engines[:from_shards]), ShardSet(engines[:to_shards]), dry_run
+        )
+    finally:
+        await ShardSet(engines).dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from-shards", type=int, required=True, help="current DB_SHARD_COUNT")
+    parser.add_argument("--to-shards", type=int, required=True, help="new DB_SHARD_COUNT")
+    parser.add_argument("--dry-run", action="store_true", help="only count the contracts to move")
+    args = parser.parse_args()
+    if args.from_shards < 1 or args.to_shards < 1:
+        parser.error("shard counts must be at least 1")
+
+    report = asyncio.run(_run(args.from_shards, args.to_shards, args.dry_run))
+    print(
+        f"Scanned {report.contracts_scanned} contracts, "
+        f"{'would move' if args.dry_run else 'moved'} {report.contracts_moved} "
+        f"({report.rows_moved} rows)"
+    )
+    if args.to_shards < args.from_shards:
+        print(f"Shards {args.to_shards}..{args.from_shards - 1} are empty now and can be removed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Serve the API with uvicorn, in several worker processes:
+
+    python -m app.cli.serve --workers 4 --port 8000
+
+Pending migrations are applied once here (with DB_AUTO_MIGRATE) before the
+workers start, instead of by every worker at once. uvloop and httptools are
+used when installed (``uvicorn[standard]``), asyncio and h11 otherwise.
+
+Workers share the databases but not their memory. With more than one, every
+worker follows the writes of the others (see app.state.coherence), every
+CACHE_COHERENCE_INTERVAL_SECONDS or DEFAULT_COHERENCE_INTERVAL_SECONDS when
+unset, and only the primary worker (see app.core.workers) resumes import
+jobs, writes state snapshots and prunes the change log.
+
+On SIGTERM or SIGINT the workers stop accepting connections, give requests
+in flight and open streams up to --drain-timeout seconds, then run the
+shutdown of the lifespan in app.main.
+"""
+import argparse
+import asyncio
+import importlib.util
+import os
+
+import uvicorn
+from loguru import logger
+
+from app.config import settings
+from app.db.migrations import check_schema
+from app.db.session import shard_set
+
+# Change log poll interval of several workers, unless configured
+DEFAULT_COHERENCE_INTERVAL_SECONDS = 0.5
+
+
+async def _prepare() -> None:
+    try:
+        await check_schema(shard_set, auto_migrate=settings.DB_AUTO_MIGRATE)
+    finally:
+        await shard_set.dispose()
+
+
+def _implementation(preferred: str, fallback: str) -> str:
+    return preferred if importlib.util.find_spec(preferred) is not None else fallback
+
+
+def serve(host: str, port: int, workers: int, drain_timeout: float, access_log: bool = False) -> None:
+    asyncio.run(_prepare())
+
+    # Workers read their settings from the environment
+    os.environ["SERVER_WORKERS"] = str(workers)
+    if workers > 1 and not settings.CACHE_COHERENCE_INTERVAL_SECONDS:
+        os.environ["CACHE_COHERENCE_INTERVAL_SECONDS"] = str(DEFAULT_COHERENCE_INTERVAL_SECONDS)
+
+    loop = _implementation("uvloop", "asyncio")
+    http = _implementation("httptools", "h11")
+    logger.info("Starting server", host=host, port=port, workers=workers, loop=loop, http=http)
+    uvicorn.run(
+        "app.main:app",
+        host=host,
+        port=port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        lifespan="on",
+        access_log=access_log,
+        timeout_graceful_shutdown=drain_timeout,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS, help="worker processes")
+    parser.add_argument(
+        "--drain-timeout",
+        type=float,
+        default=settings.SERVER_DRAIN_TIMEOUT_SECONDS,
+        help="seconds requests in flight get to finish on shutdown",
+    )
+    parser.add_argument("--access-log", action="store_true", help="log every request (uvicorn access log)")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    serve(args.host, args.port, args.workers, args.drain_timeout, args.access_log)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from typing import Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -22,7 +23,138 @@ class Settings(BaseSettings):
         else {}
     )
 
+    # Contracts and their events are spread over this many databases by a hash
+    # of contract_number. Shard 0 is ASYNC_DATABASE_URL, the others use
+    # DB_SHARD_URL_TEMPLATE. Changing it requires `python -m app.cli.rebalance`.
+    DB_SHARD_COUNT: int = 1
+    DB_SHARD_URL_TEMPLATE: str = f"sqlite+aiosqlite:///{BASE_DIR / 'eo_tech_challenge_async_shard{shard}.db'}"
+    # Startup only checks the schema version; set to apply pending migrations instead
+    DB_AUTO_MIGRATE: bool = False
+
     DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
 
+    # Maximum number of events accepted by POST /event/batch
+    EVENT_BATCH_MAX_SIZE: int = 1000
+
+    # WebSocket ingest (/ws/events): unacknowledged events per connection
+    # before the server stops reading, and tasks processing them
+    WS_INGEST_MAX_IN_FLIGHT: int = 256
+    WS_INGEST_WORKERS: int = 4
+
+    # Admission control of POST /event, /event/batch and /jobs/*
+    ADMISSION_ENABLED: bool = True
+    # Concurrent requests, adapted between the min and max to observed latency
+    ADMISSION_INITIAL_LIMIT: int = 32
+    ADMISSION_MIN_LIMIT: int = 4
+    ADMISSION_MAX_LIMIT: int = 256
+    ADMISSION_QUEUE_SIZE: int = 64
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 0.5
+    # The limit shrinks while latency exceeds the best recent latency by this factor
+    ADMISSION_LATENCY_TOLERANCE: float = 2.0
+    # Set by the gateway to identify producers for fair sharing, else the client address
+    ADMISSION_CLIENT_HEADER: str = "X-Client-Id"
+
+    # Timeline changes kept in memory for change feed clients to resume from
+    CHANGE_FEED_BUFFER_SIZE: int = 10000
+    # Comment lines sent on idle SSE streams so proxies keep them open
+    CHANGE_FEED_KEEPALIVE_SECONDS: float = 15.0
+    CHANGE_FEED_MAX_WAIT_SECONDS: float = 30.0
+
+    # Keep every contract's component state in memory and validate events and
+    # serve timelines from it; this process must be the only writer unless
+    # CACHE_COHERENCE_INTERVAL_SECONDS is set
+    STATE_STORE_ENABLED: bool = False
+    # Contracts beyond this estimate are read from the database instead
+    STATE_STORE_MAX_BYTES: int = 512 * 1024 * 1024
+    # Snapshot of the store, loaded at startup instead of rebuilding it
+    STATE_SNAPSHOT_PATH: Path = BASE_DIR / "state.snapshot"
+    # Also written on shutdown; None only writes it on shutdown
+    STATE_SNAPSHOT_INTERVAL_SECONDS: Optional[float] = 300.0
+
+    # Counting Bloom filter over contract numbers, answering events and reads
+    # for unknown contracts without a query; this process must be the only
+    # writer unless CACHE_COHERENCE_INTERVAL_SECONDS is set
+    CONTRACT_FILTER_ENABLED: bool = False
+    # Contracts the filter is sized for at CONTRACT_FILTER_FALSE_POSITIVE_RATE,
+    # about 10 bytes per contract at 1%
+    CONTRACT_FILTER_CAPACITY: int = 1_000_000
+    CONTRACT_FILTER_FALSE_POSITIVE_RATE: float = 0.01
+
+    # Several processes writing the same databases (see app.cli.serve): writes
+    # of contracts are logged in contract_change, and every process applies
+    # the writes of the others to its state store, contract filter and change
+    # feed this often. None: this process is the only writer
+    CACHE_COHERENCE_INTERVAL_SECONDS: Optional[float] = None
+    # Change log entries older than this are pruned
+    CACHE_COHERENCE_RETENTION_SECONDS: float = 3600.0
+
+    # Server (python -m app.cli.serve)
+    SERVER_HOST: str = "127.0.0.1"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 1
+    # Time requests in flight and open streams get to finish on shutdown
+    SERVER_DRAIN_TIMEOUT_SECONDS: float = 30.0
+    # With several workers, the one holding this lock resumes import jobs,
+    # writes state snapshots and prunes the change log
+    SERVER_PRIMARY_LOCK_PATH: Path = BASE_DIR / "server.lock"
+
+    # Append-only archive of the events of terminated components
+    ARCHIVE_DIR: Path = BASE_DIR / "archive"
+
+    # Bulk import jobs
+    JOBS_DIR: Path = BASE_DIR / "jobs"
+    # Concurrent workers per job, lines are partitioned by contract_number
+    JOB_WORKERS: int = 4
+    # Lines committed together; a restart resumes at the last committed chunk
+    JOB_CHUNK_SIZE: int = 500
+
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = False
+    # Write records from a background thread instead of the event loop
+    LOG_ENQUEUE: bool = True
+    # Fraction (0.0 - 1.0) of high-volume INFO records that are emitted
+    LOG_INFO_SAMPLE_RATE: float = 1.0
+
+    # Metrics
+    METRICS_ENABLED: bool = True
+
+    # Profiling (requests opt in by sending PROFILING_HEADER)
+    PROFILING_ENABLED: bool = False
+    PROFILING_HEADER: str = "X-Profile"
+    PROFILING_OUTPUT_DIR: Path = BASE_DIR / "profiles"
+    PROFILING_SAMPLE_INTERVAL_MS: float = 1.0
+    # Requests slower than this are logged with their SQL statements, None disables
+    SLOW_REQUEST_THRESHOLD_MS: Optional[float] = None
+    # Adds X-DB-Query-Count to responses and warns about exceeded query budgets
+    QUERY_COUNT_HEADER: bool = os.getenv("DEBUG", "false").lower() == "true"
+
+    # Traffic capture for benchmarks.replay
+    CAPTURE_ENABLED: bool = False
+    CAPTURE_PATH: Path = BASE_DIR / "capture.ndjson"
+    # Fraction (0.0 - 1.0) of requests recorded
+    CAPTURE_SAMPLE_RATE: float = 1.0
+    # Larger request or response bodies are recorded by size only
+    CAPTURE_MAX_BODY_BYTES: int = 65536
+    # Records are dropped once the file reaches this size
+    CAPTURE_MAX_FILE_BYTES: int = 1 << 30
+    # Request headers kept in the capture, all others are dropped
+    CAPTURE_HEADERS: list[str] = ["content-type", "x-client-id", "idempotency-key"]
+
+    # Memory diagnostics (GET /debug/memory)
+    MEMORY_DIAGNOSTICS_ENABLED: bool = False
+    # Frames recorded per allocation by tracemalloc, 0 leaves it off since it slows allocations down
+    MEMORY_TRACEMALLOC_FRAMES: int = 0
+    # Seconds between samples exported as memory_* metrics, None disables
+    MEMORY_SAMPLE_INTERVAL_SECONDS: Optional[float] = None
+    # Per-contract history loads above this are logged, history listings are cut to the newest ones
+    HISTORY_LOAD_MAX_EVENTS: int = 10000
+
+    # Tracing
+    TRACING_ENABLED: bool = False
+    # "jsonl" appends spans to TRACING_OUTPUT_PATH, "memory" keeps them in-process
+    TRACING_EXPORTER: str = "jsonl"
+    TRACING_OUTPUT_PATH: Path = BASE_DIR / "traces.jsonl"
+
 
 settings = Settings()
@@ -0,0 +1,260 @@
+"""
+Admission control for the ingest endpoints.
+
+At most ``limit`` requests run at once, a few more wait in a short queue and
+everything beyond is answered right away with 503 and Retry-After, instead
+of piling up on the database until clients time out and retry. The limit
+adapts to the latency of admitted requests, which is dominated by database
+waits: it shrinks while latency is well above the best latency seen
+recently and grows again while requests use all slots at normal latency.
+
+While all slots are taken, each client may hold at most its fair share of
+them (running and queued), so a flooding producer gets 429 while the others
+keep being served. Clients are identified by ADMISSION_CLIENT_HEADER, set by
+the upstream gateway, or else by their address.
+"""
+import asyncio
+import json
+import math
+import time
+from collections import Counter, deque
+from typing import Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import settings
+from app.core.memory import StructureSize, track
+from app.core.metrics import (
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_LIMIT,
+    ADMISSION_QUEUED,
+    ADMISSION_REJECTED,
+)
+
+# (method, path) of the requests that go through admission control; paths
+# ending in "/" match as a prefix
+ADMITTED_ROUTES = (
+    ("POST", "/event"),
+    ("POST", "/event/batch"),
+    ("POST", "/jobs/"),
+)
+
+# Weight of the newest latency sample in the smoothed latency
+_SMOOTHING = 0.2
+# Growth of the latency baseline per sample, so it follows a database that
+# became slower for good instead of shedding load forever
+_BASELINE_DRIFT = 1.001
+_DECREASE_FACTOR = 0.9
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Adaptive concurrency limit with a bounded FIFO queue, for one event loop."""
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        queue_size: int,
+        queue_timeout: float,
+        latency_tolerance: float,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self._queue: deque[tuple[str, asyncio.Future]] = deque()
+        # Running plus queued requests per client
+        self._clients: Counter[str] = Counter()
+        self._smoothed: Optional[float] = None
+        self._baseline: Optional[float] = None
+        self._samples_since_decrease = 0
+        self._report()
+
+    @property
+    def capacity(self) -> int:
+        return max(1, int(self.limit))
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def fair_share(self, client: str) -> int:
+        active = len(self._clients) + (client not in self._clients)
+        return max(1, math.ceil(self.capacity / active))
+
+    def retry_after(self) -> int:
+        """Seconds until the queue ahead has likely drained."""
+        latency = self._smoothed or 0.0
+        return max(1, math.ceil((len(self._queue) + 1) * latency / self.capacity))
+
+    def _report(self) -> None:
+        ADMISSION_LIMIT.set(self.capacity)
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+        ADMISSION_QUEUED.set(len(self._queue))
+
+    def _leave(self, client: str) -> None:
+        self._clients[client] -= 1
+        if self._clients[client] <= 0:
+            del self._clients[client]
+
+    async def acquire(self, client: str) -> None:
+        """Wait for a slot, or raise AdmissionRejected."""
+        if self.in_flight < self.capacity and not self._queue:
+            self.in_flight += 1
+            self._clients[client] += 1
+            self._report()
+            return
+
+        if self._clients[client] >= self.fair_share(client):
+            raise AdmissionRejected(429, "client_quota", self.retry_after())
+        if len(self._queue) >= self.queue_size:
+            raise AdmissionRejected(503, "queue_full", self.retry_after())
+
+        granted = asyncio.get_running_loop().create_future()
+        entry = (client, granted)
+        self._queue.append(entry)
+        self._clients[client] += 1
+        self._report()
+        try:
+            await asyncio.wait_for(asyncio.shield(granted), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if granted.done():
+                return
+            self._abandon(entry)
+            raise AdmissionRejected(503, "queue_timeout", self.retry_after())
+        except asyncio.CancelledError:
+            if granted.done():
+                self.release(client)
+            else:
+                self._abandon(entry)
+            raise
+
+    def _abandon(self, entry: tuple[str, asyncio.Future]) -> None:
+        self._queue.remove(entry)
+        entry[1].cancel()
+        self._leave(entry[0])
+        self._report()
+
+    def release(self, client: str, latency: Optional[float] = None) -> None:
+        """Free a slot, passing it to the next queued request."""
+        self.in_flight -= 1
+        self._leave(client)
+        if latency is not None:
+            self._observe(latency)
+        while self._queue and self.in_flight < self.capacity:
+            _, granted = self._queue.popleft()
+            self.in_flight += 1
+            granted.set_result(None)
+        self._report()
+
+    def _observe(self, latency: float) -> None:
+        saturated = self.in_flight + 1 >= self.capacity
+        if self._smoothed is None:
+            self._smoothed = latency
+        else:
+            self._smoothed += _SMOOTHING * (latency - self._smoothed)
+        if self._baseline is None or self._smoothed < self._baseline:
+            self._baseline = self._smoothed
+        else:
+            self._baseline *= _BASELINE_DRIFT
+
+        self._samples_since_decrease += 1
+        if self._smoothed > self._baseline * self.latency_tolerance:
+            # At most once per limit's worth of completions, so a single slow
+            # burst does not collapse the limit
+            if self._samples_since_decrease >= self.capacity:
+                self.limit = max(self.min_limit, self.limit * _DECREASE_FACTOR)
+                self._samples_since_decrease = 0
+        elif saturated:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+
+def _admitted(scope: Scope) -> bool:
+    method, path = scope["method"], scope["path"]
+    return any(
+        method == admitted_method
+        and (path == route or (route.endswith("/") and path.startswith(route)))
+        for admitted_method, route in ADMITTED_ROUTES
+    )
+
+
+def client_id(scope: Scope) -> str:
+    header = settings.ADMISSION_CLIENT_HEADER.lower().encode()
+    for name, value in scope.get("headers", ()):
+        if name == header and value:
+            return value.decode("latin-1")
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+async def _send_rejection(send: Send, exc: AdmissionRejected) -> None:
+    detail = (
+        "Too many requests from this client, retry later."
+        if exc.status_code == 429
+        else "Service is saturated, retry later."
+    )
+    body = json.dumps({"detail": detail}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": exc.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(exc.retry_after).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware applying ``admission_controller`` to ADMITTED_ROUTES."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.ADMISSION_ENABLED or not _admitted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        client = client_id(scope)
+        try:
+            await admission_controller.acquire(client)
+        except AdmissionRejected as exc:
+            ADMISSION_REJECTED.inc(exc.reason)
+            await _send_rejection(send, exc)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # Batches and uploads take as long as they are big, only single
+            # events are comparable latency samples
+            latency = time.perf_counter() - started if scope["path"] == "/event" else None
+            admission_controller.release(client, latency)
+
+
+admission_controller = AdmissionController(
+    initial_limit=settings.ADMISSION_INITIAL_LIMIT,
+    min_limit=settings.ADMISSION_MIN_LIMIT,
+    max_limit=settings.ADMISSION_MAX_LIMIT,
+    queue_size=settings.ADMISSION_QUEUE_SIZE,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    latency_tolerance=settings.ADMISSION_LATENCY_TOLERANCE,
+)
+track("admission_queue", lambda: StructureSize(admission_controller.queued))
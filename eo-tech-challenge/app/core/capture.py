@@ -0,0 +1,179 @@
+"""
+Opt-in capture of production traffic, replayed by ``benchmarks.replay``.
+
+With CAPTURE_ENABLED a sample (CAPTURE_SAMPLE_RATE) of HTTP requests is
+appended to CAPTURE_PATH as NDJSON: method, path, query, route, the request
+headers listed in CAPTURE_HEADERS, the request and response bodies, status,
+start time and duration. Everything else is dropped, so credentials, cookies
+and client addresses never reach the file; bodies above
+CAPTURE_MAX_BODY_BYTES are recorded by size only.
+
+The middleware only copies body chunks and hands the record to a bounded
+queue; a background thread serializes and writes it. When the queue is full
+or the file reached CAPTURE_MAX_FILE_BYTES, records are dropped and counted
+in ``capture_records_total`` instead of slowing requests down.
+"""
+import json
+import queue
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.core.memory import StructureSize, track
+from app.core.metrics import CAPTURE_RECORDS
+from app.core.middleware import route_template
+
+# Operational endpoints, not part of the workload, and the change feed
+# stream, which lasts as long as its client
+EXCLUDED_PREFIXES = ("/metrics", "/debug", "/changes/stream")
+
+# Records waiting for the writer thread
+QUEUE_SIZE = 10000
+
+
+class CaptureWriter:
+    """Appends captured requests to ``path`` from a background thread."""
+
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._queue: queue.Queue[Optional[dict[str, Any]]] = queue.Queue(QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._run, name="traffic-capture", daemon=True)
+        self._thread.start()
+
+    def record(self, entry: dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            CAPTURE_RECORDS.inc("dropped")
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as output:
+            size = output.tell()
+            while (entry := self._queue.get()) is not None:
+                line = json.dumps(entry) + "\n"
+                if size + len(line) > self.max_bytes:
+                    CAPTURE_RECORDS.inc("dropped")
+                    continue
+                output.write(line)
+                size += len(line)
+                CAPTURE_RECORDS.inc("written")
+                if self._queue.empty():
+                    output.flush()
+
+
+# None while capture is disabled
+_writer: Optional[CaptureWriter] = None
+
+
+track("capture_queue", lambda: StructureSize(_writer.pending() if _writer is not None else 0))
+
+
+def configure_capture() -> None:
+    set_writer(
+        CaptureWriter(settings.CAPTURE_PATH, settings.CAPTURE_MAX_FILE_BYTES)
+        if settings.CAPTURE_ENABLED
+        else None
+    )
+
+
+def set_writer(writer: Optional[CaptureWriter]) -> None:
+    global _writer
+    if _writer is not None and _writer is not writer:
+        _writer.shutdown()
+    _writer = writer
+
+
+def shutdown_capture() -> None:
+    set_writer(None)
+
+
+def _body(chunks: list[bytes], size: int) -> Optional[str]:
+    if size > settings.CAPTURE_MAX_BODY_BYTES:
+        return None
+    return b"".join(chunks).decode("utf-8", errors="replace")
+
+
+class CaptureMiddleware:
+    """Pure ASGI middleware recording sampled requests for replay."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        writer = _writer
+        if (
+            writer is None
+            or scope["type"] != "http"
+            or scope["path"].startswith(EXCLUDED_PREFIXES)
+            or (settings.CAPTURE_SAMPLE_RATE < 1.0 and random.random() >= settings.CAPTURE_SAMPLE_RATE)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        limit = settings.CAPTURE_MAX_BODY_BYTES
+        request_chunks: list[bytes] = []
+        response_chunks: list[bytes] = []
+        request_size = response_size = 0
+        status_code = 500
+
+        async def receive_wrapper() -> Message:
+            nonlocal request_size
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                request_size += len(body)
+                if request_size <= limit:
+                    request_chunks.append(body)
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                response_size += len(body)
+                if response_size <= limit:
+                    response_chunks.append(body)
+            await send(message)
+
+        kept = {name.lower().encode() for name in settings.CAPTURE_HEADERS}
+        started_at = time.time()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            writer.record(
+                {
+                    "ts": started_at,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": scope["query_string"].decode("latin-1"),
+                    "route": route_template(scope),
+                    "headers": {
+                        name.decode("latin-1"): value.decode("latin-1")
+                        for name, value in scope["headers"]
+                        if name in kept
+                    },
+                    "body": _body(request_chunks, request_size),
+                    "body_bytes": request_size,
+                    "status": status_code,
+                    "response": _body(response_chunks, response_size),
+                    "response_bytes": response_size,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                }
+            )
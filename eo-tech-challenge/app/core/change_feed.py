@@ -0,0 +1,172 @@
+"""
+In-process feed of timeline changes.
+
+Accepted events that change a component's timeline are appended to a
+bounded ring buffer with a sequence number. Readers keep a cursor
+(``<epoch>:<sequence>``) and resume from it after reconnecting; a cursor that
+fell out of the buffer, or one from before a restart (other epoch), asks the
+client to reload the timelines it follows.
+
+Publishing is O(1) for the ingest path: waking the waiting subscribers is
+scheduled on the event loop instead of done inline.
+"""
+import asyncio
+import sys
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from datetime import date
+from itertools import islice
+from typing import Optional
+
+from app.config import settings
+from app.core.memory import StructureSize, track
+from app.core.metrics import CHANGE_FEED_PUBLISHED
+
+
+@dataclass(frozen=True, slots=True)
+class TimelineChange:
+    sequence: int
+    contract_number: str
+    component: str
+    start: Optional[date]
+    end: Optional[date]
+    event_type: str
+
+    def to_dict(self) -> dict:
+        return {
+            "sequence": self.sequence,
+            "contract_number": self.contract_number,
+            "component": self.component,
+            "start": self.start.isoformat() if self.start else None,
+            "end": self.end.isoformat() if self.end else None,
+            "event_type": self.event_type,
+        }
+
+
+@dataclass(slots=True)
+class FeedPage:
+    changes: list[TimelineChange]
+    # Cursor to continue from, past every change scanned for this page
+    cursor: str
+    # The requested cursor could not be resumed, followed timelines must be reloaded
+    reset: bool = False
+
+
+class ChangeFeed:
+    def __init__(self, capacity: int):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._changes: deque[TimelineChange] = deque(maxlen=capacity)
+        self._last_sequence = 0
+        self._waiters: set[asyncio.Future] = set()
+        self._wake_scheduled = False
+
+    def __len__(self) -> int:
+        return len(self._changes)
+
+    def nbytes(self) -> int:
+        """Estimated memory of the buffer, from the size of its newest change."""
+        if not self._changes:
+            return sys.getsizeof(self._changes)
+        change = self._changes[-1]
+        per_change = sys.getsizeof(change) + sum(
+            sys.getsizeof(value) for value in (change.contract_number, change.component, change.start, change.end)
+        )
+        return sys.getsizeof(self._changes) + per_change * len(self._changes)
+
+    def cursor(self, sequence: Optional[int] = None) -> str:
+        return f"{self.epoch}:{self._last_sequence if sequence is None else sequence}"
+
+    def _parse_cursor(self, cursor: Optional[str]) -> Optional[int]:
+        """Sequence of a cursor of this feed, None when it cannot be resumed."""
+        if cursor is None:
+            return self._last_sequence
+        epoch, _, sequence = cursor.partition(":")
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        sequence = int(sequence)
+        oldest = self._changes[0].sequence if self._changes else self._last_sequence + 1
+        if sequence > self._last_sequence or sequence < oldest - 1:
+            return None
+        return sequence
+
+    def publish(
+        self,
+        contract_number: str,
+        component: str,
+        start: Optional[date],
+        end: Optional[date],
+        event_type: str,
+    ) -> TimelineChange:
+        self._last_sequence += 1
+        change = TimelineChange(self._last_sequence, contract_number, component, start, end, event_type)
+        self._changes.append(change)
+        CHANGE_FEED_PUBLISHED.inc()
+        if self._waiters and not self._wake_scheduled:
+            self._wake_scheduled = True
+            asyncio.get_running_loop().call_soon(self._wake)
+        return change
+
+    def _wake(self) -> None:
+        self._wake_scheduled = False
+        waiters, self._waiters = self._waiters, set()
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def read(
+        self,
+        cursor: Optional[str],
+        contract_number: Optional[str] = None,
+        component: Optional[str] = None,
+        limit: int = 100,
+    ) -> FeedPage:
+        """Changes after ``cursor`` matching the filters, without waiting."""
+        after = self._parse_cursor(cursor)
+        if after is None:
+            return FeedPage(changes=[], cursor=self.cursor(), reset=True)
+
+        oldest = self._changes[0].sequence if self._changes else after + 1
+        changes = []
+        scanned = after
+        for change in islice(self._changes, max(after + 1 - oldest, 0), None):
+            scanned = change.sequence
+            if (contract_number is None or change.contract_number == contract_number) and (
+                component is None or change.component == component
+            ):
+                changes.append(change)
+                if len(changes) == limit:
+                    break
+        return FeedPage(changes=changes, cursor=self.cursor(scanned))
+
+    async def wait(self, timeout: float) -> None:
+        """Wait up to ``timeout`` seconds for the next publish."""
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._waiters.discard(waiter)
+
+    async def poll(
+        self,
+        cursor: Optional[str],
+        timeout: float,
+        contract_number: Optional[str] = None,
+        component: Optional[str] = None,
+        limit: int = 100,
+    ) -> FeedPage:
+        """Like read, but wait up to ``timeout`` seconds for a matching change."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        page = self.read(cursor, contract_number, component, limit)
+        while not page.changes and not page.reset and (remaining := deadline - loop.time()) > 0:
+            await self.wait(remaining)
+            page = self.read(page.cursor, contract_number, component, limit)
+        return page
+
+
+change_feed = ChangeFeed(settings.CHANGE_FEED_BUFFER_SIZE)
+track("change_feed", lambda: StructureSize(len(change_feed), change_feed.nbytes()))
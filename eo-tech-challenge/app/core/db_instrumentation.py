@@ -0,0 +1,121 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Iterator, NamedTuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core import tracing
+from app.core.metrics import (
+    DB_POOL_CHECKOUT_DURATION,
+    DB_QUERIES_TOTAL,
+    DB_QUERY_DURATION,
+)
+
+_STATEMENT_KINDS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+
+class CapturedStatement(NamedTuple):
+    statement: str
+    kind: str
+    duration_ms: float
+
+
+# Active statement captures of the current context, innermost last.
+# SQLAlchemy runs the cursor hooks in a greenlet that shares the calling
+# task's context, so lists registered by a middleware are visible here.
+_captures: ContextVar[tuple[list[CapturedStatement], ...]] = ContextVar(
+    "statement_captures", default=()
+)
+
+
+@contextmanager
+def capture_statements() -> Iterator[list[CapturedStatement]]:
+    """
+    Collect every statement executed in the current context.
+
+    Captures nest: an outer capture still sees the statements recorded while
+    an inner one is active.
+    """
+    statements: list[CapturedStatement] = []
+    token = _captures.set(_captures.get() + (statements,))
+    try:
+        yield statements
+    finally:
+        _captures.reset(token)
+
+
+def statement_kind(statement: str) -> str:
+    """Classify a SQL statement by its leading keyword."""
+    head = statement.lstrip()[:6].upper()
+    return head if head in _STATEMENT_KINDS else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = None
+    if tracing.is_enabled():
+        span = tracing.new_span(
+            "db", tracing.current_span(), kind=statement_kind(statement), statement=statement
+        )
+    conn.info.setdefault("query_started", []).append((time.perf_counter(), span))
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started, span = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    kind = statement_kind(statement)
+    if span is not None:
+        # sqlite3 reports -1 for SELECT, the CRUD spans carry row counts for reads
+        span.set_attribute("rowcount", cursor.rowcount)
+        tracing.finish_span(span, started)
+
+    DB_QUERIES_TOTAL.inc(kind)
+    DB_QUERY_DURATION.observe(elapsed, kind)
+
+    captures = _captures.get()
+    if captures:
+        captured = CapturedStatement(statement, kind, round(elapsed * 1000, 3))
+        for statements in captures:
+            statements.append(captured)
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute, drop its start time
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+
+
+def _timed_checkout(connect):
+    @wraps(connect)
+    def wrapper():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            DB_POOL_CHECKOUT_DURATION.observe(time.perf_counter() - started)
+
+    return wrapper
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Attach statement and pool checkout instrumentation to an engine.
+
+    The cursor hooks run synchronously inside SQLAlchemy's greenlet and only do
+    a clock read plus a dict update per statement. SQLAlchemy has no event
+    fired before a pool checkout starts, so ``Pool.connect`` is wrapped instead.
+    Calling this twice on the same engine is a no-op.
+    """
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+    pool = sync_engine.pool
+    pool.connect = _timed_checkout(pool.connect)
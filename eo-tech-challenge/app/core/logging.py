@@ -0,0 +1,60 @@
+import random
+import sys
+
+from loguru import logger
+
+from app.config import settings
+
+_TEXT_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | "
+    "<level>{level: <8}</level> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan> - <level>{message}</level> {extra}"
+)
+
+# Effective sample rate for info_sampled(); 0.0 when INFO is below the active level
+_info_sample_rate: float = settings.LOG_INFO_SAMPLE_RATE
+
+
+def configure_logging() -> None:
+    """
+    Replace loguru's default stderr sink with the configured one.
+
+    With LOG_ENQUEUE the sink only puts records on a queue, the actual write
+    happens in loguru's background thread so it never blocks the event loop.
+    Structured fields passed as keyword arguments end up in the record's
+    "extra" dict and are serialized as-is with LOG_JSON.
+    """
+    global _info_sample_rate
+
+    logger.remove()
+    logger.add(
+        sys.stderr,
+        level=settings.LOG_LEVEL,
+        format=_TEXT_FORMAT,
+        serialize=settings.LOG_JSON,
+        enqueue=settings.LOG_ENQUEUE,
+        backtrace=False,
+        diagnose=False,
+    )
+
+    info_enabled = logger.level(settings.LOG_LEVEL).no <= logger.level("INFO").no
+    _info_sample_rate = settings.LOG_INFO_SAMPLE_RATE if info_enabled else 0.0
+
+
+def info_sampled(message: str, **fields) -> None:
+    """
+    Log a high-volume INFO record, keeping only LOG_INFO_SAMPLE_RATE of them.
+
+    The record is dropped before loguru builds it, so skipped calls cost
+    a float comparison and nothing else.
+    """
+    if _info_sample_rate <= 0.0:
+        return
+    if _info_sample_rate < 1.0 and random.random() >= _info_sample_rate:
+        return
+    logger.opt(depth=1).info(message, **fields)
+
+
+async def shutdown_logging() -> None:
+    """Wait until every enqueued record has been written by the sink."""
+    await logger.complete()
@@ -0,0 +1,136 @@
+"""
+Memory diagnostics: process RSS, tracemalloc allocation sites and the sizes
+of named in-process structures.
+
+Modules holding long-lived structures (state store, contract filter, change
+feed, queues) register a sizer with ``track``. GET /debug/memory reports
+them on demand, and with MEMORY_SAMPLE_INTERVAL_SECONDS a sampler exports
+them as ``memory_*`` metrics. tracemalloc slows every allocation down, so it
+only runs with MEMORY_TRACEMALLOC_FRAMES > 0; each report asking for a diff
+compares against the snapshot taken by the previous one, showing what was
+allocated in between.
+"""
+import asyncio
+import os
+import sys
+import tracemalloc
+from typing import Callable, NamedTuple, Optional
+
+from loguru import logger
+
+from app.core.metrics import MEMORY_RSS, MEMORY_STRUCTURE_BYTES, MEMORY_STRUCTURE_ITEMS, MEMORY_TRACED
+
+
+class StructureSize(NamedTuple):
+    items: int
+    # None when the structure does not estimate its memory
+    bytes: Optional[int] = None
+
+
+_structures: dict[str, Callable[[], StructureSize]] = {}
+_previous_snapshot: Optional[tracemalloc.Snapshot] = None
+
+
+def track(name: str, sizer: Callable[[], StructureSize]) -> None:
+    """Report the structure ``name``, sized by ``sizer`` on the event loop."""
+    _structures[name] = sizer
+
+
+def structure_sizes() -> dict[str, StructureSize]:
+    return {name: sizer() for name, sizer in sorted(_structures.items())}
+
+
+def process_rss() -> int:
+    """Resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        # Peak rather than current without /proc; kilobytes except on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def start_tracemalloc(frames: int) -> None:
+    if frames > 0 and not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+        logger.info("tracemalloc started", frames=frames)
+
+
+def stop_tracemalloc() -> None:
+    global _previous_snapshot
+    _previous_snapshot = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def _site(traceback: tracemalloc.Traceback) -> str:
+    frame = traceback[0]
+    return f"{frame.filename}:{frame.lineno}"
+
+
+def tracemalloc_report(top: int, diff: bool) -> Optional[dict]:
+    """
+    Traced memory and its ``top`` allocation sites, None while not tracing.
+
+    Taking the snapshot blocks for a while on big heaps, call it in a thread.
+    """
+    global _previous_snapshot
+    if not tracemalloc.is_tracing():
+        return None
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        (tracemalloc.Filter(False, tracemalloc.__file__),)
+    )
+    current, peak = tracemalloc.get_traced_memory()
+    report = {
+        "traced_bytes": current,
+        "peak_bytes": peak,
+        "top": [
+            {"site": _site(stat.traceback), "bytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:top]
+        ],
+    }
+    if diff:
+        previous, _previous_snapshot = _previous_snapshot, snapshot
+        report["diff"] = (
+            None
+            if previous is None
+            else [
+                {
+                    "site": _site(stat.traceback),
+                    "bytes": stat.size,
+                    "bytes_diff": stat.size_diff,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in snapshot.compare_to(previous, "lineno")[:top]
+            ]
+        )
+    return report
+
+
+async def memory_report(top: int = 10, diff: bool = False) -> dict:
+    return {
+        "rss_bytes": process_rss(),
+        "structures": {name: size._asdict() for name, size in structure_sizes().items()},
+        "tracemalloc": await asyncio.to_thread(tracemalloc_report, top, diff),
+    }
+
+
+def sample_memory() -> None:
+    """Export the current sizes as metrics."""
+    MEMORY_RSS.set(process_rss())
+    for name, size in structure_sizes().items():
+        MEMORY_STRUCTURE_ITEMS.set(size.items, name)
+        if size.bytes is not None:
+            MEMORY_STRUCTURE_BYTES.set(size.bytes, name)
+    if tracemalloc.is_tracing():
+        MEMORY_TRACED.set(tracemalloc.get_traced_memory()[0])
+
+
+async def run_memory_sampler(interval: float) -> None:
+    """Sample every ``interval`` seconds until cancelled."""
+    while True:
+        sample_memory()
+        await asyncio.sleep(interval)
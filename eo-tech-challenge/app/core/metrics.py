@@ -0,0 +1,325 @@
+import math
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Iterable
+
+# Prometheus text exposition format version served by /metrics
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value):
+        return f"{int(value)}.0"
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric(ABC):
+    """
+    Base class for a metric family.
+
+    Label values are passed positionally, in the order of ``labelnames``.
+    Samples are kept in a plain dict keyed by the label values tuple; the lock
+    is uncontended on the event loop and only matters for the driver threads.
+    """
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+
+    @abstractmethod
+    def render(self) -> list[str]:
+        """Exposition lines of the family, header included."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop every sample."""
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0.0)
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        for labelvalues, value in sorted(self._values.items()):
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def dec(self, *labelvalues: str, amount: float = 1.0) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        with self._lock:
+            self._values[labelvalues] = value
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # labelvalues -> [per-bucket counts..., sum]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            sample = self._values.get(labelvalues)
+            if sample is None:
+                sample = self._values[labelvalues] = [0] * len(self.buckets) + [0.0]
+            sample[index] += 1
+            sample[-1] += value
+
+    def count(self, *labelvalues: str) -> int:
+        sample = self._values.get(labelvalues)
+        return sum(sample[:-1]) if sample else 0
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        for labelvalues, sample in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, sample):
+                cumulative += bucket_count
+                labels = _format_labels(
+                    self.labelnames + ("le",), labelvalues + (_format_value(bound),)
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(sample[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Registry:
+    """Holds metric families and renders them in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+registry = Registry()
+
+# HTTP
+HTTP_REQUEST_DURATION = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency by route template.",
+        ("method", "route"),
+    )
+)
+HTTP_REQUESTS_TOTAL = registry.register(
+    Counter(
+        "http_requests_total",
+        "HTTP requests by route template and status code.",
+        ("method", "route", "status"),
+    )
+)
+HTTP_REQUESTS_IN_FLIGHT = registry.register(
+    Gauge("http_requests_in_flight", "HTTP requests currently being served.")
+)
+
+# Events
+EVENTS_TOTAL = registry.register(
+    Counter(
+        "events_total",
+        "Processed events by type, verdict and rejection reason.",
+        ("type", "verdict", "reason"),
+    )
+)
+
+# Database
+DB_QUERIES_TOTAL = registry.register(
+    Counter("db_queries_total", "SQL statements executed by statement kind.", ("kind",))
+)
+DB_QUERY_DURATION = registry.register(
+    Histogram(
+        "db_query_duration_seconds",
+        "SQL statement execution time by statement kind.",
+        ("kind",),
+    )
+)
+DB_POOL_CHECKOUT_DURATION = registry.register(
+    Histogram(
+        "db_pool_checkout_seconds",
+        "Time spent waiting for a pooled connection.",
+    )
+)
+
+# Change feed
+CHANGE_FEED_PUBLISHED = registry.register(
+    Counter("change_feed_published_total", "Timeline changes published to the change feed.")
+)
+CHANGE_FEED_SUBSCRIBERS = registry.register(
+    Gauge("change_feed_subscribers", "Clients currently streaming or long-polling the change feed.")
+)
+
+# WebSocket ingest
+WS_INGEST_CONNECTIONS = registry.register(
+    Gauge("ws_ingest_connections", "Open WebSocket event ingest streams.")
+)
+
+# Admission control
+ADMISSION_LIMIT = registry.register(
+    Gauge("admission_limit", "Current adaptive limit of concurrently admitted ingest requests.")
+)
+ADMISSION_IN_FLIGHT = registry.register(
+    Gauge("admission_in_flight", "Ingest requests currently admitted.")
+)
+ADMISSION_QUEUED = registry.register(
+    Gauge("admission_queued", "Ingest requests waiting for admission.")
+)
+ADMISSION_REJECTED = registry.register(
+    Counter("admission_rejected_total", "Ingest requests shed by admission control.", ["reason"])
+)
+
+# State store
+STATE_STORE_CONTRACTS = registry.register(
+    Gauge("state_store_contracts", "Contracts held by the in-process state store.")
+)
+STATE_STORE_BYTES = registry.register(
+    Gauge("state_store_bytes", "Estimated memory used by the in-process state store.")
+)
+
+# Contract filter
+CONTRACT_FILTER_CONTRACTS = registry.register(
+    Gauge("contract_filter_contracts", "Contract numbers held by the contract filter.")
+)
+CONTRACT_FILTER_BYTES = registry.register(
+    Gauge("contract_filter_bytes", "Memory used by the counters of the contract filter.")
+)
+CONTRACT_FILTER_FALSE_POSITIVE_RATE = registry.register(
+    Gauge(
+        "contract_filter_false_positive_rate",
+        "Expected share of unknown contract numbers the contract filter lets through.",
+    )
+)
+CONTRACT_FILTER_LOOKUPS = registry.register(
+    Counter("contract_filter_lookups_total", "Contract filter lookups by result.", ("result",))
+)
+CONTRACT_FILTER_FALSE_POSITIVES = registry.register(
+    Counter(
+        "contract_filter_false_positives_total",
+        "Contract numbers let through by the contract filter that had no contract.",
+    )
+)
+
+# Cache coherence
+CACHE_COHERENCE_APPLIED = registry.register(
+    Counter(
+        "cache_coherence_applied_total",
+        "Writes of other processes applied to the caches of this one, by kind.",
+        ("kind",),
+    )
+)
+CACHE_COHERENCE_LAG = registry.register(
+    Gauge(
+        "cache_coherence_lag_seconds",
+        "Age of the oldest contract change of another process applied by the latest poll.",
+    )
+)
+CACHE_COHERENCE_RESYNCS = registry.register(
+    Counter(
+        "cache_coherence_resyncs_total",
+        "Cache rebuilds after the change log was pruned past this process's cursor.",
+    )
+)
+
+# Memory
+MEMORY_RSS = registry.register(
+    Gauge("memory_rss_bytes", "Resident set size of the process.")
+)
+MEMORY_TRACED = registry.register(
+    Gauge("memory_traced_bytes", "Memory allocated since tracemalloc started, while it runs.")
+)
+MEMORY_STRUCTURE_ITEMS = registry.register(
+    Gauge("memory_structure_items", "Entries held by named in-process structures.", ("name",))
+)
+MEMORY_STRUCTURE_BYTES = registry.register(
+    Gauge("memory_structure_bytes", "Estimated memory of named in-process structures.", ("name",))
+)
+HISTORY_LOADS_OVERSIZED = registry.register(
+    Counter(
+        "history_loads_oversized_total",
+        "Per-contract event history loads above HISTORY_LOAD_MAX_EVENTS, by action.",
+        ("action",),
+    )
+)
+
+# Traffic capture
+CAPTURE_RECORDS = registry.register(
+    Counter("capture_records_total", "Captured requests by result (written or dropped).", ("result",))
+)
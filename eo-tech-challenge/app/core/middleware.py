@@ -0,0 +1,56 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import (
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS_IN_FLIGHT,
+    HTTP_REQUESTS_TOTAL,
+)
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Return the matched route path (e.g. "/{contract_number}/contract_timeline").
+
+    FastAPI stores the matched route in the scope while routing, using the
+    template instead of the raw path keeps label cardinality bounded.
+    """
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording in-flight requests, latency and status codes.
+
+    Implemented without BaseHTTPMiddleware so the response is streamed through
+    untouched and the per-request overhead stays at a few dict operations.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = route_template(scope)
+            HTTP_REQUEST_DURATION.observe(elapsed, scope["method"], route)
+            HTTP_REQUESTS_TOTAL.inc(scope["method"], route, str(status_code))
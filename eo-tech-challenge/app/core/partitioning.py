@@ -0,0 +1,10 @@
+import zlib
+
+
+def stable_partition(key: str, partitions: int) -> int:
+    """
+    Map a key (e.g. a contract_number) to one of ``partitions`` buckets.
+
+    Uses crc32 rather than hash(), whose value changes between processes.
+    """
+    return zlib.crc32(key.encode()) % partitions
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from loguru import logger
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.core.db_instrumentation import CapturedStatement, capture_statements
+from app.core.middleware import route_template
+
+
+class SamplingProfiler:
+    """
+    Statistical CPU profiler for a single thread.
+
+    A daemon thread wakes up every ``interval`` seconds, grabs the target
+    thread's current frame and counts the collapsed stack, the format
+    understood by flamegraph.pl and speedscope. Since requests share the event
+    loop thread, samples also include whatever else the loop runs meanwhile;
+    time spent awaiting the database shows up as the selector wait.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self._thread_id = thread_id
+        self._interval = interval
+        self._stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> Counter[str]:
+        self._stop.set()
+        self._thread.join()
+        return self._stacks
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self._stacks[";".join(reversed(stack))] += 1
+
+
+def profile_path(profile_id: str) -> Path:
+    return Path(settings.PROFILING_OUTPUT_DIR) / f"{profile_id}.json"
+
+
+def _write_profile(profile_id: str, artifact: dict) -> None:
+    path = profile_path(profile_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(artifact))
+
+
+def _statements_as_dicts(statements: list[CapturedStatement]) -> list[dict]:
+    return [statement._asdict() for statement in statements]
+
+
+class ProfilingMiddleware:
+    """
+    Per-request SQL capture, opt-in CPU profiling and slow-request logging.
+
+    Nothing is recorded unless PROFILING_ENABLED or SLOW_REQUEST_THRESHOLD_MS
+    is set. A request carrying PROFILING_HEADER gets an ``X-Profile-Id``
+    response header; the artifact is written to PROFILING_OUTPUT_DIR once the
+    response is sent and can be downloaded from ``/debug/profiles/{id}``.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        threshold_ms = settings.SLOW_REQUEST_THRESHOLD_MS
+        if scope["type"] != "http" or (not settings.PROFILING_ENABLED and threshold_ms is None):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = None
+        if settings.PROFILING_ENABLED:
+            header = settings.PROFILING_HEADER.lower().encode()
+            if any(name == header for name, _ in scope["headers"]):
+                profile_id = uuid.uuid4().hex
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if profile_id is not None:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"x-profile-id", profile_id.encode()),
+                    ]
+            await send(message)
+
+        profiler = None
+        if profile_id is not None:
+            profiler = SamplingProfiler(
+                threading.get_ident(), settings.PROFILING_SAMPLE_INTERVAL_MS / 1000
+            )
+            profiler.start()
+
+        started = time.perf_counter()
+        with capture_statements() as statements:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+                stacks = profiler.stop() if profiler is not None else None
+
+        if threshold_ms is not None and elapsed_ms >= threshold_ms:
+            logger.warning(
+                "Slow request",
+                method=scope["method"],
+                path=scope["path"],
+                route=route_template(scope),
+                status=status_code,
+                latency_ms=elapsed_ms,
+                statements=_statements_as_dicts(statements),
+            )
+
+        if profile_id is not None:
+            artifact = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "duration_ms": elapsed_ms,
+                "sample_interval_ms": settings.PROFILING_SAMPLE_INTERVAL_MS,
+                "samples": sum(stacks.values()),
+                "stacks": dict(stacks.most_common()),
+                "statements": _statements_as_dicts(statements),
+            }
+            await asyncio.to_thread(_write_profile, profile_id, artifact)
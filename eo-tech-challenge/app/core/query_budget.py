@@ -0,0 +1,93 @@
+from typing import NamedTuple
+
+from loguru import logger
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.core.db_instrumentation import capture_statements
+from app.core.middleware import route_template
+
+
+class QueryBudget(NamedTuple):
+    """Maximum SQL statements for one request: ``fixed + per_item * items``."""
+
+    fixed: int
+    per_item: int = 0
+
+    def limit(self, items: int = 0) -> int:
+        return self.fixed + self.per_item * items
+
+
+# Declared statement budgets per (method, route template). A code change that
+# needs more statements has to update this table, the query budget tests fail
+# otherwise.
+QUERY_BUDGETS: dict[tuple[str, str], QueryBudget] = {
+    # idempotency key lookup, contract select, event history select, event insert
+    ("POST", "/event"): QueryBudget(4),
+    ("POST", "/event/batch"): QueryBudget(0, per_item=4),
+    # contract select, event history select
+    ("GET", "/{contract_number}/contract_timeline"): QueryBudget(2),
+    ("GET", "/{contract_number}/history"): QueryBudget(2),
+    # contract insert, plus its change log entry with CACHE_COHERENCE_INTERVAL_SECONDS
+    # (see app.state.coherence), as for every contract write
+    ("POST", "/contract/"): QueryBudget(2),
+    ("GET", "/contract/{contract_number}"): QueryBudget(1),
+    # contract select, generation bump, update, change log entry; one
+    # latest-events select per changed component the state store does not answer
+    ("PATCH", "/contract/{contract_number}"): QueryBudget(4, per_item=1),
+    # existence check, select for delete, event log state update, delete, change log entry
+    ("DELETE", "/contract/{contract_number}"): QueryBudget(5),
+    # one page select per shard; the stream reads its pages while responding
+    ("GET", "/events"): QueryBudget(1),
+    ("GET", "/events/stream"): QueryBudget(0),
+    # The change feed is served from memory
+    ("GET", "/changes"): QueryBudget(0),
+    ("GET", "/changes/stream"): QueryBudget(0),
+    # Processing happens in the background, the request only stores the job
+    ("POST", "/jobs/{kind}"): QueryBudget(1),
+    ("GET", "/jobs/{job_id}"): QueryBudget(1),
+    # existence check; results are streamed from a session of their own
+    ("GET", "/jobs/{job_id}/results"): QueryBudget(1),
+}
+
+
+def budget_for(method: str, route: str) -> QueryBudget | None:
+    return QUERY_BUDGETS.get((method, route))
+
+
+class QueryCountMiddleware:
+    """
+    Reports the number of SQL statements of a request in ``X-DB-Query-Count``.
+
+    Active with QUERY_COUNT_HEADER only. Requests over a fixed budget are
+    logged; per-item budgets depend on the payload and are left to the tests.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.QUERY_COUNT_HEADER:
+            await self.app(scope, receive, send)
+            return
+
+        with capture_statements() as statements:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"x-db-query-count", str(len(statements)).encode()),
+                    ]
+                    budget = budget_for(scope["method"], route_template(scope))
+                    if budget is not None and not budget.per_item and len(statements) > budget.fixed:
+                        logger.warning(
+                            "Query budget exceeded",
+                            method=scope["method"],
+                            route=route_template(scope),
+                            queries=len(statements),
+                            budget=budget.fixed,
+                        )
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,235 @@
+import inspect
+import json
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.core.middleware import route_template
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_time_ns: int
+    duration_ms: float = 0.0
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class InMemoryExporter:
+    """Keeps finished spans in a list, meant for tests."""
+
+    def __init__(self):
+        self.spans: list[Span] = []
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def shutdown(self) -> None:
+        pass
+
+
+class JsonLinesExporter:
+    """Appends finished spans, one JSON object per line, from a background thread."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._queue: queue.SimpleQueue[Optional[Span]] = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        self._queue.put(span)
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as output:
+            while (span := self._queue.get()) is not None:
+                output.write(json.dumps(span.to_dict(), default=str) + "\n")
+                if self._queue.empty():
+                    output.flush()
+
+
+# None while tracing is disabled; every instrumentation point checks it first
+_exporter: Optional[InMemoryExporter | JsonLinesExporter] = None
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def configure_tracing() -> None:
+    """Install the exporter selected by TRACING_EXPORTER when TRACING_ENABLED."""
+    if not settings.TRACING_ENABLED:
+        set_exporter(None)
+    elif settings.TRACING_EXPORTER == "memory":
+        set_exporter(InMemoryExporter())
+    else:
+        set_exporter(JsonLinesExporter(settings.TRACING_OUTPUT_PATH))
+
+
+def set_exporter(exporter: Optional[InMemoryExporter | JsonLinesExporter]) -> None:
+    global _exporter
+    if _exporter is not None and _exporter is not exporter:
+        _exporter.shutdown()
+    _exporter = exporter
+
+
+def shutdown_tracing() -> None:
+    set_exporter(None)
+
+
+def is_enabled() -> bool:
+    return _exporter is not None
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def new_span(name: str, parent: Optional[Span] = None, **attributes: Any) -> Span:
+    """Create a span as a child of ``parent`` (or a new trace) without activating it."""
+    return Span(
+        name=name,
+        trace_id=parent.trace_id if parent else f"{random.getrandbits(128):032x}",
+        span_id=f"{random.getrandbits(64):016x}",
+        parent_id=parent.span_id if parent else None,
+        start_time_ns=time.time_ns(),
+        attributes=attributes,
+    )
+
+
+def finish_span(span: Span, started: float) -> None:
+    span.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+    exporter = _exporter
+    if exporter is not None:
+        exporter.export(span)
+
+
+@contextmanager
+def start_span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Run the block inside a child span of the current one.
+
+    Yields None when tracing is disabled. The span is stored in a context
+    variable, so it follows the request across awaits and into SQLAlchemy's
+    greenlets without being passed around explicitly.
+    """
+    if _exporter is None:
+        yield None
+        return
+
+    span = new_span(name, _current_span.get(), **attributes)
+    token = _current_span.set(span)
+    started = time.perf_counter()
+    try:
+        yield span
+    except BaseException as exc:
+        span.set_attribute("error", type(exc).__name__)
+        raise
+    finally:
+        _current_span.reset(token)
+        finish_span(span, started)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """
+    Decorator wrapping a sync or async function call in a span.
+
+    With tracing disabled the wrapper only adds a global lookup to the call.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _exporter is None:
+                    return await func(*args, **kwargs)
+                with start_span(span_name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _exporter is None:
+                return func(*args, **kwargs)
+            with start_span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _parse_traceparent(value: bytes) -> Optional[Span]:
+    """Turn a W3C ``traceparent`` header into a remote parent span."""
+    parts = value.decode("latin-1").split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return Span(name="remote", trace_id=parts[1], span_id=parts[2], parent_id=None, start_time_ns=0)
+
+
+class TracingMiddleware:
+    """
+    Opens the root span of every HTTP request and returns its trace id.
+
+    The span is named after the matched route once routing is done and
+    continues the caller's trace when a ``traceparent`` header is sent.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or _exporter is None:
+            await self.app(scope, receive, send)
+            return
+
+        parent = None
+        for header_name, value in scope["headers"]:
+            if header_name == b"traceparent":
+                parent = _parse_traceparent(value)
+                break
+
+        span = new_span("http", parent, method=scope["method"], path=scope["path"])
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                span.set_attribute("status", message["status"])
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-trace-id", span.trace_id.encode()),
+                ]
+            await send(message)
+
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_span.reset(token)
+            span.name = f"{scope['method']} {route_template(scope)}"
+            finish_span(span, started)
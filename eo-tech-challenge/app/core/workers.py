@@ -0,0 +1,47 @@
+"""
+Worker processes of app.cli.serve.
+
+Every worker serves requests. One of them, the primary, also runs the
+background work that must happen once: resuming import jobs, writing state
+snapshots and pruning the change log. It is the worker holding an exclusive
+lock on SERVER_PRIMARY_LOCK_PATH, released by the operating system when the
+process exits, so the worker started in its place takes over.
+"""
+from pathlib import Path
+from typing import IO, Optional
+
+from loguru import logger
+
+from app.config import settings
+
+# Open while this process holds the lock
+_lock: Optional[IO] = None
+
+
+def acquire_primary(path: Path) -> bool:
+    """Whether this process is the primary; always true for a single worker."""
+    global _lock
+    if settings.SERVER_WORKERS <= 1 or _lock is not None:
+        return True
+    try:
+        import fcntl
+    except ImportError:
+        # No advisory locks on this platform, every worker acts as the primary
+        return True
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle = path.open("a")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    _lock = handle
+    logger.info("Primary worker", path=str(path))
+    return True
+
+
+def release_primary() -> None:
+    global _lock
+    if _lock is not None:
+        _lock.close()
+        _lock = None
@@ -0,0 +1,44 @@
+import uuid
+from datetime import datetime
+from typing import Sequence
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.tracing import traced
+from app.db.models.change import ContractChange
+
+# Identifies the changes written by this process, which its caches already hold
+ORIGIN = uuid.uuid4().hex
+
+
+def record_change(db: AsyncSession, contract_number: str, kind: str) -> None:
+    """
+    Log a write of ``contract_number`` for the caches of other processes.
+
+    Added to ``db`` so it commits with the write; nothing is logged while
+    this process is the only writer.
+    """
+    if settings.CACHE_COHERENCE_INTERVAL_SECONDS:
+        db.add(ContractChange(contract_number=contract_number, kind=kind, origin=ORIGIN))
+
+
+@traced()
+async def get_changes_after(db: AsyncSession, after_id: int, limit: int) -> Sequence[ContractChange]:
+    """Next page of the change log of one database."""
+    result = await db.scalars(
+        select(ContractChange).where(ContractChange.id > after_id).order_by(ContractChange.id).limit(limit)
+    )
+    return result.all()
+
+
+async def get_latest_change_id(db: AsyncSession) -> int:
+    return await db.scalar(select(func.coalesce(func.max(ContractChange.id), 0)))
+
+
+async def prune_changes(db: AsyncSession, before: datetime) -> int:
+    """Delete the changes logged before ``before``; returns how many."""
+    result = await db.execute(delete(ContractChange).where(ContractChange.created_at < before))
+    await db.commit()
+    return result.rowcount
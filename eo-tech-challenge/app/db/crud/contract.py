@@ -4,20 +4,25 @@ from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.tracing import traced
+from app.db.crud.change import record_change
+from app.db.crud.event import record_removal, record_update
 from app.db.models.contract import Contract
 from app.dto.contract import ContractPayload
 
 
+@traced()
 async def create_contract(db: AsyncSession, payload: ContractPayload) -> Contract:
     contract = Contract(
         contract_number=payload.contract_number,
         components=payload.components,
     )
     db.add(contract)
+    record_change(db, contract.contract_number, "created")
 
     try:
+        # id and created_at are generated client-side, no refresh needed
         await db.commit()
-        await db.refresh(contract)
     except SQLAlchemyError:
         await db.rollback()
         raise
@@ -25,22 +30,45 @@ async def create_contract(db: AsyncSession, payload: ContractPayload) -> Contrac
     return contract
 
 
-async def delete_contract(db: AsyncSession, contract_number: str) -> None:
+@traced()
+async def delete_contract(db: AsyncSession, contract_number: str) -> bool:
+    """Delete a contract; False when there was none."""
     try:
         contract = await db.scalar(
             select(Contract).where(Contract.contract_number == contract_number)
         )
 
         if not contract:
-            return
+            return False
 
+        await db.execute(record_removal(contract_number))
         await db.delete(contract)
+        record_change(db, contract_number, "deleted")
         await db.commit()
+        return True
 
     except SQLAlchemyError:
         await db.rollback()
         raise
 
 
+@traced()
+async def update_contract_components(
+    db: AsyncSession, contract: Contract, components: list[str]
+) -> Contract:
+    """Replace the components of ``contract``, loaded by ``db``, in one transaction."""
+    try:
+        await db.execute(record_update(contract.contract_number))
+        contract.components = components
+        record_change(db, contract.contract_number, "updated")
+        await db.commit()
+    except SQLAlchemyError:
+        await db.rollback()
+        raise
+
+    return contract
+
+
+@traced()
 async def get_contract(db: AsyncSession, contract_number: str) -> Optional[Contract]:
     return await db.scalar(select(Contract).where(Contract.contract_number == contract_number))
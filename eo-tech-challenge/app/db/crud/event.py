@@ -1,12 +1,28 @@
-from sqlalchemy import select
+from typing import Optional, Sequence
+
+from loguru import logger
+from sqlalchemy import Insert, Row, delete, func, literal, select, union_all
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models.event import Event
+from app.config import settings
+from app.core.metrics import HISTORY_LOADS_OVERSIZED
+from app.core.tracing import current_span, traced
+from app.db.crud.change import record_change
+from app.db.models.contract import Contract
+from app.db.models.event import ArchivedEventKey, Event, EventLogState
 from app.dto.event import EventPayload
 
 
-async def create_event(db: AsyncSession, payload: EventPayload, component_name: str) -> Event:
+@traced()
+async def create_event(
+    db: AsyncSession,
+    payload: EventPayload,
+    component_name: str,
+    idempotency_key: str,
+    payload_digest: Optional[str] = None,
+) -> Event:
     """Create a new event in the database."""
     event = Event(
         contract_number=payload.contract_number,
@@ -14,12 +30,14 @@ async def create_event(db: AsyncSession, payload: EventPayload, component_name:
         type=payload.type,
         date=payload.date,
         created_at=payload.created_at,
+        idempotency_key=idempotency_key,
+        payload_digest=payload_digest,
     )
     db.add(event)
 
     try:
+        # All column defaults are generated client-side, no refresh needed
         await db.commit()
-        await db.refresh(event)
     except SQLAlchemyError:
         await db.rollback()
         raise
@@ -27,6 +45,38 @@ async def create_event(db: AsyncSession, payload: EventPayload, component_name:
     return event
 
 
+@traced()
+async def get_payload_digest(
+    db: AsyncSession, contract_number: str, idempotency_key: str
+) -> Optional[str]:
+    """
+    Payload digest of the event stored under the given idempotency key.
+
+    None when no event has the key, an empty string for events stored
+    before digests were recorded.
+    """
+    return await db.scalar(
+        select(func.coalesce(Event.payload_digest, "")).where(
+            Event.contract_number == contract_number,
+            Event.idempotency_key == idempotency_key,
+        )
+    )
+
+
+@traced()
+async def get_archived_payload_digest(
+    db: AsyncSession, contract_number: str, idempotency_key: str
+) -> Optional[str]:
+    """get_payload_digest for archived events."""
+    return await db.scalar(
+        select(func.coalesce(ArchivedEventKey.payload_digest, "")).where(
+            ArchivedEventKey.contract_number == contract_number,
+            ArchivedEventKey.idempotency_key == idempotency_key,
+        )
+    )
+
+
+@traced()
 async def get_events_for_contract(
     db: AsyncSession, contract_number: str
 ) -> list[Event]:
@@ -39,4 +89,175 @@ async def get_events_for_contract(
         .where(Event.contract_number == contract_number)
         .order_by(Event.created_at)
     )
+    events = list(result.all())
+    span = current_span()
+    if span is not None:
+        span.set_attribute("rows", len(events))
+    if len(events) > settings.HISTORY_LOAD_MAX_EVENTS:
+        # The lifecycle rules need every event, so this load is only reported
+        HISTORY_LOADS_OVERSIZED.inc("logged")
+        logger.warning("Large history load", contract_number=contract_number, events=len(events))
+    return events
+
+
+@traced()
+async def get_recent_events_for_contract(
+    db: AsyncSession, contract_number: str, limit: int
+) -> tuple[list[Event], bool]:
+    """
+    The newest ``limit`` events of a contract, ordered by created_at, and
+    whether older ones were left out.
+    """
+    result = await db.scalars(
+        select(Event)
+        .where(Event.contract_number == contract_number)
+        .order_by(Event.created_at.desc())
+        .limit(limit + 1)
+    )
+    events = list(result.all())
+    truncated = len(events) > limit
+    del events[limit:]
+    events.reverse()
+    return events, truncated
+
+
+@traced()
+async def get_latest_events(
+    db: AsyncSession, contract_number: str, event_types: Sequence[str]
+) -> list[Row]:
+    """
+    The latest event by created_at of each of ``event_types``, as (type, date,
+    created_at) rows: one index seek per type, whatever the length of the
+    contract's history.
+    """
+    latest = [
+        select(Event.type, Event.date, Event.created_at)
+        .where(Event.contract_number == contract_number, Event.type == event_type)
+        .order_by(Event.created_at.desc())
+        .limit(1)
+        .subquery()
+        for event_type in event_types
+    ]
+    result = await db.execute(union_all(*(select(subquery) for subquery in latest)))
+    return list(result.all())
+
+
+@traced()
+async def get_contract_numbers_with_end_events(db: AsyncSession) -> list[str]:
+    """Contracts with at least one component end in the hot table."""
+    result = await db.scalars(
+        select(Event.contract_number).where(Event.type.endswith("_end")).distinct()
+    )
+    return list(result.all())
+
+
+@traced()
+async def delete_archived_events(
+    db: AsyncSession, contract: Contract, events: Sequence[Event]
+) -> None:
+    """
+    Delete archived events from the hot table.
+
+    Commits together with pending changes of ``contract``, i.e. its updated
+    archive summary, and with the idempotency keys of the archived events.
+    """
+    db.add(contract)
+    record_change(db, contract.contract_number, "archived")
+    try:
+        digests = {event.idempotency_key: event.payload_digest for event in events if event.idempotency_key}
+        if digests:
+            # Added as rows, not one multi-row insert, so each is routed to the contract's shard
+            stored = await db.scalars(
+                select(ArchivedEventKey.idempotency_key).where(
+                    ArchivedEventKey.contract_number == contract.contract_number,
+                    ArchivedEventKey.idempotency_key.in_(digests),
+                )
+            )
+            db.add_all(
+                ArchivedEventKey(
+                    contract_number=contract.contract_number, idempotency_key=key, payload_digest=digests[key]
+                )
+                for key in digests.keys() - set(stored.all())
+            )
+        await db.execute(
+            record_removal(contract.contract_number, [event.id for event in events])
+        )
+        await db.execute(
+            delete(Event).where(
+                Event.contract_number == contract.contract_number,
+                Event.id.in_([event.id for event in events]),
+            )
+        )
+        await db.commit()
+    except SQLAlchemyError:
+        await db.rollback()
+        raise
+
+
+def record_removal(contract_number: str, event_ids: Optional[Sequence] = None) -> Insert:
+    """
+    Statement recording that rows of a contract are about to be removed.
+
+    Raises the sequence floor over the contract's events (or ``event_ids``
+    only) so their sequences are never reused, and bumps the generation that
+    invalidates state snapshots. Run it in the deleting transaction.
+    """
+    events = Event.__table__
+    newest = select(literal(1), func.coalesce(func.max(events.c.sequence), 0), literal(1)).where(
+        events.c.contract_number == contract_number
+    )
+    if event_ids is not None:
+        newest = newest.where(events.c.id.in_(event_ids))
+    state = EventLogState.__table__
+    statement = insert(state).from_select(["id", "sequence_floor", "generation"], newest)
+    return statement.on_conflict_do_update(
+        index_elements=[state.c.id],
+        set_={
+            "sequence_floor": func.max(state.c.sequence_floor, statement.excluded.sequence_floor),
+            "generation": state.c.generation + 1,
+        },
+    )
+
+
+def record_update(contract_number: str) -> Insert:
+    """
+    Statement recording that a contract changed without any event: bumps the
+    generation that invalidates state snapshots. Run it in the updating
+    transaction.
+    """
+    contracts = Contract.__table__
+    state = EventLogState.__table__
+    # Selecting the contract routes the statement to its shard
+    changed = select(literal(1), literal(0), literal(1)).where(contracts.c.contract_number == contract_number)
+    statement = insert(state).from_select(["id", "sequence_floor", "generation"], changed)
+    return statement.on_conflict_do_update(
+        index_elements=[state.c.id], set_={"generation": state.c.generation + 1}
+    )
+
+
+async def get_latest_sequence(db: AsyncSession) -> int:
+    """Position of the newest event in the event log of one database."""
+    return await db.scalar(select(func.coalesce(func.max(Event.sequence), 0)))
+
+
+@traced()
+async def get_events_after(
+    db: AsyncSession,
+    after_sequence: int,
+    limit: int,
+    contract_number: Optional[str] = None,
+    component_name: Optional[str] = None,
+) -> list[Event]:
+    """
+    Next page of the event log of one database, an index seek on sequence.
+
+    The filters match the (contract_number, sequence) and (component_name,
+    sequence) indexes, so every page costs the same however deep it is.
+    """
+    query = select(Event).where(Event.sequence > after_sequence)
+    if contract_number is not None:
+        query = query.where(Event.contract_number == contract_number)
+    if component_name is not None:
+        query = query.where(Event.component_name == component_name)
+    result = await db.scalars(query.order_by(Event.sequence).limit(limit))
     return list(result.all())
@@ -0,0 +1,73 @@
+import uuid
+from typing import Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.job import ImportJob, ImportJobResult
+
+
+async def create_job(db: AsyncSession, job: ImportJob) -> ImportJob:
+    db.add(job)
+
+    try:
+        await db.commit()
+    except SQLAlchemyError:
+        await db.rollback()
+        raise
+
+    return job
+
+
+async def get_job(db: AsyncSession, job_id: uuid.UUID) -> Optional[ImportJob]:
+    return await db.get(ImportJob, job_id)
+
+
+async def get_unfinished_jobs(db: AsyncSession) -> Sequence[ImportJob]:
+    result = await db.scalars(
+        select(ImportJob)
+        .where(ImportJob.status.in_(("pending", "running")))
+        .order_by(ImportJob.created_at)
+    )
+    return result.all()
+
+
+async def save_job_progress(
+    db: AsyncSession, job: ImportJob, results: Sequence[ImportJobResult] = ()
+) -> None:
+    """Store the job's state together with the results of its latest chunk."""
+    db.add(job)
+    db.add_all(results)
+
+    try:
+        await db.commit()
+    except SQLAlchemyError:
+        await db.rollback()
+        raise
+
+
+async def save_job_results(db: AsyncSession, results: Sequence[ImportJobResult]) -> None:
+    """Store results of lines whose chunk is still in progress."""
+    if not results:
+        return
+    db.add_all(results)
+
+    try:
+        await db.commit()
+    except SQLAlchemyError:
+        await db.rollback()
+        raise
+
+
+async def get_job_results(
+    db: AsyncSession, job_id: uuid.UUID, after_line: int, limit: int
+) -> Sequence[ImportJobResult]:
+    """Page through a job's results in line order (keyset on line)."""
+    result = await db.scalars(
+        select(ImportJobResult)
+        .where(ImportJobResult.job_id == job_id, ImportJobResult.line > after_line)
+        .order_by(ImportJobResult.line)
+        .limit(limit)
+    )
+    return result.all()
@@ -0,0 +1,167 @@
+"""
+Numbered schema migrations, tracked per database in ``schema_version``.
+
+Startup only compares each shard's recorded version with LATEST_VERSION, the
+migrations themselves run from ``python -m app.cli.migrate`` (or at startup
+with DB_AUTO_MIGRATE). Every migration is idempotent: databases created by
+the former create_all on every boot can be at any point in history, so a
+migration checks for what it adds before adding it. New migrations are
+appended to MIGRATIONS and never changed once released.
+"""
+import asyncio
+from typing import Callable, NamedTuple
+
+from sqlalchemy import Column, Connection, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+
+from app.db.models import Base, ContractChange, Event, EventLogState
+from app.db.models.event import EVENT_SEQUENCE_TRIGGER
+from app.db.models.contract import utc_now
+from app.db.sharding import ShardSet, tables_for_shard
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    # Called with a connection inside the migration's transaction and the shard number
+    apply: Callable[[Connection, int], None]
+
+
+def _add_column(conn: Connection, table: str, column: str, ddl_type: str) -> None:
+    if column not in {c["name"] for c in inspect(conn).get_columns(table)}:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+
+
+def _create_tables(conn: Connection, shard: int) -> None:
+    Base.metadata.create_all(conn, tables=tables_for_shard(Base.metadata, shard))
+
+
+def _event_idempotency_key(conn: Connection, shard: int) -> None:
+    _add_column(conn, "event", "idempotency_key", "VARCHAR")
+    _add_column(conn, "event", "payload_digest", "VARCHAR")
+    conn.execute(
+        text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_event_contract_idempotency_key "
+            "ON event (contract_number, idempotency_key)"
+        )
+    )
+
+
+def _contract_archive_summary(conn: Connection, shard: int) -> None:
+    _add_column(conn, "contract", "archive_summary", "JSON")
+
+
+def _event_sequence(conn: Connection, shard: int) -> None:
+    _add_column(conn, "event", "sequence", "INTEGER")
+    # Existing events are numbered in insertion order
+    conn.execute(text("UPDATE event SET sequence = rowid WHERE sequence IS NULL"))
+    EventLogState.__table__.create(conn, checkfirst=True)
+    conn.execute(EVENT_SEQUENCE_TRIGGER)
+    for index in Event.__table__.indexes:
+        if index.name in ("ux_event_sequence", "ix_event_contract_sequence", "ix_event_component_sequence"):
+            index.create(conn, checkfirst=True)
+
+
+def _event_log_generation(conn: Connection, shard: int) -> None:
+    _add_column(conn, "event_log_state", "generation", "INTEGER NOT NULL DEFAULT 0")
+
+
+def _event_contract_type_index(conn: Connection, shard: int) -> None:
+    for index in Event.__table__.indexes:
+        if index.name == "ix_event_contract_type_created_at":
+            index.create(conn, checkfirst=True)
+
+
+def _contract_change(conn: Connection, shard: int) -> None:
+    ContractChange.__table__.create(conn, checkfirst=True)
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(1, "create tables", _create_tables),
+    Migration(2, "event.idempotency_key, its unique index and payload_digest", _event_idempotency_key),
+    Migration(3, "contract.archive_summary", _contract_archive_summary),
+    Migration(4, "event.sequence with the event log state and trigger", _event_sequence),
+    Migration(5, "event_log_state.generation", _event_log_generation),
+    Migration(6, "event index on (contract_number, type, created_at)", _event_contract_type_index),
+    Migration(7, "contract_change log", _contract_change),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def _current_version(conn: Connection) -> int:
+    if not inspect(conn).has_table(schema_version.name):
+        return 0
+    return conn.scalar(select(func.max(schema_version.c.version))) or 0
+
+
+def _migrate(conn: Connection, shard: int) -> list[int]:
+    schema_version.create(conn, checkfirst=True)
+    current = _current_version(conn)
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+        migration.apply(conn, shard)
+        conn.execute(
+            schema_version.insert().values(
+                version=migration.version,
+                description=migration.description,
+                applied_at=utc_now(),
+            )
+        )
+        applied.append(migration.version)
+    return applied
+
+
+async def schema_versions(shard_set: ShardSet) -> list[int]:
+    """The recorded schema version of every shard."""
+
+    async def version(engine) -> int:
+        async with engine.connect() as conn:
+            return await conn.run_sync(_current_version)
+
+    return list(await asyncio.gather(*(version(engine) for engine in shard_set.engines)))
+
+
+async def migrate(shard_set: ShardSet) -> dict[int, list[int]]:
+    """Bring every shard to LATEST_VERSION; returns the versions applied per shard."""
+    applied = {}
+    for shard, engine in enumerate(shard_set.engines):
+        # One transaction per shard, SQLite DDL is transactional
+        async with engine.begin() as conn:
+            applied[shard] = await conn.run_sync(_migrate, shard)
+    return applied
+
+
+async def check_schema(shard_set: ShardSet, auto_migrate: bool = False) -> None:
+    """
+    Fail fast unless every shard is at LATEST_VERSION.
+
+    Costs one query per shard when the schema is current.
+    """
+    versions = await schema_versions(shard_set)
+    if all(version == LATEST_VERSION for version in versions):
+        return
+    if any(version > LATEST_VERSION for version in versions):
+        raise SchemaVersionError(
+            f"Database schema versions {versions} are newer than this code ({LATEST_VERSION})"
+        )
+    if auto_migrate:
+        await migrate(shard_set)
+        return
+    raise SchemaVersionError(
+        f"Database schema versions {versions} are behind {LATEST_VERSION}, "
+        "run `python -m app.cli.migrate`"
+    )
@@ -1,4 +1,15 @@
+from app.db.models.change import ContractChange
 from app.db.models.contract import Base, Contract
-from app.db.models.event import Event
+from app.db.models.event import ArchivedEventKey, Event, EventLogState
+from app.db.models.job import ImportJob, ImportJobResult
 
-__all__ = ["Base", "Contract", "Event"]
+__all__ = [
+    "ArchivedEventKey",
+    "Base",
+    "Contract",
+    "ContractChange",
+    "Event",
+    "EventLogState",
+    "ImportJob",
+    "ImportJobResult",
+]
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.models.contract import Base, utc_now
+
+
+class ContractChange(Base):
+    """
+    A write to a contract that other processes apply to their caches, see
+    app.state.coherence. Events need no entry, the event log numbers them.
+    """
+
+    __tablename__ = "contract_change"
+    # Ids are never reused once pruned, cursors stay valid
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    contract_number: Mapped[str] = mapped_column(String, nullable=False)
+    # created, deleted, updated or archived
+    kind: Mapped[str] = mapped_column(String, nullable=False)
+    # Process that wrote it, see app.db.crud.change.ORIGIN
+    origin: Mapped[str] = mapped_column(String, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=utc_now
+    )
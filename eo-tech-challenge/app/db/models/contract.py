@@ -1,5 +1,6 @@
 import uuid
 from datetime import datetime, timezone
+from typing import Optional
 
 from sqlalchemy import DateTime, String, JSON
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
@@ -25,3 +26,5 @@ class Contract(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, default=utc_now
     )
+    # Latest start/end per archived component, see app.archive.archiver
+    archive_summary: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
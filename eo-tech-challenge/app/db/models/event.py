@@ -1,14 +1,46 @@
 import uuid
 from datetime import datetime, date
+from typing import Optional
 
-from sqlalchemy import DateTime, String, Date
+from sqlalchemy import DDL, Date, DateTime, Index, Integer, String
+from sqlalchemy.event import listen
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.models.contract import Base, utc_now
 
 
+# Numbers every inserted event with the next position in the event log of its
+# database. A trigger rather than a column default: SQLAlchemy turns ORM and
+# executemany batches into one multi-row VALUES on SQLite, whose rows would
+# all see the same max(sequence). The floor keeps sequences increasing when
+# the newest events are archived or moved to another shard.
+EVENT_SEQUENCE_TRIGGER = DDL(
+    "CREATE TRIGGER IF NOT EXISTS tr_event_sequence AFTER INSERT ON event "
+    "FOR EACH ROW WHEN NEW.sequence IS NULL BEGIN "
+    "UPDATE event SET sequence = (SELECT max("
+    "coalesce((SELECT max(sequence) FROM event), 0), "
+    "coalesce((SELECT sequence_floor FROM event_log_state WHERE id = 1), 0)) + 1) "
+    "WHERE rowid = NEW.rowid; END"
+)
+
+
 class Event(Base):
     __tablename__ = "event"
+    __table_args__ = (
+        # Deduplicates retried deliveries, see handle_event_creation
+        Index(
+            "ux_event_contract_idempotency_key",
+            "contract_number",
+            "idempotency_key",
+            unique=True,
+        ),
+        # Index seeks for the event log, see get_events_after
+        Index("ux_event_sequence", "sequence", unique=True),
+        Index("ix_event_contract_sequence", "contract_number", "sequence"),
+        Index("ix_event_component_sequence", "component_name", "sequence"),
+        # Latest event of a type, see get_latest_events
+        Index("ix_event_contract_type_created_at", "contract_number", "type", "created_at"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         default=uuid.uuid4, primary_key=True, index=True
@@ -20,3 +52,35 @@ class Event(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, default=utc_now
     )
+    idempotency_key: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    # Tells a retry from another event reusing its key, see payload_digest
+    payload_digest: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    # Assigned by EVENT_SEQUENCE_TRIGGER after the insert, not loaded back
+    sequence: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
+
+class EventLogState(Base):
+    """Single row per database: sequences below the floor are never reused."""
+
+    __tablename__ = "event_log_state"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    sequence_floor: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Bumped whenever contracts or events are removed, see record_removal
+    generation: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+
+class ArchivedEventKey(Base):
+    """
+    Idempotency key of an archived event, written when its hot row is
+    deleted, so retries are recognized without reading the archive.
+    """
+
+    __tablename__ = "archived_event_key"
+
+    contract_number: Mapped[str] = mapped_column(String, primary_key=True)
+    idempotency_key: Mapped[str] = mapped_column(String, primary_key=True)
+    payload_digest: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+
+
+listen(Event.__table__, "after_create", EVENT_SEQUENCE_TRIGGER)
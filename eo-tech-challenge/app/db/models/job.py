@@ -0,0 +1,43 @@
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.models.contract import Base, utc_now
+
+
+class ImportJob(Base):
+    __tablename__ = "import_job"
+
+    id: Mapped[uuid.UUID] = mapped_column(default=uuid.uuid4, primary_key=True)
+    # "events" or "contracts"
+    kind: Mapped[str] = mapped_column(String, nullable=False)
+    # "pending", "running", "completed" or "failed"
+    status: Mapped[str] = mapped_column(String, nullable=False, default="pending", index=True)
+    source_path: Mapped[str] = mapped_column(String, nullable=False)
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Resume point: every line before next_line (byte next_offset) is committed
+    next_line: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    next_offset: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    processed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    accepted: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    rejected: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=utc_now
+    )
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class ImportJobResult(Base):
+    __tablename__ = "import_job_result"
+
+    job_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("import_job.id", ondelete="CASCADE"), primary_key=True
+    )
+    line: Mapped[int] = mapped_column(Integer, primary_key=True)
+    status: Mapped[str] = mapped_column(String, nullable=False)
+    message: Mapped[str] = mapped_column(String, nullable=False)
@@ -1,32 +1,31 @@
 from typing import AsyncGenerator
 
-from sqlalchemy.ext.asyncio import (AsyncSession, async_sessionmaker,
-                                    create_async_engine)
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app.config import settings
-from app.db.models.contract import Base
+from app.db.sharding import ShardSet, create_shard_engines
 
-# Async engine and sessionmaker
-async_engine = create_async_engine(
-    settings.ASYNC_DATABASE_URL,
-    **settings.ASYNC_SQLALCHEMY_ENGINE_OPTIONS,
-    echo=settings.DEBUG,
-)
+# One async engine per shard; with DB_SHARD_COUNT=1 this is ASYNC_DATABASE_URL only
+shard_set = ShardSet(create_shard_engines(settings.DB_SHARD_COUNT))
+async_engine = shard_set.engines[0]
 
-AsyncSessionLocal = async_sessionmaker(
-    bind=async_engine,
+AsyncSessionLocal = shard_set.sessionmaker(
     expire_on_commit=False,
     autoflush=False,
     autocommit=False,
 )
 
 
-async def create_db_and_tables():
-    async with async_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-        print("Tables created or already exist")
-
-
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
+
+
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Session factory for work that outlives the request, e.g. import jobs."""
+    return AsyncSessionLocal
+
+
+def get_shard_set() -> ShardSet:
+    """All shards, for fleet-wide queries fanned out with ShardSet.fan_out."""
+    return shard_set
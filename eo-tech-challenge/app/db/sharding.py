@@ -0,0 +1,164 @@
+"""
+Hash-sharded storage across several databases.
+
+Contracts and their events live on the shard picked by a hash of
+contract_number, per-database bookkeeping (the event log state) exists on
+every shard and every other table lives on shard 0. Sessions created by
+``ShardSet.sessionmaker`` route each statement on their own: ORM statements
+filtering on a single contract_number go to that contract's shard, statements
+on unsharded tables go to shard 0 and anything else is run on every shard and
+merged. Fleet-wide work that should run on all shards concurrently uses
+``ShardSet.fan_out``.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Iterable, Optional, Sequence, TypeVar
+
+from sqlalchemy import MetaData, Table
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Mapper, ORMExecuteState
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, ColumnElement
+
+from app.config import settings
+from app.core.db_instrumentation import instrument_engine
+from app.core.partitioning import stable_partition
+from app.db.models import ArchivedEventKey, Contract, ContractChange, Event, EventLogState
+
+T = TypeVar("T")
+
+# Tables partitioned by contract_number, parents first
+SHARDED_TABLES: list[Table] = [Contract.__table__, Event.__table__, ArchivedEventKey.__table__]
+
+# Tables every shard has its own copy of
+SHARD_LOCAL_TABLES: list[Table] = [EventLogState.__table__, ContractChange.__table__]
+
+# Shard-local tables whose rows are written on the shard of their
+# contract_number, like sharded ones, but never moved by rebalancing
+ROUTED_TABLES: list[Table] = [*SHARDED_TABLES, ContractChange.__table__]
+
+SHARD_KEY = "contract_number"
+
+
+def shard_for(contract_number: str, shard_count: int) -> int:
+    return stable_partition(contract_number, shard_count)
+
+
+def shard_urls(shard_count: int) -> list[str]:
+    """Shard 0 is ASYNC_DATABASE_URL, so a single shard is the unsharded setup."""
+    return [settings.ASYNC_DATABASE_URL] + [
+        settings.DB_SHARD_URL_TEMPLATE.format(shard=shard) for shard in range(1, shard_count)
+    ]
+
+
+def create_shard_engines(shard_count: int) -> list[AsyncEngine]:
+    engines = []
+    for url in shard_urls(shard_count):
+        engine = create_async_engine(url, **settings.ASYNC_SQLALCHEMY_ENGINE_OPTIONS, echo=settings.DEBUG)
+        instrument_engine(engine)
+        engines.append(engine)
+    return engines
+
+
+def tables_for_shard(metadata: MetaData, shard: int) -> list[Table]:
+    """Sharded and shard-local tables live on every shard, all others on shard 0 only."""
+    if shard == 0:
+        return metadata.sorted_tables
+    return [
+        table
+        for table in metadata.sorted_tables
+        if table in SHARDED_TABLES or table in SHARD_LOCAL_TABLES
+    ]
+
+
+def _is_sharded(mapper: Optional[Mapper]) -> bool:
+    return mapper is not None and mapper.local_table in ROUTED_TABLES
+
+
+def shard_keys(clause: Optional[ColumnElement]) -> set[str]:
+    """contract_number values compared with ``==`` anywhere in a statement."""
+    keys = set()
+    if clause is None:
+        return keys
+    for element in visitors.iterate(clause):
+        if (
+            isinstance(element, BinaryExpression)
+            and element.operator is operators.eq
+            and getattr(element.left, "key", None) == SHARD_KEY
+            and isinstance(element.right, BindParameter)
+        ):
+            keys.add(element.right.effective_value)
+    return keys
+
+
+class ShardSet:
+    """The engines of all shards, one writer per database file."""
+
+    def __init__(self, engines: Sequence[AsyncEngine]):
+        self.engines = list(engines)
+
+    @property
+    def count(self) -> int:
+        return len(self.engines)
+
+    def shard_for(self, contract_number: str) -> int:
+        return shard_for(contract_number, self.count)
+
+    def _shard_chooser(self, mapper: Optional[Mapper], instance: Any, clause: Any = None) -> int:
+        if instance is not None and _is_sharded(mapper):
+            return self.shard_for(getattr(instance, SHARD_KEY))
+        # Core statements (no mapper) are routed by the contract they mention
+        keys = shard_keys(clause)
+        if len(keys) == 1:
+            return self.shard_for(keys.pop())
+        if _is_sharded(mapper):
+            raise ValueError(f"Cannot route a {mapper.local_table.name} statement to a shard")
+        return 0
+
+    def _identity_chooser(self, mapper: Mapper, primary_key: Any, **kw: Any) -> list[int]:
+        return list(range(self.count)) if _is_sharded(mapper) else [0]
+
+    def _execute_chooser(self, context: ORMExecuteState) -> Iterable[int]:
+        if not any(_is_sharded(mapper) for mapper in context.all_mappers):
+            return [0]
+        keys = shard_keys(context.statement)
+        if keys:
+            return sorted({self.shard_for(key) for key in keys})
+        return range(self.count)
+
+    def sessionmaker(self, **kwargs: Any) -> async_sessionmaker[AsyncSession]:
+        """A session factory whose sessions route statements to shards."""
+        if self.count == 1:
+            # Nothing to route, skip the choosers on every statement
+            return async_sessionmaker(bind=self.engines[0], **kwargs)
+
+        from sqlalchemy.ext.horizontal_shard import ShardedSession
+
+        return async_sessionmaker(
+            sync_session_class=ShardedSession,
+            shards={shard: engine.sync_engine for shard, engine in enumerate(self.engines)},
+            shard_chooser=self._shard_chooser,
+            identity_chooser=self._identity_chooser,
+            execute_chooser=self._execute_chooser,
+            **kwargs,
+        )
+
+    def shard_session(self, shard: int) -> AsyncSession:
+        """A plain session bound to a single shard."""
+        return AsyncSession(bind=self.engines[shard], expire_on_commit=False, autoflush=False)
+
+    async def run_on(self, shard: int, fn: Callable[[AsyncSession], Awaitable[T]]) -> T:
+        async with self.shard_session(shard) as db:
+            return await fn(db)
+
+    async def fan_out(self, fn: Callable[[AsyncSession], Awaitable[T]]) -> list[T]:
+        """Run ``fn`` on every shard concurrently; results are in shard order."""
+        return list(await asyncio.gather(*(self.run_on(shard, fn) for shard in range(self.count))))
+
+    async def create_all(self, metadata: MetaData) -> None:
+        """Create sharded tables on every shard and the others on shard 0."""
+        for shard, engine in enumerate(self.engines):
+            async with engine.begin() as conn:
+                await conn.run_sync(metadata.create_all, tables=tables_for_shard(metadata, shard))
+
+    async def dispose(self) -> None:
+        await asyncio.gather(*(engine.dispose() for engine in self.engines))
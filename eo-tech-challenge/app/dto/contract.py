@@ -9,6 +9,13 @@ class ContractPayload(BaseModel):
     components: list[str]
 
 
+class ContractComponentsPatch(BaseModel):
+    """Components to add to and remove from a contract."""
+
+    add: list[str] = []
+    remove: list[str] = []
+
+
 class ContractResponse(BaseModel):
     id: UUID4
     contract_number: str
@@ -1,17 +1,33 @@
 from datetime import datetime
 from datetime import date as date_type
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel, UUID4, ConfigDict, Field
 
+# Supported event types; anything else is rejected while parsing the request,
+# before a database session is opened
+EventType = Literal[
+    "supply_energy_start",
+    "supply_energy_end",
+    "battery_optimization_start",
+    "battery_optimization_end",
+    "heatpump_optimization_start",
+    "heatpump_optimization_end",
+]
+
 
 class EventPayload(BaseModel):
     """Request payload for creating an event."""
 
-    type: str
+    type: EventType
     contract_number: str
     date: date_type = Field(..., description="Event date in ISO format (YYYY-MM-DD)")
     created_at: datetime
+    idempotency_key: Optional[str] = Field(
+        None,
+        max_length=255,
+        description="Deduplication key; derived from the event fields when omitted",
+    )
 
 
 class EventResponse(BaseModel):
@@ -19,6 +35,14 @@ class EventResponse(BaseModel):
 
     status: str
     message: str
+    # Rejection reason, for the status code of POST /event; not serialized
+    reason: Optional[str] = Field(None, exclude=True)
+
+
+class EventAck(EventResponse):
+    """Acknowledgement of one event sent over the WebSocket ingest channel."""
+
+    correlation_id: str
 
 
 class ComponentTimeline(BaseModel):
@@ -28,6 +52,24 @@ class ComponentTimeline(BaseModel):
     end: Optional[date_type] = None
 
 
+class EventRecord(BaseModel):
+    """A stored event."""
+
+    type: str
+    date: date_type
+    created_at: datetime
+    archived: bool = False
+
+
+class ContractHistoryResponse(BaseModel):
+    """Response for contract history retrieval."""
+
+    contract_number: str
+    events: list[EventRecord]
+    # Older events were left out, see HISTORY_LOAD_MAX_EVENTS
+    truncated: bool = False
+
+
 class ContractTimelineResponse(BaseModel):
     """Response for contract timeline retrieval."""
 
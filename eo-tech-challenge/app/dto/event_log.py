@@ -0,0 +1,23 @@
+from datetime import date, datetime
+
+from pydantic import BaseModel
+
+
+class EventLogEntry(BaseModel):
+    """A stored event with its position in the event log of its database."""
+
+    id: str
+    sequence: int
+    contract_number: str
+    component_name: str
+    type: str
+    date: date
+    created_at: datetime
+
+
+class EventLogResponse(BaseModel):
+    """A page of the event log."""
+
+    events: list[EventLogEntry]
+    cursor: str
+    has_more: bool
@@ -0,0 +1,23 @@
+from datetime import date
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class TimelineChangeResponse(BaseModel):
+    """New timeline state of one component."""
+
+    sequence: int
+    contract_number: str
+    component: str
+    start: Optional[date] = None
+    end: Optional[date] = None
+    event_type: str
+
+
+class ChangeFeedResponse(BaseModel):
+    """A page of the change feed."""
+
+    cursor: str
+    reset: bool = False
+    changes: list[TimelineChangeResponse]
@@ -0,0 +1,31 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import UUID4, BaseModel
+
+
+class JobCreatedResponse(BaseModel):
+    """Response for an accepted import upload."""
+
+    job_id: UUID4
+    kind: str
+    status: str
+    total: int
+
+
+class JobProgressResponse(BaseModel):
+    """Progress of an import job."""
+
+    job_id: UUID4
+    kind: str
+    status: str
+    total: int
+    processed: int
+    accepted: int
+    rejected: int
+    throughput_per_sec: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,274 @@
+import asyncio
+import json
+import uuid
+from pathlib import Path
+from typing import Callable, Optional
+
+from loguru import logger
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.services.event_services import handle_event_creation, invalid_type_rejection
+from app.config import settings
+from app.core.memory import StructureSize, track
+from app.core.partitioning import stable_partition
+from app.db.crud.contract import create_contract, get_contract
+from app.db.crud.job import get_job, get_job_results, get_unfinished_jobs, save_job_progress, save_job_results
+from app.db.models.contract import utc_now
+from app.db.models.job import ImportJobResult
+from app.dto.contract import ContractPayload
+from app.dto.event import EventPayload
+from app.state.contract_filter import contract_filter
+from app.state.store import state_store
+
+SessionFactory = Callable[[], AsyncSession]
+
+# (line number, parsed object) - objects that failed to parse never get here
+Item = tuple[int, dict]
+
+
+def _read_chunk(
+    path: Path, offset: int, first_line: int, size: int
+) -> tuple[list[tuple[int, str]], int, int]:
+    """
+    Read up to ``size`` non-empty lines starting at byte ``offset``.
+
+    Returns the lines with their 1-based line numbers in the file, plus the
+    byte offset and line number to continue from.
+    """
+    lines = []
+    line_no = first_line
+    with path.open("rb") as source:
+        source.seek(offset)
+        while len(lines) < size:
+            raw = source.readline()
+            if not raw:
+                break
+            if raw.strip():
+                lines.append((line_no, raw.decode("utf-8", errors="replace")))
+            line_no += 1
+        return lines, source.tell(), line_no
+
+
+def _validation_message(exc: ValidationError) -> str:
+    error = exc.errors()[0]
+    field = ".".join(str(part) for part in error.get("loc", ())) or "payload"
+    return f"Invalid {field}: {error.get('msg', 'validation error')}"
+
+
+async def _import_event(db: AsyncSession, data: dict) -> tuple[str, str]:
+    try:
+        payload = EventPayload.model_validate(data)
+    except ValidationError as exc:
+        rejection = invalid_type_rejection(exc.errors()[0], data.get("contract_number"))
+        if rejection is not None:
+            return rejection.status, rejection.message
+        return "rejected", _validation_message(exc)
+    response = await handle_event_creation(db, payload)
+    return response.status, response.message
+
+
+async def _import_contract(db: AsyncSession, data: dict) -> tuple[str, str]:
+    try:
+        payload = ContractPayload.model_validate(data)
+    except ValidationError as exc:
+        return "rejected", _validation_message(exc)
+    existing = await get_contract(db, payload.contract_number)
+    if existing is not None:
+        # A resumed chunk may meet contracts it created before the restart
+        if sorted(existing.components) == sorted(payload.components):
+            return "accepted", "Contract already exists."
+        return "rejected", f"Contract {payload.contract_number} already exists."
+    with state_store.writing():
+        await create_contract(db, payload)
+        state_store.put_contract(payload.contract_number, payload.components)
+    contract_filter.add(payload.contract_number)
+    return "accepted", "Contract created successfully."
+
+
+_IMPORTERS = {"events": _import_event, "contracts": _import_contract}
+
+
+async def _process_partition(
+    session_factory: SessionFactory, job_id: uuid.UUID, kind: str, items: list[Item]
+) -> dict[int, tuple[str, str]]:
+    """
+    Import one partition's items in file order, with a session of its own.
+
+    The results are stored along the way: the pending ones are committed with
+    every rejection, the rest at the end. A rejection is thereby stored before
+    a later line of its contract can store an event it would be judged against
+    on a replay; an accepted line stored without its result is answered from
+    its idempotency key instead.
+    """
+    importer = _IMPORTERS[kind]
+    verdicts = {}
+    pending: list[ImportJobResult] = []
+    async with session_factory() as db:
+        for line_no, data in items:
+            status, message = await importer(db, data)
+            verdicts[line_no] = (status, message)
+            pending.append(ImportJobResult(job_id=job_id, line=line_no, status=status, message=message))
+            if status != "accepted":
+                await save_job_results(db, pending)
+                pending = []
+        await save_job_results(db, pending)
+    return verdicts
+
+
+async def _process_chunk(
+    session_factory: SessionFactory,
+    job_id: uuid.UUID,
+    kind: str,
+    lines: list[tuple[int, str]],
+    workers: int,
+    done: dict[int, tuple[str, str]],
+) -> tuple[dict[int, tuple[str, str]], list[ImportJobResult]]:
+    """
+    Spread a chunk over ``workers`` partitions keyed by contract_number.
+
+    All lines of one contract land in the same partition, so they are imported
+    in file order and never race each other. Lines in ``done`` got their result
+    before a restart and are skipped. Returns the verdicts of every line and
+    the results left to store, those of lines that are not JSON objects.
+    """
+    verdicts: dict[int, tuple[str, str]] = {}
+    partitions: list[list[Item]] = [[] for _ in range(workers)]
+    for line_no, text in lines:
+        if line_no in done:
+            continue
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            verdicts[line_no] = ("rejected", "Invalid JSON.")
+            continue
+        if not isinstance(data, dict):
+            verdicts[line_no] = ("rejected", "Expected a JSON object.")
+            continue
+        partition = stable_partition(str(data.get("contract_number", "")), workers)
+        partitions[partition].append((line_no, data))
+    malformed = [
+        ImportJobResult(job_id=job_id, line=line_no, status=status, message=message)
+        for line_no, (status, message) in verdicts.items()
+    ]
+
+    verdicts.update(done)
+    for partition_verdicts in await asyncio.gather(
+        *(_process_partition(session_factory, job_id, kind, items) for items in partitions if items)
+    ):
+        verdicts.update(partition_verdicts)
+    return verdicts, malformed
+
+
+def _remove_upload(path: Path) -> None:
+    """Delete the file of a finished job if it was uploaded to JOBS_DIR."""
+    if path.parent.resolve() == Path(settings.JOBS_DIR).resolve():
+        path.unlink(missing_ok=True)
+
+
+async def run_job(session_factory: SessionFactory, job_id: uuid.UUID) -> None:
+    """
+    Process a job from its last committed chunk until the end of its file.
+
+    A chunk's lines get their results as they are imported, the job's
+    progress is committed once the whole chunk is done. A restart replays the
+    first chunk not counted yet and skips its lines that have a result; see
+    _process_partition for why what remains gets the same verdicts again. The
+    uploaded file is deleted when the job completes or fails.
+    """
+    async with session_factory() as db:
+        job = await get_job(db, job_id)
+        if job is None or job.status in ("completed", "failed"):
+            return
+        job.status = "running"
+        job.started_at = job.started_at or utc_now()
+        await save_job_progress(db, job)
+
+        path = Path(job.source_path)
+        try:
+            while True:
+                lines, next_offset, next_line = await asyncio.to_thread(
+                    _read_chunk, path, job.next_offset, job.next_line, settings.JOB_CHUNK_SIZE
+                )
+                if not lines:
+                    break
+                # Results stored before a restart, all of them within this chunk
+                stored = await get_job_results(db, job.id, job.next_line - 1, len(lines))
+                verdicts, malformed = await _process_chunk(
+                    session_factory,
+                    job.id,
+                    job.kind,
+                    lines,
+                    settings.JOB_WORKERS,
+                    {result.line: (result.status, result.message) for result in stored},
+                )
+                accepted = sum(status == "accepted" for status, _ in verdicts.values())
+                job.processed += len(verdicts)
+                job.accepted += accepted
+                job.rejected += len(verdicts) - accepted
+                job.next_line = next_line
+                job.next_offset = next_offset
+                await save_job_progress(db, job, malformed)
+        except Exception as exc:
+            logger.exception("Import job failed", job_id=str(job_id))
+            await db.rollback()
+            job = await get_job(db, job_id)
+            job.status = "failed"
+            job.error = str(exc)
+            job.finished_at = utc_now()
+            await save_job_progress(db, job)
+            await asyncio.to_thread(_remove_upload, path)
+            return
+
+        job.status = "completed"
+        job.finished_at = utc_now()
+        await save_job_progress(db, job)
+        await asyncio.to_thread(_remove_upload, path)
+        logger.info(
+            "Import job completed",
+            job_id=str(job_id),
+            processed=job.processed,
+            accepted=job.accepted,
+            rejected=job.rejected,
+        )
+
+
+class JobRunner:
+    """Runs import jobs as background tasks of the serving process."""
+
+    def __init__(self):
+        self._tasks: dict[uuid.UUID, asyncio.Task] = {}
+
+    def submit(self, session_factory: SessionFactory, job_id: uuid.UUID) -> None:
+        if job_id in self._tasks:
+            return
+        task = asyncio.create_task(run_job(session_factory, job_id), name=f"import-job-{job_id}")
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def wait(self, job_id: uuid.UUID) -> None:
+        task: Optional[asyncio.Task] = self._tasks.get(job_id)
+        if task is not None:
+            await asyncio.shield(task)
+
+    async def resume_unfinished(self, session_factory: SessionFactory) -> None:
+        """Restart jobs interrupted by a shutdown or crash."""
+        async with session_factory() as db:
+            jobs = await get_unfinished_jobs(db)
+        for job in jobs:
+            logger.info("Resuming import job", job_id=str(job.id), next_line=job.next_line)
+            self.submit(session_factory, job.id)
+
+    async def shutdown(self) -> None:
+        """Stop running jobs; they resume from their last committed chunk."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def queued(self) -> int:
+        return len(self._tasks)
+
+
+job_runner = JobRunner()
+track("import_jobs", lambda: StructureSize(job_runner.queued()))
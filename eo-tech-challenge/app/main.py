@@ -1,21 +1,111 @@
+import asyncio
 from contextlib import asynccontextmanager
+from typing import Optional
 
 from fastapi import FastAPI, Request, status
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 
-from app.api.routers import contract, event
-from app.db.session import create_db_and_tables
+from app.api.routers import contract, debug, event, event_log, feed, job, metrics
+from app.api.services.event_services import validation_rejection
+from app.config import settings
+from app.core.admission import AdmissionMiddleware
+from app.core.capture import CaptureMiddleware, configure_capture, shutdown_capture
+from app.core.logging import configure_logging, shutdown_logging
+from app.core.memory import run_memory_sampler, start_tracemalloc, stop_tracemalloc
+from app.core.middleware import MetricsMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.core.query_budget import QueryCountMiddleware
+from app.core.tracing import TracingMiddleware, configure_tracing, shutdown_tracing
+from app.core.workers import acquire_primary, release_primary
+from app.db.migrations import check_schema
+from app.db.session import AsyncSessionLocal, shard_set
+from app.jobs.runner import job_runner
+from app.state.coherence import cache_coherence
+from app.state.contract_filter import contract_filter
+from app.state.store import state_store
+
+configure_logging()
+configure_tracing()
+configure_capture()
+
+
+async def _cancel(task: Optional[asyncio.Task]) -> None:
+    if task is not None:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await create_db_and_tables()
+    start_tracemalloc(settings.MEMORY_TRACEMALLOC_FRAMES)
+    await check_schema(shard_set, auto_migrate=settings.DB_AUTO_MIGRATE)
+    # Background work that must run once across server workers
+    primary = acquire_primary(settings.SERVER_PRIMARY_LOCK_PATH)
+    coherence_interval = settings.CACHE_COHERENCE_INTERVAL_SECONDS
+    if coherence_interval:
+        # Before the caches load, so no write of another worker is missed
+        await cache_coherence.mark(shard_set)
+    if settings.CONTRACT_FILTER_ENABLED:
+        await contract_filter.build(
+            shard_set, settings.CONTRACT_FILTER_CAPACITY, settings.CONTRACT_FILTER_FALSE_POSITIVE_RATE
+        )
+    snapshots = None
+    if settings.STATE_STORE_ENABLED:
+        from app.state import snapshot
+
+        await snapshot.load_or_warm(
+            state_store, shard_set, settings.STATE_SNAPSHOT_PATH, settings.STATE_STORE_MAX_BYTES
+        )
+        if settings.STATE_SNAPSHOT_INTERVAL_SECONDS and primary:
+            snapshots = asyncio.create_task(
+                snapshot.run_periodic_snapshots(
+                    state_store,
+                    shard_set,
+                    settings.STATE_SNAPSHOT_PATH,
+                    settings.STATE_SNAPSHOT_INTERVAL_SECONDS,
+                    cache_coherence if coherence_interval else None,
+                )
+            )
+    if primary:
+        await job_runner.resume_unfinished(AsyncSessionLocal)
+    coherence = None
+    if coherence_interval:
+        coherence = asyncio.create_task(cache_coherence.run(shard_set, coherence_interval, prune=primary))
+    memory_sampler = None
+    if settings.MEMORY_SAMPLE_INTERVAL_SECONDS:
+        memory_sampler = asyncio.create_task(run_memory_sampler(settings.MEMORY_SAMPLE_INTERVAL_SECONDS))
     yield
+    # Drain: the server has stopped accepting requests and waited for those
+    # in flight (SERVER_DRAIN_TIMEOUT_SECONDS). Stop the background work,
+    # persist what the next start needs, then flush and close.
+    await _cancel(memory_sampler)
+    await _cancel(coherence)
+    await _cancel(snapshots)
+    await job_runner.shutdown()
+    if settings.STATE_STORE_ENABLED and primary:
+        await snapshot.write_snapshot(
+            state_store, shard_set, settings.STATE_SNAPSHOT_PATH, cache_coherence if coherence_interval else None
+        )
+    shutdown_capture()
+    stop_tracemalloc()
+    shutdown_tracing()
+    await shard_set.dispose()
+    release_primary()
+    await shutdown_logging()
 
 
 app = FastAPI(title="eo_tech_challenge", version="0.1.0", lifespan=lifespan)
 
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(QueryCountMiddleware)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(ProfilingMiddleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+# Outermost, so the capture holds what clients saw, including shed requests
+app.add_middleware(CaptureMiddleware)
+
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -28,48 +118,9 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         # Extract the first validation error
         errors = exc.errors()
         if errors:
-            error = errors[0]
-            field = error.get("loc", [])[-1] if error.get("loc") else "unknown"
-            error_type = error.get("type", "")
-            raw_msg = error.get("msg", "Validation error")
-
-            # Create user-friendly messages based on field and error type
-            if field == "date":
-                if "required" in error_type or "missing" in error_type:
-                    message = "Date field is required."
-                elif "too short" in raw_msg.lower():
-                    message = "Invalid date format. Expected format: YYYY-MM-DD"
-                elif "separator" in raw_msg.lower():
-                    message = "Invalid date format. Expected format: YYYY-MM-DD (use dashes, not slashes)"
-                elif "outside expected range" in raw_msg.lower():
-                    message = "Invalid date. Day value is outside expected range."
-                else:
-                    message = f"Invalid date format. {raw_msg}"
-            elif field == "type":
-                if "required" in error_type or "missing" in error_type:
-                    message = "Event type is required."
-                else:
-                    message = f"Invalid event type format."
-            elif field == "contract_number":
-                if "required" in error_type or "missing" in error_type:
-                    message = "Contract number is required."
-                else:
-                    message = f"Invalid contract number format."
-            elif field == "created_at":
-                if "required" in error_type or "missing" in error_type:
-                    message = "Created at timestamp is required."
-                else:
-                    message = f"Invalid created_at format. Expected ISO datetime format."
-            else:
-                message = f"Invalid {field}: {raw_msg}"
-
-            return JSONResponse(
-                status_code=status.HTTP_200_OK,
-                content={
-                    "status": "rejected",
-                    "message": message
-                }
-            )
+            body = exc.body if isinstance(exc.body, dict) else {}
+            rejection = validation_rejection(errors[0], body.get("contract_number"))
+            return JSONResponse(status_code=status.HTTP_200_OK, content=rejection.model_dump())
 
     # For other endpoints, return default validation error format
     return JSONResponse(
@@ -81,6 +132,12 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 # All api routers
 app.include_router(contract.router)
 app.include_router(event.router)
+app.include_router(event_log.router)
+app.include_router(feed.router)
+app.include_router(job.router)
+app.include_router(debug.router)
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router)
 
 @app.get("/")
 async def root():
@@ -0,0 +1,201 @@
+"""
+Keeps the in-process caches of several processes writing the same databases
+coherent, without any service besides the databases themselves.
+
+Every write of a contract (create, delete, component update, archiving) adds
+a row to the ``contract_change`` log of the contract's shard in the same
+transaction, tagged with the writing process. Events need no entry, the event
+log numbers them. Each process keeps a cursor per shard in both logs and,
+every CACHE_COHERENCE_INTERVAL_SECONDS, reads what other processes wrote
+since:
+
+* contract changes update the contract filter and the state store: created
+  contracts are added, changed ones reloaded, one or two indexed queries per
+  contract;
+* events are applied to the state store, which ignores the ones it already
+  holds, and those changing a timeline are published to the change feed.
+  Only events stored before the contract changes were read are applied, so
+  the contract of each of them is known by then.
+
+A write of another process is therefore visible to every cache within about
+one interval. Entries older than CACHE_COHERENCE_RETENTION_SECONDS are
+pruned; a process whose cursor fell behind the pruned entries rebuilds its
+caches.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.change_feed import ChangeFeed, change_feed
+from app.core.metrics import CACHE_COHERENCE_APPLIED, CACHE_COHERENCE_LAG, CACHE_COHERENCE_RESYNCS
+from app.db.crud.change import ORIGIN, get_changes_after, get_latest_change_id, prune_changes
+from app.db.crud.event import get_events_after, get_latest_sequence
+from app.db.models.contract import utc_now
+from app.db.sharding import ShardSet
+from app.state.contract_filter import ContractFilter, contract_filter
+from app.state.store import StateStore, state_store
+
+# Change log entries and events read per round trip
+PAGE_SIZE = 1000
+
+# Longest wait for this process's own writes in flight before applying events
+SETTLE_TIMEOUT_SECONDS = 1.0
+
+
+class CacheCoherence:
+    def __init__(
+        self,
+        store: StateStore,
+        filter_: ContractFilter,
+        feed: ChangeFeed,
+        origin: str = ORIGIN,
+    ):
+        self.store = store
+        self.filter = filter_
+        self.feed = feed
+        self.origin = origin
+        # Per shard: last change log id and last event sequence read
+        self._changes: list[int] = []
+        self._sequences: list[int] = []
+        self._oldest: Optional[datetime] = None
+        # Snapshots poll too, besides the periodic task
+        self._lock = asyncio.Lock()
+
+    async def mark(self, shard_set: ShardSet) -> None:
+        """
+        Start following the writes stored from now on.
+
+        Call it before the caches are loaded: writes stored while they load
+        are then applied twice, which the caches tolerate, instead of never.
+        """
+
+        async def cursors(db: AsyncSession) -> tuple[int, int]:
+            return await get_latest_change_id(db), await get_latest_sequence(db)
+
+        marks = await shard_set.fan_out(cursors)
+        self._changes = [change for change, _ in marks]
+        self._sequences = [sequence for _, sequence in marks]
+
+    async def poll(self, shard_set: ShardSet) -> None:
+        """Apply what other processes wrote since the previous poll."""
+        async with self._lock:
+            await self._poll(shard_set)
+
+    async def _poll(self, shard_set: ShardSet) -> None:
+        self._oldest = None
+        for shard in range(shard_set.count):
+            async with shard_set.shard_session(shard) as db:
+                bound = await get_latest_sequence(db)
+                if not await self._apply_changes(db, shard):
+                    await self.resync(shard_set)
+                    return
+                if self.store.enabled:
+                    await self._apply_events(db, shard, bound)
+        CACHE_COHERENCE_LAG.set(
+            (utc_now() - self._oldest).total_seconds() if self._oldest is not None else 0.0
+        )
+
+    def _observe(self, created_at: datetime) -> None:
+        # Stored values lose their timezone
+        created_at = created_at.replace(tzinfo=utc_now().tzinfo)
+        if self._oldest is None or created_at < self._oldest:
+            self._oldest = created_at
+
+    async def _apply_changes(self, db: AsyncSession, shard: int) -> bool:
+        """Apply the contract changes of one shard; False when some were pruned unread."""
+        while True:
+            changes = await get_changes_after(db, self._changes[shard], PAGE_SIZE)
+            if not changes:
+                return True
+            # Ids are consecutive, a gap means the entries were pruned
+            if changes[0].id != self._changes[shard] + 1 and self._changes[shard]:
+                return False
+            for change in changes:
+                if change.origin != self.origin:
+                    await self._apply_change(db, change.contract_number, change.kind)
+                    self._observe(change.created_at)
+                    CACHE_COHERENCE_APPLIED.inc(change.kind)
+            self._changes[shard] = changes[-1].id
+            if len(changes) < PAGE_SIZE:
+                return True
+
+    async def _apply_change(self, db: AsyncSession, contract_number: str, kind: str) -> None:
+        if kind == "created":
+            self.filter.add(contract_number)
+            await self.store.load_contract(db, contract_number)
+        elif kind == "deleted":
+            self.filter.remove(contract_number)
+            self.store.discard(contract_number)
+        else:
+            await self.store.refresh(db, contract_number)
+
+    async def _apply_events(self, db: AsyncSession, shard: int, bound: int) -> None:
+        """Apply the events of one shard up to sequence ``bound``."""
+        while self._sequences[shard] < bound:
+            events = await get_events_after(db, self._sequences[shard], PAGE_SIZE)
+            if not events:
+                break
+            # This process's writes read above have updated the store by now,
+            # so only other processes' events change it
+            await self.store.settle(SETTLE_TIMEOUT_SECONDS)
+            for event in events:
+                if event.sequence > bound:
+                    break
+                state = self.store.get(event.contract_number)
+                if state is None or event.component_name not in state.components:
+                    continue
+                before = state.component(event.component_name)
+                self.store.apply_event(
+                    event.contract_number, event.component_name, event.type, event.date, event.created_at
+                )
+                after = state.component(event.component_name)
+                if (after.start, after.end) != (before.start, before.end):
+                    self.feed.publish(
+                        event.contract_number, event.component_name, after.start, after.end, event.type
+                    )
+                if after != before:
+                    CACHE_COHERENCE_APPLIED.inc("event")
+            self._sequences[shard] = min(events[-1].sequence, bound)
+            if len(events) < PAGE_SIZE:
+                break
+        self._sequences[shard] = max(self._sequences[shard], bound)
+
+    async def resync(self, shard_set: ShardSet) -> None:
+        """Rebuild the caches from the databases."""
+        CACHE_COHERENCE_RESYNCS.inc()
+        logger.warning("Change log pruned past this process's cursor, rebuilding caches")
+        await self.mark(shard_set)
+        if self.filter.enabled:
+            await self.filter.build(
+                shard_set, settings.CONTRACT_FILTER_CAPACITY, settings.CONTRACT_FILTER_FALSE_POSITIVE_RATE
+            )
+        if self.store.enabled:
+            await self.store.warm(shard_set, settings.STATE_STORE_MAX_BYTES)
+
+    async def run(self, shard_set: ShardSet, interval: float, prune: bool) -> None:
+        """Poll every ``interval`` seconds until cancelled, pruning old entries with ``prune``."""
+        next_prune = time.monotonic()
+        while True:
+            try:
+                await self.poll(shard_set)
+                if prune and time.monotonic() >= next_prune:
+                    await self.prune(shard_set)
+                    next_prune = time.monotonic() + settings.CACHE_COHERENCE_RETENTION_SECONDS / 10
+            except Exception:
+                logger.exception("Cache coherence poll failed")
+            await asyncio.sleep(interval)
+
+    async def prune(self, shard_set: ShardSet) -> int:
+        before = utc_now() - timedelta(seconds=settings.CACHE_COHERENCE_RETENTION_SECONDS)
+        pruned = sum(await shard_set.fan_out(lambda db: prune_changes(db, before)))
+        if pruned:
+            logger.info("Change log pruned", entries=pruned)
+        return pruned
+
+
+cache_coherence = CacheCoherence(state_store, contract_filter, change_feed)
@@ -0,0 +1,168 @@
+"""
+Approximate membership filter over all contract numbers.
+
+A counting Bloom filter: every contract number increments ``hashes`` of its
+counters, picked by double hashing of a blake2b digest, when the contract is
+created and decrements them when it is deleted. A number with a zero counter
+certainly has no contract, so events and reads for it are answered without a
+query; any other number is looked up as before. Like the state store it is
+built from the database at startup and then updated by this process; the
+writes of other processes are applied by app.state.coherence.
+
+Counters take one byte each. A counter that reaches 255 stays there, so
+deletes can only raise the false positive rate, never cause a false miss.
+"""
+import hashlib
+import math
+import time
+
+from loguru import logger
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.memory import StructureSize, track
+from app.core.metrics import (
+    CONTRACT_FILTER_BYTES,
+    CONTRACT_FILTER_CONTRACTS,
+    CONTRACT_FILTER_FALSE_POSITIVE_RATE,
+    CONTRACT_FILTER_FALSE_POSITIVES,
+    CONTRACT_FILTER_LOOKUPS,
+)
+from app.db.models.contract import Contract
+from app.db.sharding import ShardSet
+
+_SATURATED = 255
+
+# Contract numbers fetched per round trip while building
+BUILD_BATCH_SIZE = 10000
+
+
+def dimensions(capacity: int, false_positive_rate: float) -> tuple[int, int]:
+    """Counter and hash counts giving ``false_positive_rate`` at ``capacity`` contracts."""
+    capacity = max(1, capacity)
+    size = math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+    hashes = max(1, round(size / capacity * math.log(2)))
+    return size, hashes
+
+
+class ContractFilter:
+    def __init__(self):
+        self._counters = bytearray()
+        self.hashes = 0
+        self.contracts = 0
+        self.enabled = False
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._counters)
+
+    def _positions(self, contract_number: str) -> list[int]:
+        digest = hashlib.blake2b(contract_number.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        # Odd, so the probes never repeat for power of two sizes either
+        step = int.from_bytes(digest[8:], "little") | 1
+        size = len(self._counters)
+        return [(first + index * step) % size for index in range(self.hashes)]
+
+    def false_positive_rate(self) -> float:
+        """Expected rate at the current number of contracts."""
+        if not self._counters:
+            return 0.0
+        return (1 - math.exp(-self.hashes * self.contracts / len(self._counters))) ** self.hashes
+
+    def _report(self) -> None:
+        CONTRACT_FILTER_CONTRACTS.set(self.contracts)
+        CONTRACT_FILTER_BYTES.set(self.nbytes)
+        CONTRACT_FILTER_FALSE_POSITIVE_RATE.set(round(self.false_positive_rate(), 6))
+
+    def start(self, capacity: int, false_positive_rate: float) -> None:
+        """Empty the filter, sized for ``capacity`` contracts."""
+        size, self.hashes = dimensions(capacity, false_positive_rate)
+        self._counters = bytearray(size)
+        self.contracts = 0
+        self.enabled = True
+        self._report()
+
+    def clear(self) -> None:
+        self._counters = bytearray()
+        self.hashes = 0
+        self.contracts = 0
+        self.enabled = False
+        self._report()
+
+    def _insert(self, contract_number: str) -> None:
+        counters = self._counters
+        for position in self._positions(contract_number):
+            if counters[position] < _SATURATED:
+                counters[position] += 1
+        self.contracts += 1
+
+    def add(self, contract_number: str) -> None:
+        if self.enabled:
+            self._insert(contract_number)
+            self._report()
+
+    def remove(self, contract_number: str) -> None:
+        """Forget a deleted contract; it must have been added before."""
+        if not self.enabled:
+            return
+        counters = self._counters
+        positions = self._positions(contract_number)
+        if not all(counters[position] for position in positions):
+            # Never added, decrementing would hide other contracts
+            return
+        for position in positions:
+            if counters[position] < _SATURATED:
+                counters[position] -= 1
+        self.contracts -= 1
+        self._report()
+
+    def definitely_absent(self, contract_number: str) -> bool:
+        """True when no contract ``contract_number`` exists, no query needed."""
+        if not self.enabled:
+            return False
+        counters = self._counters
+        absent = not all(counters[position] for position in self._positions(contract_number))
+        CONTRACT_FILTER_LOOKUPS.inc("absent" if absent else "maybe")
+        return absent
+
+    def record_false_positive(self) -> None:
+        """Count a number the filter let through that has no contract."""
+        if self.enabled:
+            CONTRACT_FILTER_FALSE_POSITIVES.inc()
+
+    async def _add_shard(self, db: AsyncSession) -> None:
+        numbers = await db.stream_scalars(select(Contract.contract_number))
+        async for batch in numbers.partitions(BUILD_BATCH_SIZE):
+            for contract_number in batch:
+                self._insert(contract_number)
+
+    async def build(self, shard_set: ShardSet, capacity: int, false_positive_rate: float) -> None:
+        """
+        Add every stored contract number.
+
+        The filter is sized for ``capacity`` contracts, or twice the number
+        stored now when that is more, so it keeps its rate while contracts are
+        added.
+        """
+        started = time.perf_counter()
+
+        async def count(db: AsyncSession) -> int:
+            return await db.scalar(select(func.count()).select_from(Contract))
+
+        stored = sum(await shard_set.fan_out(count))
+        self.start(max(capacity, 2 * stored), false_positive_rate)
+        await shard_set.fan_out(self._add_shard)
+        self._report()
+        logger.info(
+            "Contract filter built",
+            contracts=self.contracts,
+            bytes=self.nbytes,
+            hashes=self.hashes,
+            false_positive_rate=round(self.false_positive_rate(), 6),
+            duration_ms=round((time.perf_counter() - started) * 1000, 3),
+        )
+
+
+contract_filter = ContractFilter()
+track("contract_filter", lambda: StructureSize(contract_filter.contracts, contract_filter.nbytes))
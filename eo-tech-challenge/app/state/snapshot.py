@@ -0,0 +1,348 @@
+"""
+Binary snapshot of the state store, for restarts without a full rebuild.
+
+The snapshot is written periodically and on shutdown, and loaded with mmap
+at startup. It records per shard the highest event sequence and contract
+rowid it includes, so only what was stored afterwards is read back, plus the
+event log generation: contracts and events removed since (deletes, archiving,
+rebalancing) and component updates bump it, and a snapshot whose generation
+no longer matches is stale. Corrupt, stale or incompatible snapshots are
+rejected and the store is rebuilt from the database.
+
+Layout, little-endian: a fixed header with a CRC32 of the payload, then the
+shard stamps, the component names, the distinct component lists and one
+record per contract (component list index, contract number, archived bitmask
+with one bit per component and the raw ``array('q')`` values). Counts, lengths
+and indexes are 32-bit, so contract number and component list size are not
+limited.
+"""
+import asyncio
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from loguru import logger
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.migrations import LATEST_VERSION
+from app.db.models.contract import Contract
+from app.db.models.event import Event, EventLogState
+from app.db.sharding import ShardSet
+from app.state.coherence import CacheCoherence
+from app.state.store import StateStore
+
+MAGIC = b"EOSS"
+FORMAT_VERSION = 2
+
+# magic, format version, schema version, shard count, complete, created (ns),
+# payload length, payload CRC32
+_HEADER = struct.Struct("<4sHHHBxQQI")
+# highest event sequence, highest contract rowid, event log generation
+_STAMP = struct.Struct("<qqq")
+_U32 = struct.Struct("<I")
+# component list index, contract number length
+_RECORD = struct.Struct("<II")
+
+# Longest wait for writes in flight before a snapshot is skipped
+SETTLE_TIMEOUT_SECONDS = 5.0
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class ShardStamp(NamedTuple):
+    sequence: int
+    contract_rowid: int
+    generation: int
+
+
+class SnapshotInfo(NamedTuple):
+    contracts: int
+    replayed_contracts: int
+    replayed_events: int
+
+
+async def _stamp(db: AsyncSession) -> ShardStamp:
+    query = select(
+        select(func.coalesce(func.max(Event.sequence), 0)).scalar_subquery(),
+        select(func.coalesce(func.max(literal_column("rowid")), 0))
+        .select_from(Contract.__table__)
+        .scalar_subquery(),
+        select(func.coalesce(func.max(EventLogState.generation), 0)).scalar_subquery(),
+    )
+    return ShardStamp(*(await db.execute(query)).one())
+
+
+async def shard_stamps(shard_set: ShardSet) -> list[ShardStamp]:
+    return await shard_set.fan_out(_stamp)
+
+
+def _mask_size(components: tuple[str, ...]) -> int:
+    """Bytes of the archived bitmask of a contract with ``components``."""
+    return (len(components) + 7) // 8
+
+
+def _encode(store: StateStore, stamps: list[ShardStamp]) -> bytes:
+    names: dict[str, int] = {}
+    sets: dict[tuple[str, ...], int] = {}
+    records = bytearray()
+    count = 0
+    for contract_number, state in store.items():
+        components = state.components
+        if components not in sets:
+            for name in components:
+                names.setdefault(name, len(names))
+            sets[components] = len(sets)
+        archived = sum(1 << index for index, name in enumerate(components) if name in state.archived)
+        key = contract_number.encode()
+        records += _RECORD.pack(sets[components], len(key))
+        records += key
+        records += archived.to_bytes(_mask_size(components), "little")
+        values = state.values
+        if sys.byteorder == "big":
+            values = array("q", values)
+            values.byteswap()
+        records += values.tobytes()
+        count += 1
+
+    payload = bytearray()
+    for stamp in stamps:
+        payload += _STAMP.pack(*stamp)
+    payload += _U32.pack(len(names))
+    for name in names:
+        encoded = name.encode()
+        payload += _U32.pack(len(encoded)) + encoded
+    payload += _U32.pack(len(sets))
+    for components in sets:
+        payload += _U32.pack(len(components))
+        payload += struct.pack(f"<{len(components)}I", *(names[name] for name in components))
+    payload += _U32.pack(count)
+    payload += records
+
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        LATEST_VERSION,
+        len(stamps),
+        store.complete,
+        time.time_ns(),
+        len(payload),
+        zlib.crc32(payload),
+    )
+    return header + payload
+
+
+def _write_file(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("wb") as target:
+        target.write(data)
+        target.flush()
+        os.fsync(target.fileno())
+    os.replace(tmp, path)
+
+
+async def write_snapshot(
+    store: StateStore, shard_set: ShardSet, path: Path, coherence: Optional[CacheCoherence] = None
+) -> bool:
+    """
+    Write the store to ``path``; False if writes in flight did not settle.
+
+    The stamps are read first, then every write in flight at that moment is
+    waited for, so everything up to the stamps is in the store when it is
+    encoded. With several workers the stamps also cover the writes of the
+    others, which ``coherence`` applies to the store before encoding.
+    Encoding does not yield to the event loop, writing the file happens in a
+    thread.
+    """
+    if not store.enabled:
+        return False
+    started = time.perf_counter()
+    stamps = await shard_stamps(shard_set)
+    if coherence is not None:
+        await coherence.poll(shard_set)
+    if not await store.settle(SETTLE_TIMEOUT_SECONDS):
+        logger.warning("State snapshot skipped, writes did not settle")
+        return False
+    data = _encode(store, stamps)
+    await asyncio.to_thread(_write_file, path, data)
+    logger.info(
+        "State snapshot written",
+        contracts=len(store),
+        bytes=len(data),
+        duration_ms=round((time.perf_counter() - started) * 1000, 3),
+    )
+    return True
+
+
+def _read_records(
+    view: memoryview, store: StateStore, stamps_now: list[ShardStamp]
+) -> tuple[list[ShardStamp], bool]:
+    """Validate the snapshot in ``view`` and restore its contracts into ``store``."""
+    if len(view) < _HEADER.size:
+        raise SnapshotError("truncated header")
+    magic, fmt, schema, shard_count, complete, _, length, crc = _HEADER.unpack_from(view)
+    if magic != MAGIC or fmt != FORMAT_VERSION:
+        raise SnapshotError("unknown format")
+    if schema != LATEST_VERSION:
+        raise SnapshotError(f"written for schema version {schema}")
+    if shard_count != len(stamps_now):
+        raise SnapshotError(f"written for {shard_count} shards")
+    with view[_HEADER.size:] as payload:
+        if len(payload) != length or zlib.crc32(payload) != crc:
+            raise SnapshotError("checksum mismatch")
+        return _read_payload(payload, store, stamps_now), bool(complete)
+
+
+def _read_payload(
+    payload: memoryview, store: StateStore, stamps_now: list[ShardStamp]
+) -> list[ShardStamp]:
+    offset = 0
+    stamps = []
+    for shard in range(len(stamps_now)):
+        stamp = ShardStamp(*_STAMP.unpack_from(payload, offset))
+        offset += _STAMP.size
+        now = stamps_now[shard]
+        if (
+            stamp.generation != now.generation
+            or stamp.sequence > now.sequence
+            or stamp.contract_rowid > now.contract_rowid
+        ):
+            raise SnapshotError(f"stale for shard {shard}")
+        stamps.append(stamp)
+
+    (name_count,) = _U32.unpack_from(payload, offset)
+    offset += _U32.size
+    names = []
+    for _ in range(name_count):
+        (size,) = _U32.unpack_from(payload, offset)
+        offset += _U32.size
+        names.append(str(payload[offset:offset + size], "utf-8"))
+        offset += size
+
+    (set_count,) = _U32.unpack_from(payload, offset)
+    offset += _U32.size
+    sets = []
+    for _ in range(set_count):
+        (size,) = _U32.unpack_from(payload, offset)
+        offset += _U32.size
+        indexes = struct.unpack_from(f"<{size}I", payload, offset)
+        offset += 4 * size
+        sets.append(tuple(names[index] for index in indexes))
+
+    (count,) = _U32.unpack_from(payload, offset)
+    offset += _U32.size
+    for _ in range(count):
+        set_index, key_size = _RECORD.unpack_from(payload, offset)
+        offset += _RECORD.size
+        contract_number = str(payload[offset:offset + key_size], "utf-8")
+        offset += key_size
+        components = sets[set_index]
+        mask_size = _mask_size(components)
+        archived_mask = int.from_bytes(payload[offset:offset + mask_size], "little")
+        offset += mask_size
+        values = array("q")
+        values.frombytes(payload[offset:offset + 32 * len(components)])
+        offset += 32 * len(components)
+        if sys.byteorder == "big":
+            values.byteswap()
+        archived = frozenset(
+            name for index, name in enumerate(components) if archived_mask & (1 << index)
+        )
+        if not store.restore(contract_number, components, archived, values):
+            break
+    else:
+        if offset != len(payload):
+            raise SnapshotError("trailing data")
+    return stamps
+
+
+async def load_snapshot(
+    store: StateStore, shard_set: ShardSet, path: Path, max_bytes: int
+) -> SnapshotInfo:
+    """
+    Fill ``store`` from the snapshot at ``path`` and what was stored since.
+
+    Raises SnapshotError, leaving the store empty, when the snapshot cannot
+    be used.
+    """
+    stamps_now = await shard_stamps(shard_set)
+    store.start(max_bytes)
+    try:
+        with path.open("rb") as source:
+            # mmap refuses empty files, e.g. after a crash before the first write
+            if os.fstat(source.fileno()).st_size == 0:
+                raise SnapshotError("empty")
+            with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                try:
+                    stamps, complete = _read_records(view, store, stamps_now)
+                except (struct.error, IndexError, UnicodeDecodeError, ValueError) as exc:
+                    raise SnapshotError(f"corrupt: {exc}") from exc
+    except BaseException:
+        store.clear()
+        raise
+    contracts = len(store)
+    store.complete = store.complete and complete
+
+    async def catch_up(shard: int) -> tuple[int, int]:
+        before = len(store)
+
+        async def replay(db: AsyncSession) -> int:
+            await store.load_contracts(db, after_rowid=stamps[shard].contract_rowid)
+            return await store.replay_events(db, stamps[shard].sequence)
+
+        events = await shard_set.run_on(shard, replay)
+        return len(store) - before, events
+
+    # One shard at a time, the contract counts are per shard
+    replayed = [await catch_up(shard) for shard in range(shard_set.count)]
+    return SnapshotInfo(
+        contracts,
+        sum(contracts for contracts, _ in replayed),
+        sum(events for _, events in replayed),
+    )
+
+
+async def load_or_warm(store: StateStore, shard_set: ShardSet, path: Path, max_bytes: int) -> None:
+    """Start from the snapshot when it is usable, else rebuild from the database."""
+    if path.is_file():
+        started = time.perf_counter()
+        try:
+            info = await load_snapshot(store, shard_set, path, max_bytes)
+        except (OSError, SnapshotError) as exc:
+            logger.warning("State snapshot unusable, rebuilding from the database", reason=str(exc))
+        else:
+            logger.info(
+                "State store loaded from snapshot",
+                contracts=info.contracts,
+                replayed_contracts=info.replayed_contracts,
+                replayed_events=info.replayed_events,
+                complete=store.complete,
+                duration_ms=round((time.perf_counter() - started) * 1000, 3),
+            )
+            return
+    await store.warm(shard_set, max_bytes)
+
+
+async def run_periodic_snapshots(
+    store: StateStore,
+    shard_set: ShardSet,
+    path: Path,
+    interval: float,
+    coherence: Optional[CacheCoherence] = None,
+) -> None:
+    """Write a snapshot every ``interval`` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await write_snapshot(store, shard_set, path, coherence)
+        except Exception:
+            logger.exception("State snapshot failed")
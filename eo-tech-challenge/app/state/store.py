@@ -0,0 +1,402 @@
+"""
+In-process copy of the current component state of every contract.
+
+A component's timeline only depends on its latest start and latest end by
+created_at, so that is all a contract keeps: four integers per component
+(start date ordinal, start created_at in microseconds, end date ordinal, end
+created_at in microseconds, 0 meaning none) in one ``array('q')``. The store
+is loaded from the database at startup and updated after every write of
+this process. Writes of other processes are applied by app.state.coherence,
+which is required as soon as there is more than one writer.
+
+When loading or a new contract would exceed STATE_STORE_MAX_BYTES, the store
+stops taking contracts and is no longer ``complete``: contracts it does not
+hold are then looked up in the database as before.
+"""
+import asyncio
+import itertools
+import sys
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from loguru import logger
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.memory import StructureSize, track
+from app.core.metrics import STATE_STORE_BYTES, STATE_STORE_CONTRACTS
+from app.db.models.contract import Contract
+from app.db.models.event import Event
+from app.db.sharding import ShardSet
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Offsets of a component's four values in ContractState.values
+_START, _START_AT, _END, _END_AT = range(4)
+
+# Rows fetched per round trip while warming up
+WARM_BATCH_SIZE = 10000
+
+# Estimated cost of a dict entry (hash, key and value pointers plus slack)
+_DICT_ENTRY_BYTES = 40
+
+
+def micros(created_at: datetime) -> int:
+    """created_at as microseconds since the epoch, compared like the database does."""
+    # Stored values lose their timezone, see _publish_change
+    return (created_at.replace(tzinfo=None) - _EPOCH) // _MICROSECOND
+
+
+def _from_ordinal(value: int) -> Optional[date]:
+    return date.fromordinal(value) if value else None
+
+
+class ComponentState(NamedTuple):
+    start: Optional[date]
+    end: Optional[date]
+    # Microseconds since the epoch of the latest start and end, 0 when none
+    start_at: int
+    end_at: int
+
+
+class ContractState:
+    """Components of one contract and their latest start and end."""
+
+    __slots__ = ("components", "archived", "values")
+
+    def __init__(self, components: tuple[str, ...]):
+        self.components = components
+        # Components with an archive summary, see handle_event_creation
+        self.archived: frozenset[str] = frozenset()
+        self.values = array("q", bytes(8 * 4 * len(components)))
+
+    def component(self, name: str) -> ComponentState:
+        offset = 4 * self.components.index(name)
+        start, start_at, end, end_at = self.values[offset:offset + 4]
+        return ComponentState(_from_ordinal(start), _from_ordinal(end), start_at, end_at)
+
+    def timeline(self) -> dict[str, tuple[Optional[date], Optional[date]]]:
+        values = self.values
+        return {
+            name: (_from_ordinal(values[4 * index + _START]), _from_ordinal(values[4 * index + _END]))
+            for index, name in enumerate(self.components)
+        }
+
+    def apply(self, component: str, is_start: bool, day: date, created_at_us: int) -> None:
+        """Record an event; it wins if it is not older than the current one."""
+        if component not in self.components:
+            return
+        offset = 4 * self.components.index(component) + (_START if is_start else _END)
+        if not self.values[offset] or created_at_us >= self.values[offset + 1]:
+            self.values[offset] = day.toordinal()
+            self.values[offset + 1] = created_at_us
+
+    def nbytes(self, contract_number: str) -> int:
+        return (
+            sys.getsizeof(self)
+            + sys.getsizeof(self.values)
+            + sys.getsizeof(contract_number)
+            + _DICT_ENTRY_BYTES
+        )
+
+
+def _apply_summary(state: ContractState, archive_summary: dict) -> None:
+    """Apply the latest archived start and end of the components in ``archive_summary``."""
+    for component, summary in archive_summary.items():
+        for action in ("start", "end"):
+            if summary.get(action) is not None:
+                state.apply(
+                    component,
+                    action == "start",
+                    date.fromisoformat(summary[action]),
+                    micros(datetime.fromisoformat(summary[f"{action}_at"])),
+                )
+
+
+class StateStore:
+    def __init__(self):
+        self._contracts: dict[str, ContractState] = {}
+        # One shared tuple per distinct component list
+        self._component_sets: dict[tuple[str, ...], tuple[str, ...]] = {}
+        # Contracts that were deleted: the database may still hold their
+        # events, so they are read from it until the next warm-up
+        self._fallback: set[str] = set()
+        # Database writes whose store update has not happened yet
+        self._inflight: set[int] = set()
+        self._write_ids = itertools.count()
+        self.max_bytes = 0
+        self.nbytes = 0
+        self.enabled = False
+        self.complete = False
+
+    def __len__(self) -> int:
+        return len(self._contracts)
+
+    def get(self, contract_number: str) -> Optional[ContractState]:
+        return self._contracts.get(contract_number)
+
+    def items(self) -> Iterable[tuple[str, ContractState]]:
+        return self._contracts.items()
+
+    @contextmanager
+    def writing(self) -> Iterator[None]:
+        """Wrap a database write together with the store update that follows it."""
+        write_id = next(self._write_ids)
+        self._inflight.add(write_id)
+        try:
+            yield
+        finally:
+            self._inflight.discard(write_id)
+
+    async def settle(self, timeout: float) -> bool:
+        """
+        Wait until the writes in flight now have updated the store.
+
+        Writes starting meanwhile are not waited for. False on timeout.
+        """
+        pending = set(self._inflight)
+        deadline = time.monotonic() + timeout
+        while pending & self._inflight:
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.001)
+        return True
+
+    def knows_absent(self, contract_number: str) -> bool:
+        """True when the contract certainly does not exist, no query needed."""
+        return (
+            self.complete
+            and contract_number not in self._contracts
+            and contract_number not in self._fallback
+        )
+
+    def put_contract(
+        self,
+        contract_number: str,
+        components: Iterable[str],
+        archive_summary: Optional[dict] = None,
+    ) -> None:
+        if not self.enabled or contract_number in self._contracts or contract_number in self._fallback:
+            return
+        components = tuple(components)
+        components = self._component_sets.setdefault(components, components)
+        state = ContractState(components)
+        size = state.nbytes(contract_number)
+        if self.nbytes + size > self.max_bytes:
+            if self.complete:
+                logger.warning(
+                    "State store memory cap reached, further contracts are read from the database",
+                    contracts=len(self._contracts),
+                    max_bytes=self.max_bytes,
+                )
+            self.complete = False
+            return
+        _apply_summary(state, archive_summary or {})
+        if archive_summary:
+            state.archived = frozenset(archive_summary)
+        self._add(contract_number, state, size)
+
+    def _add(self, contract_number: str, state: ContractState, size: int) -> None:
+        self._contracts[contract_number] = state
+        self.nbytes += size
+        STATE_STORE_CONTRACTS.set(len(self._contracts))
+        STATE_STORE_BYTES.set(self.nbytes)
+
+    def restore(
+        self,
+        contract_number: str,
+        components: tuple[str, ...],
+        archived: frozenset[str],
+        values: array,
+    ) -> bool:
+        """Add a contract read from a snapshot; False once the memory cap is reached."""
+        components = self._component_sets.setdefault(components, components)
+        state = ContractState(components)
+        state.archived = archived
+        state.values = values
+        size = state.nbytes(contract_number)
+        if self.nbytes + size > self.max_bytes:
+            self.complete = False
+            return False
+        self._add(contract_number, state, size)
+        return True
+
+    def start(self, max_bytes: int) -> None:
+        """Empty the store and accept contracts up to ``max_bytes``."""
+        self.clear()
+        self.max_bytes = max_bytes
+        self.enabled = True
+        self.complete = True
+
+    def apply_event(
+        self, contract_number: str, component: str, event_type: str, day: date, created_at: datetime
+    ) -> None:
+        state = self._contracts.get(contract_number)
+        if state is not None:
+            state.apply(component, event_type.endswith("_start"), day, micros(created_at))
+
+    def set_components(
+        self,
+        contract_number: str,
+        components: Iterable[str],
+        events: Iterable[tuple[str, str, date, datetime]] = (),
+    ) -> None:
+        """
+        Change the components of a held contract.
+
+        Kept components keep their values; added ones start from ``events``,
+        (component, type, date, created_at) tuples of their latest start and end.
+        """
+        state = self._contracts.get(contract_number)
+        if state is None:
+            return
+        components = tuple(components)
+        components = self._component_sets.setdefault(components, components)
+        updated = ContractState(components)
+        updated.archived = state.archived
+        for index, name in enumerate(components):
+            if name in state.components:
+                offset = 4 * state.components.index(name)
+                updated.values[4 * index:4 * index + 4] = state.values[offset:offset + 4]
+        for component, event_type, day, created_at in events:
+            updated.apply(component, event_type.endswith("_start"), day, micros(created_at))
+        self._contracts[contract_number] = updated
+        self.nbytes += updated.nbytes(contract_number) - state.nbytes(contract_number)
+        STATE_STORE_BYTES.set(self.nbytes)
+
+    def mark_archived(self, contract_number: str, components: Iterable[str]) -> None:
+        state = self._contracts.get(contract_number)
+        if state is not None:
+            state.archived = state.archived | frozenset(components)
+
+    def discard(self, contract_number: str) -> None:
+        state = self._contracts.pop(contract_number, None)
+        if state is not None:
+            self.nbytes -= state.nbytes(contract_number)
+            STATE_STORE_CONTRACTS.set(len(self._contracts))
+            STATE_STORE_BYTES.set(self.nbytes)
+        if self.enabled:
+            self._fallback.add(contract_number)
+
+    async def _contract_row(self, db: AsyncSession, contract_number: str):
+        return (
+            await db.execute(
+                select(Contract.components, Contract.archive_summary).where(
+                    Contract.contract_number == contract_number
+                )
+            )
+        ).one_or_none()
+
+    async def load_contract(self, db: AsyncSession, contract_number: str) -> None:
+        """Add a contract created by another process; its events follow in the event log."""
+        if not self.enabled or contract_number in self._contracts or contract_number in self._fallback:
+            return
+        row = await self._contract_row(db, contract_number)
+        if row is not None:
+            self.put_contract(contract_number, *row)
+
+    async def refresh(self, db: AsyncSession, contract_number: str) -> None:
+        """
+        Apply another process's component update or archiving of a held contract.
+
+        Kept components are left alone, their events follow in the event log;
+        added ones are loaded with their latest start and end, hot or archived.
+        """
+        state = self._contracts.get(contract_number)
+        if state is None:
+            return
+        row = await self._contract_row(db, contract_number)
+        if row is None:
+            self.discard(contract_number)
+            return
+        components, archive_summary = row
+        added = [component for component in components if component not in state.components]
+        events = []
+        if added:
+            # Latest event per type, as in _load_shard
+            events = await db.execute(
+                select(Event.component_name, Event.type, Event.date, func.max(Event.created_at))
+                .where(Event.contract_number == contract_number, Event.component_name.in_(added))
+                .group_by(Event.type)
+            )
+        archive_summary = archive_summary or {}
+        if tuple(components) != state.components:
+            self.set_components(contract_number, components, events)
+            _apply_summary(
+                self._contracts[contract_number],
+                {component: archive_summary[component] for component in added if component in archive_summary},
+            )
+        self.mark_archived(contract_number, archive_summary)
+
+    def clear(self) -> None:
+        self._contracts.clear()
+        self._component_sets.clear()
+        self._fallback.clear()
+        self.nbytes = 0
+        self.enabled = False
+        self.complete = False
+        STATE_STORE_CONTRACTS.set(0)
+        STATE_STORE_BYTES.set(0)
+
+    async def load_contracts(self, db: AsyncSession, after_rowid: int = 0) -> None:
+        """Add the contracts of one shard, or those stored after ``after_rowid``."""
+        query = select(Contract.contract_number, Contract.components, Contract.archive_summary)
+        if after_rowid:
+            query = query.where(literal_column("contract.rowid") > after_rowid)
+        contracts = await db.stream(query)
+        async for rows in contracts.partitions(WARM_BATCH_SIZE):
+            for contract_number, components, archive_summary in rows:
+                self.put_contract(contract_number, components, archive_summary)
+
+    async def replay_events(self, db: AsyncSession, after_sequence: int) -> int:
+        """Apply the events of one shard stored after ``after_sequence``."""
+        events = await db.stream(
+            select(Event.contract_number, Event.component_name, Event.type, Event.date, Event.created_at)
+            .where(Event.sequence > after_sequence)
+            .order_by(Event.sequence)
+        )
+        replayed = 0
+        async for rows in events.partitions(WARM_BATCH_SIZE):
+            for contract_number, component, event_type, day, created_at in rows:
+                self.apply_event(contract_number, component, event_type, day, created_at)
+            replayed += len(rows)
+        return replayed
+
+    async def _load_shard(self, db: AsyncSession) -> None:
+        await self.load_contracts(db)
+        # Latest event per contract and type. SQLite takes the bare columns of
+        # an aggregate query from the row holding max(created_at).
+        latest = await db.stream(
+            select(
+                Event.contract_number,
+                Event.component_name,
+                Event.type,
+                Event.date,
+                func.max(Event.created_at),
+            ).group_by(Event.contract_number, Event.type)
+        )
+        async for rows in latest.partitions(WARM_BATCH_SIZE):
+            for contract_number, component, event_type, day, created_at in rows:
+                self.apply_event(contract_number, component, event_type, day, created_at)
+
+    async def warm(self, shard_set: ShardSet, max_bytes: int) -> None:
+        """Load every contract's state, up to ``max_bytes``."""
+        started = time.perf_counter()
+        self.start(max_bytes)
+        await shard_set.fan_out(self._load_shard)
+        logger.info(
+            "State store warmed",
+            contracts=len(self._contracts),
+            bytes=self.nbytes,
+            bytes_per_contract=self.nbytes // len(self._contracts) if self._contracts else 0,
+            complete=self.complete,
+            duration_ms=round((time.perf_counter() - started) * 1000, 3),
+        )
+
+
+state_store = StateStore()
+track("state_store", lambda: StructureSize(len(state_store), state_store.nbytes))
@@ -0,0 +1,53 @@
+"""
+Compare two benchmark result files:
+
+    python -m benchmarks.compare baseline.json candidate.json
+"""
+import argparse
+import json
+from pathlib import Path
+
+
+def flatten(results: dict, prefix: str = "") -> dict[str, float]:
+    """Flatten nested result dicts into dotted keys with numeric values."""
+    flat: dict[str, float] = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline: dict, candidate: dict) -> list[tuple[str, float | None, float | None, float | None]]:
+    """Return (metric, baseline, candidate, change in %) rows."""
+    old = flatten(baseline["results"])
+    new = flatten(candidate["results"])
+    rows = []
+    for name in sorted(old.keys() | new.keys()):
+        before, after = old.get(name), new.get(name)
+        change = None
+        if before not in (None, 0) and after is not None:
+            change = round((after - before) / before * 100, 2)
+        rows.append((name, before, after, change))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text())
+    candidate = json.loads(args.candidate.read_text())
+    print(f"baseline:  {baseline['meta'].get('commit')}")
+    print(f"candidate: {candidate['meta'].get('commit')}")
+    for name, before, after, change in compare(baseline, candidate):
+        change_text = "" if change is None else f"{change:+.2f}%"
+        print(f"{name:<50} {before!s:>14} {after!s:>14} {change_text:>10}")
+
+
+if __name__ == "__main__":
+    main()
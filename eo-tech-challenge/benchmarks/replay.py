@@ -0,0 +1,234 @@
+"""
+Replay captured production traffic (see app.core.capture) and compare.
+
+Against the app in-process, on the configured database, or a running
+instance, at the captured pace scaled by --speed (0: as fast as possible):
+
+    python -m benchmarks.replay capture.ndjson --speed 4 --concurrency 64
+    python -m benchmarks.replay capture.ndjson --target http://localhost:8000
+
+Requests are started in captured order, at most --concurrency at a time.
+The report holds throughput, latency percentiles overall and per route next
+to the captured ones, errors (5xx and transport failures) and divergences
+from the captured responses: other status codes, or other event verdicts
+for ingest requests. Replay against a copy of the captured data (see
+app.cli.dump), otherwise verdicts diverge for that reason alone.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from benchmarks.run import percentile
+
+# Divergences listed in the report, the rest is only counted
+MAX_EXAMPLES = 20
+
+
+@dataclass
+class Outcome:
+    record: dict
+    line: int
+    latency: float
+    # Seconds the request started after its scheduled time
+    lag: float
+    status: Optional[int] = None
+    body: Optional[str] = None
+    error: Optional[str] = None
+
+
+def read_capture(path: Path) -> tuple[list[tuple[int, dict]], int]:
+    """Replayable records with their line numbers, and the number skipped."""
+    records, skipped = [], 0
+    with path.open(encoding="utf-8") as source:
+        for line_no, text in enumerate(source, start=1):
+            if not text.strip():
+                continue
+            record = json.loads(text)
+            # Recorded by size only
+            if record["body"] is None and record["body_bytes"]:
+                skipped += 1
+                continue
+            records.append((line_no, record))
+    records.sort(key=lambda item: item[1]["ts"])
+    return records, skipped
+
+
+def verdicts(body: Optional[str]) -> Optional[list[str]]:
+    """Event verdicts of an ingest response, single or batch; None for other responses."""
+    try:
+        data = json.loads(body) if body else None
+    except ValueError:
+        return None
+    items = data if isinstance(data, list) else [data]
+    if not items or not all(isinstance(item, dict) and item.get("status") in ("accepted", "rejected") for item in items):
+        return None
+    return [item["status"] for item in items]
+
+
+def latency_percentiles(samples_ms: list[float]) -> dict[str, float]:
+    if not samples_ms:
+        return {"count": 0}
+    return {
+        "count": len(samples_ms),
+        "mean_ms": round(statistics.fmean(samples_ms), 4),
+        "p50_ms": round(percentile(samples_ms, 50), 4),
+        "p90_ms": round(percentile(samples_ms, 90), 4),
+        "p99_ms": round(percentile(samples_ms, 99), 4),
+        "max_ms": round(max(samples_ms), 4),
+    }
+
+
+async def replay(
+    client: httpx.AsyncClient, records: list[tuple[int, dict]], speed: float, concurrency: int
+) -> tuple[list[Outcome], float]:
+    """Send ``records`` on their scaled schedule; the outcomes and the elapsed seconds."""
+    slots = asyncio.Semaphore(concurrency)
+    outcomes: list[Outcome] = []
+
+    async def send(line_no: int, record: dict, lag: float) -> None:
+        outcome = Outcome(record, line_no, 0.0, lag)
+        request_started = time.perf_counter()
+        try:
+            response = await client.request(
+                record["method"],
+                record["path"] + (f"?{record['query']}" if record["query"] else ""),
+                content=(record["body"] or "").encode(),
+                headers=record["headers"],
+            )
+            outcome.status, outcome.body = response.status_code, response.text
+        except httpx.HTTPError as exc:
+            outcome.error = f"{type(exc).__name__}: {exc}"
+        finally:
+            outcome.latency = time.perf_counter() - request_started
+            outcomes.append(outcome)
+            slots.release()
+
+    tasks = []
+    first = records[0][1]["ts"] if records else 0.0
+    started = time.perf_counter()
+    for line_no, record in records:
+        due = (record["ts"] - first) / speed if speed else 0.0
+        delay = due - (time.perf_counter() - started)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await slots.acquire()
+        lag = max(0.0, time.perf_counter() - started - due)
+        tasks.append(asyncio.create_task(send(line_no, record, lag)))
+    await asyncio.gather(*tasks)
+    return outcomes, time.perf_counter() - started
+
+
+def build_report(outcomes: list[Outcome], elapsed: float, skipped: int, speed: float) -> dict:
+    routes: dict[str, list[Outcome]] = defaultdict(list)
+    for outcome in outcomes:
+        routes[f"{outcome.record['method']} {outcome.record['route']}"].append(outcome)
+
+    examples = []
+    status_divergences = verdict_divergences = errors = 0
+    for outcome in sorted(outcomes, key=lambda outcome: outcome.line):
+        record = outcome.record
+        if outcome.error is not None or outcome.status >= 500:
+            errors += 1
+        if outcome.error is not None:
+            continue
+        captured, replayed = verdicts(record["response"]), verdicts(outcome.body)
+        if outcome.status != record["status"]:
+            status_divergences += 1
+        elif captured is not None and replayed is not None and captured != replayed:
+            verdict_divergences += 1
+        else:
+            continue
+        if len(examples) < MAX_EXAMPLES:
+            examples.append(
+                {
+                    "line": outcome.line,
+                    "request": f"{record['method']} {record['path']}",
+                    "captured": {"status": record["status"], "verdicts": captured},
+                    "replayed": {"status": outcome.status, "verdicts": replayed},
+                }
+            )
+
+    captured_span = max((o.record["ts"] for o in outcomes), default=0.0) - min(
+        (o.record["ts"] for o in outcomes), default=0.0
+    )
+    return {
+        "requests": len(outcomes),
+        "skipped": skipped,
+        "speed": speed,
+        "seconds": round(elapsed, 4),
+        "captured_seconds": round(captured_span, 4),
+        "requests_per_sec": round(len(outcomes) / elapsed, 2) if elapsed else 0.0,
+        "errors": errors,
+        "status_divergences": status_divergences,
+        "verdict_divergences": verdict_divergences,
+        "latency": latency_percentiles([o.latency * 1000 for o in outcomes]),
+        "captured_latency": latency_percentiles([o.record["duration_ms"] for o in outcomes]),
+        "schedule_lag_p99_ms": round(percentile([o.lag * 1000 for o in outcomes], 99), 4) if outcomes else 0.0,
+        "routes": {
+            route: {
+                "errors": sum(o.error is not None or o.status >= 500 for o in route_outcomes),
+                "latency": latency_percentiles([o.latency * 1000 for o in route_outcomes]),
+                "captured_latency": latency_percentiles([o.record["duration_ms"] for o in route_outcomes]),
+            }
+            for route, route_outcomes in sorted(routes.items())
+        },
+        "divergences": examples,
+    }
+
+
+@asynccontextmanager
+async def replay_client(target: Optional[str], concurrency: int) -> AsyncIterator[httpx.AsyncClient]:
+    """A client for ``target``, or for the app served in-process with its lifespan."""
+    if target is not None:
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(base_url=target, limits=limits, timeout=60) as client:
+            yield client
+        return
+
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=60) as client:
+            yield client
+
+
+async def run_replay(
+    path: Path, target: Optional[str] = None, speed: float = 1.0, concurrency: int = 32
+) -> dict:
+    records, skipped = read_capture(path)
+    async with replay_client(target, concurrency) as client:
+        outcomes, elapsed = await replay(client, records, speed, concurrency)
+    return build_report(outcomes, elapsed, skipped, speed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("capture", type=Path, help="NDJSON file written with CAPTURE_ENABLED")
+    parser.add_argument("--target", help="base URL of a running instance (default: in-process)")
+    parser.add_argument("--speed", type=float, default=1.0, help="pace multiplier, 0 for as fast as possible")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight at most")
+    parser.add_argument("--output", type=Path, default=None, help="report file (JSON)")
+    args = parser.parse_args()
+    if args.speed < 0 or args.concurrency < 1:
+        parser.error("--speed must not be negative and --concurrency must be at least 1")
+
+    report = asyncio.run(run_replay(args.capture, args.target, args.speed, args.concurrency))
+    print(json.dumps(report, indent=2))
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
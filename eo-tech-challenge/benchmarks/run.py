@@ -0,0 +1,353 @@
+"""
+In-process performance benchmark suite.
+
+Runs the ASGI app through httpx against a throw-away SQLite database and
+writes machine-readable results that can be diffed between commits. Logging
+follows the usual settings, run with LOG_LEVEL=ERROR for quiet output:
+
+    python -m benchmarks.run --contracts 200 --output results.json
+    python -m benchmarks.compare old.json new.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import AsyncIterator
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api.services.event_services import build_timeline, get_component_name
+from app.db.crud.event import get_events_for_contract
+from app.db.models import Base, Contract, Event
+from app.db.session import get_async_session, get_session_factory
+from app.main import app
+from benchmarks.startup import import_profile, measure_startup
+from benchmarks.workload import Workload, WorkloadConfig, generate_workload, invalid_events, request_body
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+@dataclass
+class SuiteConfig:
+    contracts: int = 100
+    events_per_contract: int = 20
+    violation_rate: float = 0.1
+    batch_size: int = 100
+    history_lengths: list[int] = field(default_factory=lambda: [10, 100, 500])
+    timeline_contracts: int = 10
+    timeline_reads: int = 200
+    startup_runs: int = 5
+    seed: int = 0
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def latency_summary(samples_s: list[float]) -> dict[str, float]:
+    samples_ms = [sample * 1000 for sample in samples_s]
+    return {
+        "count": len(samples_ms),
+        "mean_ms": round(statistics.fmean(samples_ms), 4),
+        "p50_ms": round(percentile(samples_ms, 50), 4),
+        "p99_ms": round(percentile(samples_ms, 99), 4),
+        "max_ms": round(max(samples_ms), 4),
+    }
+
+
+class CountingSessionFactory:
+    """Session factory that counts the sessions it opens."""
+
+    def __init__(self, engine: AsyncEngine):
+        self._factory = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
+        self.opened = 0
+
+    def __call__(self) -> AsyncSession:
+        self.opened += 1
+        return self._factory()
+
+
+@asynccontextmanager
+async def bench_app(
+    directory: Path, name: str
+) -> AsyncIterator[tuple[AsyncClient, AsyncEngine, CountingSessionFactory]]:
+    """Serve the app in-process on a fresh SQLite database."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{directory / name}.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = CountingSessionFactory(engine)
+
+    async def get_bench_session():
+        async with session_factory() as session:
+            yield session
+
+    overrides = {get_async_session: get_bench_session, get_session_factory: lambda: session_factory}
+    previous = {dependency: app.dependency_overrides.get(dependency) for dependency in overrides}
+    app.dependency_overrides.update(overrides)
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            yield client, engine, session_factory
+    finally:
+        for dependency, override in previous.items():
+            if override is None:
+                app.dependency_overrides.pop(dependency, None)
+            else:
+                app.dependency_overrides[dependency] = override
+        await engine.dispose()
+
+
+async def _create_contracts(client: AsyncClient, workload: Workload) -> None:
+    for contract in workload.contracts:
+        response = await client.post("/contract/", json=contract)
+        response.raise_for_status()
+
+
+async def bench_single_ingest(directory: Path, workload: Workload) -> dict:
+    async with bench_app(directory, "single_ingest") as (client, _, _):
+        await _create_contracts(client, workload)
+        latencies = []
+        mismatches = 0
+        started = time.perf_counter()
+        for event in workload.events:
+            request_started = time.perf_counter()
+            response = await client.post("/event", json=request_body(event))
+            latencies.append(time.perf_counter() - request_started)
+            mismatches += response.json()["status"] != event["expected"]
+        elapsed = time.perf_counter() - started
+
+    return {
+        "events": len(workload.events),
+        "seconds": round(elapsed, 4),
+        "events_per_sec": round(len(workload.events) / elapsed, 2),
+        "latency": latency_summary(latencies),
+        "verdict_mismatches": mismatches,
+    }
+
+
+async def bench_batch_ingest(directory: Path, workload: Workload, batch_size: int) -> dict:
+    async with bench_app(directory, "batch_ingest") as (client, _, _):
+        await _create_contracts(client, workload)
+        mismatches = 0
+        started = time.perf_counter()
+        for offset in range(0, len(workload.events), batch_size):
+            chunk = workload.events[offset:offset + batch_size]
+            response = await client.post("/event/batch", json=[request_body(e) for e in chunk])
+            response.raise_for_status()
+            mismatches += sum(
+                result["status"] != event["expected"]
+                for result, event in zip(response.json(), chunk)
+            )
+        elapsed = time.perf_counter() - started
+
+    return {
+        "events": len(workload.events),
+        "batch_size": batch_size,
+        "seconds": round(elapsed, 4),
+        "events_per_sec": round(len(workload.events) / elapsed, 2),
+        "verdict_mismatches": mismatches,
+    }
+
+
+async def bench_rejection(directory: Path, workload: Workload) -> dict:
+    """A bad producer: events refused for their type or shape, which must not use sessions."""
+    events = invalid_events(len(workload.events))
+    async with bench_app(directory, "rejection") as (client, _, sessions):
+        latencies = []
+        mismatches = 0
+        started = time.perf_counter()
+        for event in events:
+            request_started = time.perf_counter()
+            response = await client.post("/event", json=event)
+            latencies.append(time.perf_counter() - request_started)
+            mismatches += response.json()["status"] != "rejected"
+        elapsed = time.perf_counter() - started
+
+    return {
+        "events": len(events),
+        "seconds": round(elapsed, 4),
+        "events_per_sec": round(len(events) / elapsed, 2),
+        "latency": latency_summary(latencies),
+        "sessions_opened": sessions.opened,
+        "verdict_mismatches": mismatches,
+    }
+
+
+def _event_rows(workload: Workload) -> tuple[list[Contract], list[Event]]:
+    contracts = [
+        Contract(contract_number=c["contract_number"], components=c["components"])
+        for c in workload.contracts
+    ]
+    events = [
+        Event(
+            contract_number=e["contract_number"],
+            component_name=get_component_name(e["type"]),
+            type=e["type"],
+            date=date.fromisoformat(e["date"]),
+            created_at=datetime.fromisoformat(e["created_at"]),
+        )
+        for e in workload.events
+        if e["expected"] == "accepted"
+    ]
+    return contracts, events
+
+
+async def _seed(engine: AsyncEngine, workload: Workload) -> None:
+    """Insert a workload's accepted events directly, bypassing the API."""
+    contracts, events = _event_rows(workload)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with session_factory() as session:
+        session.add_all(contracts)
+        session.add_all(events)
+        await session.commit()
+
+
+async def bench_timeline(directory: Path, config: SuiteConfig) -> dict:
+    results = {}
+    for length in config.history_lengths:
+        workload = generate_workload(
+            WorkloadConfig(
+                contracts=config.timeline_contracts,
+                events_per_contract=length,
+                violation_rate=0.0,
+                seed=config.seed,
+            )
+        )
+        async with bench_app(directory, f"timeline_{length}") as (client, engine, _):
+            await _seed(engine, workload)
+            numbers = [c["contract_number"] for c in workload.contracts]
+            for number in numbers:
+                # Warm-up: first reads pay for connection setup and statement caching
+                await client.get(f"/{number}/contract_timeline")
+            latencies = []
+            for index in range(config.timeline_reads):
+                request_started = time.perf_counter()
+                response = await client.get(f"/{numbers[index % len(numbers)]}/contract_timeline")
+                latencies.append(time.perf_counter() - request_started)
+                response.raise_for_status()
+        results[str(length)] = latency_summary(latencies)
+    return results
+
+
+async def bench_memory_per_contract(directory: Path, workload: Workload) -> dict:
+    """Python heap held per contract once its history and timeline are materialized."""
+    async with bench_app(directory, "memory") as (_, engine, _):
+        await _seed(engine, workload)
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+        async with session_factory() as session:
+            tracemalloc.start()
+            baseline, _ = tracemalloc.get_traced_memory()
+            retained = []
+            for contract in workload.contracts:
+                events = await get_events_for_contract(session, contract["contract_number"])
+                retained.append((events, build_timeline(events)))
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    contracts = len(workload.contracts)
+    return {
+        "contracts": contracts,
+        "bytes_per_contract": round((current - baseline) / contracts),
+        "peak_bytes_per_contract": round((peak - baseline) / contracts),
+    }
+
+
+async def bench_startup(runs: int) -> dict:
+    """Time to first request of fresh processes, see benchmarks.startup."""
+    results = await asyncio.to_thread(measure_startup, runs)
+    results["slowest_imports"] = await asyncio.to_thread(import_profile, "app.main", 10)
+    return results
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_suite(config: SuiteConfig) -> dict:
+    workload = generate_workload(
+        WorkloadConfig(
+            contracts=config.contracts,
+            events_per_contract=config.events_per_contract,
+            violation_rate=config.violation_rate,
+            seed=config.seed,
+        )
+    )
+    with tempfile.TemporaryDirectory(prefix="eo-bench-") as tmp:
+        directory = Path(tmp)
+        results = {
+            "single_ingest": await bench_single_ingest(directory, workload),
+            "batch_ingest": await bench_batch_ingest(directory, workload, config.batch_size),
+            "rejection": await bench_rejection(directory, workload),
+            "timeline_read": await bench_timeline(directory, config),
+            "memory": await bench_memory_per_contract(directory, workload),
+            "startup": await bench_startup(config.startup_runs),
+        }
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": asdict(config),
+        },
+        "results": results,
+    }
+
+
+def _parse_args() -> tuple[SuiteConfig, Path | None]:
+    defaults = SuiteConfig()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contracts", type=int, default=defaults.contracts)
+    parser.add_argument("--events-per-contract", type=int, default=defaults.events_per_contract)
+    parser.add_argument("--violation-rate", type=float, default=defaults.violation_rate)
+    parser.add_argument("--batch-size", type=int, default=defaults.batch_size)
+    parser.add_argument(
+        "--history-lengths",
+        type=lambda value: [int(part) for part in value.split(",")],
+        default=defaults.history_lengths,
+        help="comma separated events-per-contract values for the timeline benchmark",
+    )
+    parser.add_argument("--timeline-contracts", type=int, default=defaults.timeline_contracts)
+    parser.add_argument("--timeline-reads", type=int, default=defaults.timeline_reads)
+    parser.add_argument("--startup-runs", type=int, default=defaults.startup_runs)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--output", type=Path, default=None, help="results file (JSON)")
+    args = parser.parse_args()
+    output = args.output
+    config = SuiteConfig(**{k: v for k, v in vars(args).items() if k != "output"})
+    return config, output
+
+
+def main() -> None:
+    config, output = _parse_args()
+    report = asyncio.run(run_suite(config))
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"{stamp}-{(report['meta']['commit'] or 'nogit')[:8]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(json.dumps(report["results"], indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
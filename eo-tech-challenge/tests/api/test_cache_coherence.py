@@ -0,0 +1,94 @@
+from datetime import date
+
+import pytest
+import pytest_asyncio
+
+from app.config import settings
+from app.core.change_feed import ChangeFeed
+from app.core.metrics import CACHE_COHERENCE_RESYNCS
+from app.state.coherence import CacheCoherence
+from app.state.contract_filter import ContractFilter
+from app.state.store import StateStore
+from tests.conftest import get_test_shard_set
+
+
+@pytest_asyncio.fixture
+async def other_worker(async_client, monkeypatch):
+    """Caches of a second worker, following the writes of this one."""
+    monkeypatch.setattr(settings, "CACHE_COHERENCE_INTERVAL_SECONDS", 0.5)
+    worker = CacheCoherence(StateStore(), ContractFilter(), ChangeFeed(100), origin="other-worker")
+    await worker.mark(get_test_shard_set())
+    await worker.filter.build(get_test_shard_set(), 1000, 0.01)
+    await worker.store.warm(get_test_shard_set(), settings.STATE_STORE_MAX_BYTES)
+    yield worker
+
+
+def _event(event_type: str, day: str, contract_number: str = "COH001") -> dict:
+    return {"type": event_type, "contract_number": contract_number, "date": day, "created_at": f"{day}T10:00:00"}
+
+
+# Test: Writes of one worker reach the caches of another
+@pytest.mark.asyncio
+async def test_caches_follow_other_workers(async_client, other_worker):
+    """Test that a poll applies created, updated and deleted contracts and new events."""
+    shard_set = get_test_shard_set()
+    for number in ("COH001", "COH002"):
+        await async_client.post("/contract/", json={"contract_number": number, "components": ["energy_supply"]})
+    await async_client.post("/event", json=_event("supply_energy_start", "2024-01-01"))
+    await other_worker.poll(shard_set)
+
+    assert not other_worker.filter.definitely_absent("COH001")
+    assert other_worker.store.get("COH001").timeline() == {"energy_supply": (date(2024, 1, 1), None)}
+    changes = other_worker.feed.read(other_worker.feed.cursor(0)).changes
+    assert [(change.contract_number, change.event_type) for change in changes] == [("COH001", "supply_energy_start")]
+
+    cursor = other_worker.feed.cursor()
+    await async_client.post("/event", json=_event("supply_energy_end", "2024-02-01"))
+    await async_client.patch("/contract/COH001", json={"add": ["battery_optimization"]})
+    await async_client.delete("/contract/COH002")
+    await other_worker.poll(shard_set)
+
+    state = other_worker.store.get("COH001")
+    assert state.components == ("energy_supply", "battery_optimization")
+    assert state.component("energy_supply").end.isoformat() == "2024-02-01"
+    assert other_worker.store.get("COH002") is None
+    assert other_worker.filter.definitely_absent("COH002")
+    changes = other_worker.feed.read(cursor).changes
+    assert [(change.component, change.event_type) for change in changes] == [("energy_supply", "supply_energy_end")]
+
+
+# Test: A worker skips its own writes
+@pytest.mark.asyncio
+async def test_own_writes_are_not_applied_twice(async_client, other_worker):
+    """Test that the changes and events of the polling worker itself change nothing."""
+    other_worker.origin = "this-worker"
+    shard_set = get_test_shard_set()
+    await other_worker.poll(shard_set)
+    contracts = other_worker.filter.contracts
+
+    from app.db.crud.change import ORIGIN
+
+    other_worker.origin = ORIGIN
+    await async_client.post("/contract/", json={"contract_number": "COH003", "components": ["energy_supply"]})
+    await other_worker.poll(shard_set)
+    assert other_worker.filter.contracts == contracts
+    assert other_worker.store.get("COH003") is None
+
+
+# Test: Pruned change log entries trigger a rebuild
+@pytest.mark.asyncio
+async def test_pruned_changes_rebuild_caches(async_client, other_worker, monkeypatch):
+    """Test that a cursor behind the pruned entries rebuilds the caches instead of missing writes."""
+    shard_set = get_test_shard_set()
+    await async_client.post("/contract/", json={"contract_number": "COH004", "components": []})
+    await other_worker.poll(shard_set)
+
+    await async_client.post("/contract/", json={"contract_number": "COH005", "components": []})
+    monkeypatch.setattr(settings, "CACHE_COHERENCE_RETENTION_SECONDS", -60)
+    assert await other_worker.prune(shard_set) == 2
+    await async_client.post("/contract/", json={"contract_number": "COH006", "components": []})
+
+    resyncs = CACHE_COHERENCE_RESYNCS.value()
+    await other_worker.poll(shard_set)
+    assert CACHE_COHERENCE_RESYNCS.value() == resyncs + 1
+    assert {"COH004", "COH005", "COH006"} <= {number for number, _ in other_worker.store.items()}
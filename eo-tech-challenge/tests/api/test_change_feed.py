@@ -0,0 +1,149 @@
+import asyncio
+import json
+from datetime import date
+
+import pytest
+
+from app.api.services.feed_services import stream_changes
+from app.core.change_feed import ChangeFeed
+
+
+async def _cursor(async_client) -> str:
+    response = await async_client.get("/changes", params={"timeout": 0})
+    assert response.status_code == 200
+    return response.json()["cursor"]
+
+
+async def _post(async_client, event_type: str, event_date: str, created_at: str, contract="FEED001"):
+    response = await async_client.post(
+        "/event",
+        json={"type": event_type, "contract_number": contract, "date": event_date, "created_at": created_at},
+    )
+    return response.json()["status"]
+
+
+async def _contract(async_client, contract="FEED001"):
+    await async_client.post(
+        "/contract/",
+        json={"contract_number": contract, "components": ["energy_supply", "battery_optimization"]},
+    )
+
+
+# Test: Accepted events publish the new component state
+@pytest.mark.asyncio
+async def test_accepted_events_publish_deltas(async_client):
+    """Test that deltas carry the new timeline and skip rejected or stale events."""
+    await _contract(async_client)
+    cursor = await _cursor(async_client)
+
+    assert await _post(async_client, "supply_energy_start", "2024-02-01", "2024-02-01T10:00:00") == "accepted"
+    assert await _post(async_client, "supply_energy_end", "2024-01-01", "2024-02-02T10:00:00") == "rejected"
+    # Accepted, but older than the latest start: the timeline does not change
+    assert await _post(async_client, "supply_energy_start", "2024-01-15", "2024-01-01T10:00:00") == "accepted"
+    assert await _post(async_client, "supply_energy_end", "2024-03-01", "2024-03-01T10:00:00") == "accepted"
+
+    page = (await async_client.get("/changes", params={"cursor": cursor, "timeout": 0})).json()
+    assert page["reset"] is False
+    assert [(c["component"], c["start"], c["end"]) for c in page["changes"]] == [
+        ("energy_supply", "2024-02-01", None),
+        ("energy_supply", "2024-02-01", "2024-03-01"),
+    ]
+
+    # Nothing new after the returned cursor
+    page = (await async_client.get("/changes", params={"cursor": page["cursor"], "timeout": 0})).json()
+    assert page["changes"] == []
+
+
+# Test: Filtering by contract and component
+@pytest.mark.asyncio
+async def test_change_feed_filters(async_client):
+    """Test that contract_number and component filters apply."""
+    await _contract(async_client, "FEED010")
+    await _contract(async_client, "FEED011")
+    cursor = await _cursor(async_client)
+
+    await _post(async_client, "supply_energy_start", "2024-02-01", "2024-02-01T10:00:00", "FEED010")
+    await _post(async_client, "battery_optimization_start", "2024-02-01", "2024-02-01T10:00:00", "FEED010")
+    await _post(async_client, "supply_energy_start", "2024-02-01", "2024-02-01T10:00:00", "FEED011")
+
+    page = (await async_client.get(
+        "/changes", params={"cursor": cursor, "timeout": 0, "contract_number": "FEED010"}
+    )).json()
+    assert len(page["changes"]) == 2
+    page = (await async_client.get(
+        "/changes", params={"cursor": cursor, "timeout": 0, "component": "energy_supply"}
+    )).json()
+    assert [c["contract_number"] for c in page["changes"]] == ["FEED010", "FEED011"]
+
+
+# Test: Long-polling returns as soon as a change arrives
+@pytest.mark.asyncio
+async def test_long_poll_wakes_up(async_client):
+    """Test that a waiting poll returns the change published meanwhile."""
+    await _contract(async_client)
+    cursor = await _cursor(async_client)
+
+    poll = asyncio.create_task(
+        async_client.get("/changes", params={"cursor": cursor, "timeout": 10, "contract_number": "FEED001"})
+    )
+    await asyncio.sleep(0.05)
+    assert not poll.done()
+    await _post(async_client, "supply_energy_start", "2024-02-01", "2024-02-01T10:00:00")
+
+    page = (await asyncio.wait_for(poll, 5)).json()
+    assert page["changes"][0]["start"] == "2024-02-01"
+
+
+# Test: Cursors that cannot be resumed
+@pytest.mark.asyncio
+async def test_cursor_reset():
+    """Test that foreign and overwritten cursors ask for a reload."""
+    feed = ChangeFeed(capacity=2)
+    assert feed.read("otherepoch:0").reset
+
+    start = feed.cursor()
+    for day in range(1, 4):
+        feed.publish("C1", "energy_supply", date(2024, 1, day), None, "supply_energy_start")
+    page = feed.read(start)
+    assert page.reset and page.cursor == feed.cursor()
+
+    page = feed.read(feed.cursor(1))
+    assert not page.reset
+    assert [change.sequence for change in page.changes] == [2, 3]
+
+
+# Test: Publishing does not run subscriber wake-ups inline
+@pytest.mark.asyncio
+async def test_publish_defers_wakeups():
+    """Test that waiters are woken by the event loop, not by publish."""
+    feed = ChangeFeed(capacity=10)
+    waiters = [asyncio.create_task(feed.wait(5)) for _ in range(100)]
+    await asyncio.sleep(0)
+
+    feed.publish("C1", "energy_supply", date(2024, 1, 1), None, "supply_energy_start")
+    assert not any(waiter.done() for waiter in waiters)
+    await asyncio.wait_for(asyncio.gather(*waiters), 1)
+
+
+# Test: SSE stream resumes from the last event id
+@pytest.mark.asyncio
+async def test_sse_stream_resumes():
+    """Test the SSE framing and resuming from an event id."""
+    feed = ChangeFeed(capacity=10)
+    start = feed.cursor()
+    feed.publish("C1", "energy_supply", date(2024, 1, 1), None, "supply_energy_start")
+    feed.publish("C1", "energy_supply", date(2024, 1, 1), date(2024, 2, 1), "supply_energy_end")
+
+    stream = stream_changes(feed, start, None, None)
+    first = (await anext(stream)).decode()
+    await stream.aclose()
+    lines = first.strip().split("\n")
+    assert lines[0] == f"id: {feed.cursor(1)}"
+    assert lines[1] == "event: timeline"
+    assert json.loads(lines[2].removeprefix("data: "))["start"] == "2024-01-01"
+
+    stream = stream_changes(feed, feed.cursor(1), None, None)
+    second = (await anext(stream)).decode()
+    await stream.aclose()
+    assert second.startswith(f"id: {feed.cursor(2)}\n")
+    assert '"end": "2024-02-01"' in second
@@ -3,4 +3,49 @@ import pytest
 @pytest.mark.asyncio
 async def test_contract_not_found(async_client):
     res = await async_client.get("/contract/unknown")
-    assert res.status_code == 404
\ No newline at end of file
+    assert res.status_code == 404
+
+def _event(event_type, day):
+    return {"type": event_type, "contract_number": "PATCH001", "date": day, "created_at": f"{day}T10:00:00"}
+
+
+# Test: Components can be added and removed unless their timeline is active
+@pytest.mark.asyncio
+async def test_update_contract_components(async_client):
+    """Test that a PATCH updates membership, keeps history and refuses to remove active components."""
+    await async_client.post("/contract/", json={"contract_number": "PATCH001", "components": ["energy_supply"]})
+    await async_client.post("/event", json=_event("supply_energy_start", "2024-01-01"))
+
+    res = await async_client.patch("/contract/PATCH001", json={"remove": ["energy_supply"]})
+    assert res.status_code == 409
+    res = await async_client.patch("/contract/PATCH001", json={"add": ["battery_optimization"]})
+    assert res.status_code == 200
+    assert res.json()["components"] == ["energy_supply", "battery_optimization"]
+    res = await async_client.post("/event", json=_event("battery_optimization_start", "2024-02-01"))
+    assert res.json()["status"] == "accepted"
+
+    # A terminated component can go; adding it back brings its timeline back
+    await async_client.post("/event", json=_event("supply_energy_end", "2024-03-01"))
+    res = await async_client.patch("/contract/PATCH001", json={"remove": ["energy_supply"]})
+    assert res.json()["components"] == ["battery_optimization"]
+    timeline = (await async_client.get("/PATCH001/contract_timeline")).json()
+    assert list(timeline["components"]) == ["battery_optimization"]
+    res = await async_client.post("/event", json=_event("supply_energy_start", "2024-04-01"))
+    assert res.json()["status"] == "rejected"
+
+    await async_client.patch("/contract/PATCH001", json={"add": ["energy_supply"]})
+    timeline = (await async_client.get("/PATCH001/contract_timeline")).json()
+    assert timeline["components"]["energy_supply"] == {"start": "2024-01-01", "end": "2024-03-01"}
+
+
+# Test: Invalid component updates are refused
+@pytest.mark.asyncio
+async def test_update_contract_components_errors(async_client):
+    """Test the 404 and 422 answers of the components PATCH."""
+    assert (await async_client.patch("/contract/unknown", json={"add": ["energy_supply"]})).status_code == 404
+    await async_client.post("/contract/", json={"contract_number": "PATCH002", "components": []})
+    assert (await async_client.patch("/contract/PATCH002", json={"add": ["solar"]})).status_code == 422
+    res = await async_client.patch(
+        "/contract/PATCH002", json={"add": ["energy_supply"], "remove": ["energy_supply"]}
+    )
+    assert res.status_code == 422
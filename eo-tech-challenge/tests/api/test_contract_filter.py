@@ -0,0 +1,97 @@
+import pytest
+import pytest_asyncio
+
+from app.config import settings
+from app.core.metrics import CONTRACT_FILTER_FALSE_POSITIVES, CONTRACT_FILTER_LOOKUPS
+from app.state.contract_filter import ContractFilter, contract_filter, dimensions
+from tests.conftest import get_test_shard_set
+
+CONTRACT = {"contract_number": "FILTER001", "components": ["energy_supply"]}
+
+
+def _event(contract_number: str) -> dict:
+    return {"type": "supply_energy_start", "contract_number": contract_number, "date": "2024-01-01",
+            "created_at": "2024-01-01T10:00:00"}
+
+
+@pytest_asyncio.fixture
+async def enabled_filter(async_client):
+    """Build the contract filter from the freshly emptied test database."""
+    await async_client.post("/contract/", json={**CONTRACT, "contract_number": "FILTER000"})
+    await contract_filter.build(
+        get_test_shard_set(), 1000, settings.CONTRACT_FILTER_FALSE_POSITIVE_RATE
+    )
+    yield contract_filter
+    contract_filter.clear()
+
+
+# Test: No false misses, false positives near the configured rate
+def test_filter_membership_and_rate():
+    """Test that added numbers are always found and unknown ones mostly rejected."""
+    rate = 0.01
+    numbers_filter = ContractFilter()
+    numbers_filter.start(5000, rate)
+    added = [f"C{index:06d}" for index in range(5000)]
+    for contract_number in added:
+        numbers_filter.add(contract_number)
+
+    assert not any(numbers_filter.definitely_absent(number) for number in added)
+    unknown = [f"X{index:06d}" for index in range(20000)]
+    false_positives = sum(not numbers_filter.definitely_absent(number) for number in unknown)
+    assert false_positives / len(unknown) < 2 * rate
+    assert numbers_filter.false_positive_rate() == pytest.approx(rate, rel=0.2)
+    assert numbers_filter.nbytes == dimensions(5000, rate)[0]
+
+    # Deletes forget the number and nothing else
+    for contract_number in added[:2500]:
+        numbers_filter.remove(contract_number)
+    assert not any(numbers_filter.definitely_absent(number) for number in added[2500:])
+    assert sum(numbers_filter.definitely_absent(number) for number in added[:2500]) > 2400
+    # Removing a number that was never added is ignored
+    contracts = numbers_filter.contracts
+    numbers_filter.remove("NEVER_ADDED")
+    assert numbers_filter.contracts == contracts
+
+
+# Test: Unknown contract numbers cost no query
+@pytest.mark.asyncio
+async def test_unknown_contracts_are_rejected_without_queries(async_client, count_queries, enabled_filter):
+    """Test that events and reads for unknown contracts are answered without the database."""
+    assert enabled_filter.contracts == 1
+    absent = CONTRACT_FILTER_LOOKUPS.value("absent")
+
+    response, statements = await count_queries(async_client.post("/event", json=_event("9999")))
+    assert response.json() == {"status": "rejected", "message": "Contract 9999 not found."}
+    assert statements == []
+    for path in ("/9999/contract_timeline", "/9999/history", "/contract/9999"):
+        response, statements = await count_queries(async_client.get(path))
+        assert response.status_code == 404
+        assert statements == []
+    assert CONTRACT_FILTER_LOOKUPS.value("absent") == absent + 4
+
+
+# Test: The filter follows creates and deletes
+@pytest.mark.asyncio
+async def test_filter_tracks_contract_lifecycle(async_client, enabled_filter):
+    """Test that created contracts are let through and deleted ones rejected again."""
+    assert (await async_client.post("/contract/", json=CONTRACT)).status_code == 201
+    response = await async_client.post("/event", json=_event("FILTER001"))
+    assert response.json()["status"] == "accepted"
+    assert (await async_client.get("/FILTER000/contract_timeline")).status_code == 200
+
+    assert (await async_client.delete("/contract/FILTER001")).status_code == 200
+    assert enabled_filter.definitely_absent("FILTER001")
+    assert (await async_client.delete("/contract/FILTER001")).status_code == 404
+    assert enabled_filter.contracts == 1
+
+
+# Test: Numbers let through without a contract are counted
+@pytest.mark.asyncio
+async def test_false_positives_are_counted(async_client, enabled_filter):
+    """Test that a number the filter lets through but the database lacks counts as false positive."""
+    enabled_filter.add("GHOST")
+    before = CONTRACT_FILTER_FALSE_POSITIVES.value()
+
+    response = await async_client.post("/event", json=_event("GHOST"))
+    assert response.json()["message"] == "Contract GHOST not found."
+    assert CONTRACT_FILTER_FALSE_POSITIVES.value() == before + 1
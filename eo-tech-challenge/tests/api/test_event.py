@@ -561,3 +561,233 @@ async def test_timeline_only_start_no_end(async_client):
 
     assert data["components"]["heatpump_optimization"]["start"] == "2024-02-01"
     assert data["components"]["heatpump_optimization"]["end"] is None
+
+
+# ==========================================
+# BATCH ENDPOINT TESTS
+# ==========================================
+
+
+# Test: Batch events are processed in order with individual verdicts
+@pytest.mark.asyncio
+async def test_event_batch_processed_in_order(async_client):
+    """Test that each event in a batch is validated against the previous ones."""
+    contract_payload = {
+        "contract_number": "TEST020",
+        "components": ["energy_supply"],
+        "created_at": "2024-01-01T00:00:00",
+    }
+    await async_client.post("/contract/", json=contract_payload)
+
+    batch = [
+        {
+            "type": "supply_energy_end",
+            "contract_number": "TEST020",
+            "date": "2024-03-01",
+            "created_at": "2024-01-05T10:00:00",
+        },
+        {
+            "type": "supply_energy_start",
+            "contract_number": "TEST020",
+            "date": "2024-02-01",
+            "created_at": "2024-01-10T10:00:00",
+        },
+        {
+            "type": "supply_energy_end",
+            "contract_number": "TEST020",
+            "date": "2024-03-01",
+            "created_at": "2024-01-20T10:00:00",
+        },
+    ]
+    response = await async_client.post("/event/batch", json=batch)
+    assert response.status_code == 200
+    assert [r["status"] for r in response.json()] == ["rejected", "accepted", "accepted"]
+
+    timeline_response = await async_client.get("/TEST020/contract_timeline")
+    data = timeline_response.json()
+    assert data["components"]["energy_supply"] == {"start": "2024-02-01", "end": "2024-03-01"}
+
+
+# Test: Oversized batches are refused
+@pytest.mark.asyncio
+async def test_event_batch_too_large(async_client, monkeypatch):
+    """Test that a batch above EVENT_BATCH_MAX_SIZE is rejected with 413."""
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "EVENT_BATCH_MAX_SIZE", 1)
+    event = {
+        "type": "supply_energy_start",
+        "contract_number": "TEST021",
+        "date": "2024-02-01",
+        "created_at": "2024-02-01T10:00:00",
+    }
+    response = await async_client.post("/event/batch", json=[event, event])
+    assert response.status_code == 413
+
+
+# ==========================================
+# IDEMPOTENCY TESTS
+# ==========================================
+
+
+async def _count_events(contract_number):
+    from sqlalchemy import func, select
+
+    from app.db.models import Event
+    from tests.conftest import test_engine
+
+    async with test_engine.connect() as conn:
+        return await conn.scalar(
+            select(func.count()).select_from(Event).where(Event.contract_number == contract_number)
+        )
+
+
+# Test: Retried event is answered from the index without a second row
+@pytest.mark.asyncio
+async def test_duplicate_event_not_stored_twice(async_client):
+    """Test that an identical retry returns the original verdict and writes nothing."""
+    contract_payload = {
+        "contract_number": "TEST030",
+        "components": ["energy_supply"],
+        "created_at": "2024-01-01T00:00:00",
+    }
+    await async_client.post("/contract/", json=contract_payload)
+
+    start_event = {
+        "type": "supply_energy_start",
+        "contract_number": "TEST030",
+        "date": "2024-02-01",
+        "created_at": "2024-02-01T10:00:00",
+    }
+    end_event = {
+        "type": "supply_energy_end",
+        "contract_number": "TEST030",
+        "date": "2024-03-01",
+        "created_at": "2024-03-01T10:00:00",
+    }
+    await async_client.post("/event", json=start_event)
+    await async_client.post("/event", json=end_event)
+
+    # Retrying the start after termination would be a restart if it were validated again
+    response = await async_client.post("/event", json=start_event)
+    assert response.json() == {"status": "accepted", "message": "Event processed successfully."}
+    assert await _count_events("TEST030") == 2
+
+
+# Test: Client-supplied idempotency key via header
+@pytest.mark.asyncio
+async def test_duplicate_event_with_idempotency_key_header(async_client):
+    """Test that a client key deduplicates events even if their fields differ."""
+    contract_payload = {
+        "contract_number": "TEST031",
+        "components": ["energy_supply"],
+        "created_at": "2024-01-01T00:00:00",
+    }
+    await async_client.post("/contract/", json=contract_payload)
+
+    event = {
+        "type": "supply_energy_start",
+        "contract_number": "TEST031",
+        "date": "2024-02-01",
+        "created_at": "2024-02-01T10:00:00",
+    }
+    headers = {"Idempotency-Key": "delivery-1"}
+    await async_client.post("/event", json=event, headers=headers)
+
+    # Producer re-stamped created_at on retry, the key still identifies it
+    retry = {**event, "created_at": "2024-02-01T10:05:00"}
+    response = await async_client.post("/event", json=retry, headers=headers)
+    assert response.json()["status"] == "accepted"
+    assert await _count_events("TEST031") == 1
+
+    # A different key is a different event
+    response = await async_client.post("/event", json=retry, headers={"Idempotency-Key": "delivery-2"})
+    assert response.json()["status"] == "accepted"
+    assert await _count_events("TEST031") == 2
+
+
+# Test: Rejected events are validated again on retry
+@pytest.mark.asyncio
+async def test_rejected_event_revalidated_on_retry(async_client):
+    """Test that a rejected event can be accepted once the contract exists."""
+    event = {
+        "type": "supply_energy_start",
+        "contract_number": "TEST032",
+        "date": "2024-02-01",
+        "created_at": "2024-02-01T10:00:00",
+    }
+    response = await async_client.post("/event", json=event)
+    assert response.json()["status"] == "rejected"
+
+    await async_client.post("/contract/", json={
+        "contract_number": "TEST032",
+        "components": ["energy_supply"],
+    })
+    response = await async_client.post("/event", json=event)
+    assert response.json()["status"] == "accepted"
+
+
+# Test: Only a lost race for the idempotency key counts as a duplicate
+@pytest.mark.asyncio
+async def test_integrity_errors_on_insert(async_client, monkeypatch):
+    """Test that a concurrent insert of the key is a duplicate and other integrity errors surface."""
+    from sqlalchemy.exc import IntegrityError
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from app.api.services import event_services
+    from tests.conftest import test_engine
+
+    await async_client.post("/contract/", json={"contract_number": "TEST033", "components": ["energy_supply"]})
+    event = {
+        "type": "supply_energy_start",
+        "contract_number": "TEST033",
+        "date": "2024-02-01",
+        "created_at": "2024-02-01T10:00:00",
+    }
+    create_event = event_services.create_event
+
+    async def concurrent_delivery(db, payload, component_name, key, digest):
+        # Another request stores the same event between validation and insert
+        async with AsyncSession(test_engine) as other:
+            await create_event(other, payload, component_name, key, digest)
+        return await create_event(db, payload, component_name, key, digest)
+
+    monkeypatch.setattr(event_services, "create_event", concurrent_delivery)
+    response = await async_client.post("/event", json=event)
+    assert response.json()["status"] == "accepted"
+    assert await _count_events("TEST033") == 1
+
+    async def not_null_failure(db, payload, component_name, key, digest):
+        raise IntegrityError("INSERT INTO event", {}, Exception("NOT NULL constraint failed: event.type"))
+
+    monkeypatch.setattr(event_services, "create_event", not_null_failure)
+    with pytest.raises(IntegrityError):
+        await async_client.post("/event", json={**event, "created_at": "2024-02-01T11:00:00"})
+    assert await _count_events("TEST033") == 1
+
+
+# Test: An idempotency key reused for a different event is refused
+@pytest.mark.asyncio
+async def test_idempotency_key_reused_for_different_event(async_client):
+    """Test that a key is bound to the type and date it was first accepted with."""
+    await async_client.post("/contract/", json={"contract_number": "TEST034", "components": ["energy_supply"]})
+    event = {
+        "type": "supply_energy_start",
+        "contract_number": "TEST034",
+        "date": "2024-02-01",
+        "created_at": "2024-02-01T10:00:00",
+        "idempotency_key": "delivery-1",
+    }
+    assert (await async_client.post("/event", json=event)).json()["status"] == "accepted"
+
+    response = await async_client.post("/event", json={**event, "date": "2024-02-02"})
+    assert response.status_code == 409
+    assert "delivery-1" in response.json()["detail"]
+    response = await async_client.post("/event", json={**event, "type": "supply_energy_end"})
+    assert response.status_code == 409
+
+    # Batches answer the reuse with a rejection of that event only
+    batch = [{**event, "date": "2024-02-02"}, {**event, "created_at": "2024-02-01T10:05:00"}]
+    response = await async_client.post("/event/batch", json=batch)
+    assert [verdict["status"] for verdict in response.json()] == ["rejected", "accepted"]
+    assert await _count_events("TEST034") == 1
@@ -0,0 +1,146 @@
+import json
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.dialects import sqlite
+
+from app.archive.archiver import archive_terminated
+from app.config import settings
+from app.db.models import Event
+from tests.conftest import TestSessionLocal, test_engine
+
+
+@pytest.fixture(autouse=True)
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ARCHIVE_DIR", tmp_path)
+    return tmp_path
+
+
+async def _post(async_client, contract_number: str, event_type: str, event_date: str, created_at: str):
+    response = await async_client.post(
+        "/event",
+        json={"type": event_type, "contract_number": contract_number, "date": event_date,
+              "created_at": created_at},
+    )
+    assert response.json()["status"] == "accepted"
+
+
+async def _contracts_with_events(async_client) -> None:
+    for contract_number in ("LOG001", "LOG002"):
+        await async_client.post(
+            "/contract/",
+            json={"contract_number": contract_number,
+                  "components": ["energy_supply", "battery_optimization"]},
+        )
+    await _post(async_client, "LOG001", "supply_energy_start", "2024-01-01", "2024-01-01T10:00:00")
+    await _post(async_client, "LOG002", "supply_energy_start", "2024-01-02", "2024-01-02T10:00:00")
+    await _post(async_client, "LOG001", "battery_optimization_start", "2024-01-03", "2024-01-03T10:00:00")
+    await _post(async_client, "LOG002", "battery_optimization_start", "2024-01-04", "2024-01-04T10:00:00")
+    await _post(async_client, "LOG001", "supply_energy_end", "2024-01-05", "2024-01-05T10:00:00")
+
+
+# Test: Paging through the event log with cursors
+@pytest.mark.asyncio
+async def test_event_log_pages(async_client, count_queries):
+    """Test that pages follow each other in sequence order until the log is exhausted."""
+    await _contracts_with_events(async_client)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response, statements = await count_queries(async_client.get("/events", params=params))
+        assert response.status_code == 200
+        assert len(statements) == 1
+        page = response.json()
+        seen += page["events"]
+        cursor = page["cursor"]
+        if not page["has_more"]:
+            break
+
+    assert [event["sequence"] for event in seen] == [1, 2, 3, 4, 5]
+    assert [event["contract_number"] for event in seen] == ["LOG001", "LOG002", "LOG001", "LOG002", "LOG001"]
+    assert cursor == "5"
+
+    # Caught up: an empty page with the same cursor until new events arrive
+    page = (await async_client.get("/events", params={"cursor": cursor})).json()
+    assert (page["events"], page["cursor"], page["has_more"]) == ([], "5", False)
+    await _post(async_client, "LOG002", "supply_energy_end", "2024-01-06", "2024-01-06T10:00:00")
+    page = (await async_client.get("/events", params={"cursor": cursor})).json()
+    assert [event["type"] for event in page["events"]] == ["supply_energy_end"]
+
+
+# Test: Contract and component filters
+@pytest.mark.asyncio
+async def test_event_log_filters(async_client):
+    """Test that the log can be restricted to one contract and one component."""
+    await _contracts_with_events(async_client)
+
+    page = (await async_client.get("/events", params={"contract_number": "LOG001"})).json()
+    assert [event["sequence"] for event in page["events"]] == [1, 3, 5]
+
+    page = (await async_client.get(
+        "/events", params={"contract_number": "LOG001", "component": "energy_supply"}
+    )).json()
+    assert [event["type"] for event in page["events"]] == ["supply_energy_start", "supply_energy_end"]
+
+    page = (await async_client.get("/events", params={"component": "battery_optimization"})).json()
+    assert [event["contract_number"] for event in page["events"]] == ["LOG001", "LOG002"]
+
+
+# Test: Malformed cursors
+@pytest.mark.asyncio
+async def test_event_log_invalid_cursor(async_client):
+    """Test that cursors that are not a position per shard are rejected."""
+    for cursor in ("abc", "1.2", "-1"):
+        response = await async_client.get("/events", params={"cursor": cursor})
+        assert response.status_code == 400
+
+
+# Test: Streaming the log as NDJSON
+@pytest.mark.asyncio
+async def test_event_log_stream(async_client, monkeypatch):
+    """Test that the stream pages through the whole log and ends with its cursor."""
+    monkeypatch.setattr("app.api.services.event_log_services.STREAM_PAGE_SIZE", 2)
+    await _contracts_with_events(async_client)
+
+    response = await async_client.get("/events/stream")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["sequence"] for line in lines[:-1]] == [1, 2, 3, 4, 5]
+    assert lines[-1] == {"cursor": "5"}
+
+    response = await async_client.get("/events/stream", params={"cursor": "3"})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line.get("sequence") for line in lines] == [4, 5, None]
+
+
+# Test: Sequences of archived events are not reused
+@pytest.mark.asyncio
+async def test_event_log_sequence_after_archiving(async_client):
+    """Test that new events continue after the newest event even once it is archived."""
+    await _contracts_with_events(async_client)
+    # LOG001's energy_supply ends with the newest event (5), archiving removes it
+    await archive_terminated(TestSessionLocal)
+    page = (await async_client.get("/events")).json()
+    assert [event["sequence"] for event in page["events"]] == [2, 3, 4]
+
+    await _post(async_client, "LOG002", "supply_energy_end", "2024-01-06", "2024-01-06T10:00:00")
+    page = (await async_client.get("/events", params={"cursor": "4"})).json()
+    assert [event["sequence"] for event in page["events"]] == [6]
+
+
+# Test: Pages are index seeks
+@pytest.mark.asyncio
+async def test_event_log_query_plans():
+    """Test that every filter combination seeks an index instead of sorting the table."""
+    filters = [
+        (),
+        (Event.contract_number == "LOG001",),
+        (Event.component_name == "energy_supply",),
+    ]
+    async with test_engine.connect() as conn:
+        for where in filters:
+            query = select(Event).where(Event.sequence > 10, *where).order_by(Event.sequence).limit(100)
+            sql = str(query.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+            plan = " ".join(row[-1] for row in await conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+            assert "USING INDEX" in plan or "USING COVERING INDEX" in plan, plan
+            assert "TEMP B-TREE" not in plan, plan
@@ -0,0 +1,139 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+from app.api.services import event_stream_services
+from app.api.services.event_stream_services import _EventStream, serve_event_stream
+from app.dto.event import EventResponse
+from tests.conftest import TestSessionLocal
+
+
+def _event(event_type: str, event_date: str, created_at: str, **extra) -> dict:
+    return {"type": event_type, "contract_number": "WS001", "date": event_date,
+            "created_at": created_at, **extra}
+
+
+class FakeWebSocket:
+    """Feeds queued messages to the stream and records what it sends."""
+
+    def __init__(self):
+        self.incoming: asyncio.Queue[str] = asyncio.Queue()
+        self.sent: list[dict] = []
+        self.accepted = False
+        self.client = None
+
+    async def accept(self) -> None:
+        self.accepted = True
+
+    async def receive_text(self) -> str:
+        text = await self.incoming.get()
+        if text is None:
+            raise WebSocketDisconnect()
+        return text
+
+    async def send_text(self, text: str) -> None:
+        self.sent.append(json.loads(text))
+
+
+# Test: Pipelined events get one acknowledgement each
+@pytest.mark.asyncio
+async def test_stream_acknowledges_every_event(async_client):
+    """Test that events sent without waiting are all acknowledged with their verdict."""
+    await async_client.post("/contract/", json={"contract_number": "WS001", "components": ["energy_supply"]})
+    websocket = FakeWebSocket()
+    messages = [
+        _event("supply_energy_start", "2024-01-01", "2024-01-01T10:00:00", correlation_id="start"),
+        _event("supply_energy_end", "2024-02-01", "2024-02-01T10:00:00", correlation_id="end"),
+        _event("supply_energy_end", "2023-01-01", "2024-03-01T10:00:00"),
+        _event("unknown_event", "2024-01-01", "2024-01-01T10:00:00", correlation_id=7),
+    ]
+    for message in messages:
+        websocket.incoming.put_nowait(json.dumps(message))
+    websocket.incoming.put_nowait("not json")
+    serving = asyncio.create_task(
+        serve_event_stream(websocket, TestSessionLocal, max_in_flight=8, workers=2)
+    )
+
+    while len(websocket.sent) < 5:
+        await asyncio.sleep(0.01)
+    websocket.incoming.put_nowait(None)
+    # A disconnect ends the stream quietly
+    await serving
+
+    acks = {ack["correlation_id"]: ack for ack in websocket.sent}
+    assert websocket.accepted
+    assert acks["start"]["status"] == "accepted"
+    assert acks["end"]["status"] == "accepted"
+    # Without a correlation id, the position in the stream is used
+    assert acks["3"] == {"correlation_id": "3", "status": "rejected",
+                         "message": "End event cannot occur before start event."}
+    assert acks["7"]["message"] == "Invalid event type: unknown_event"
+    assert acks["5"]["message"] == "Invalid JSON."
+
+    response = await async_client.get("/WS001/contract_timeline")
+    assert response.json()["components"]["energy_supply"] == {"start": "2024-01-01", "end": "2024-02-01"}
+
+
+# Test: Reading stops while too many events are unacknowledged
+@pytest.mark.asyncio
+async def test_stream_backpressure(monkeypatch):
+    """Test that the server reads no further than max_in_flight unacknowledged events."""
+    release = asyncio.Event()
+
+    async def slow_handler(db, payload):
+        await release.wait()
+        return EventResponse(status="accepted", message="Event processed successfully.")
+
+    monkeypatch.setattr(event_stream_services, "handle_event_creation", slow_handler)
+    websocket = FakeWebSocket()
+    stream = _EventStream(websocket, TestSessionLocal, max_in_flight=2, workers=2)
+    for index in range(5):
+        websocket.incoming.put_nowait(json.dumps(
+            _event("supply_energy_start", "2024-01-01", "2024-01-01T10:00:00", correlation_id=index)
+        ))
+    running = asyncio.create_task(stream.run())
+
+    await asyncio.sleep(0.05)
+    assert (stream.received, websocket.sent) == (2, [])
+
+    release.set()
+    while len(websocket.sent) < 5:
+        await asyncio.sleep(0.01)
+    assert sorted(ack["correlation_id"] for ack in websocket.sent) == ["0", "1", "2", "3", "4"]
+
+    websocket.incoming.put_nowait(None)
+    with pytest.raises(WebSocketDisconnect):
+        await running
+
+
+# Test: A failing event is acknowledged without closing the stream
+@pytest.mark.asyncio
+async def test_stream_survives_failing_event(monkeypatch):
+    """Test that an exception while processing one event acknowledges it as an error."""
+
+    async def failing_handler(db, payload):
+        if payload.date.isoformat() == "2024-01-01":
+            raise RuntimeError("database is locked")
+        return EventResponse(status="accepted", message="Event processed successfully.")
+
+    monkeypatch.setattr(event_stream_services, "handle_event_creation", failing_handler)
+    websocket = FakeWebSocket()
+    stream = _EventStream(websocket, TestSessionLocal, max_in_flight=4, workers=1)
+    for correlation_id, event_date in (("bad", "2024-01-01"), ("good", "2024-02-01")):
+        websocket.incoming.put_nowait(json.dumps(
+            _event("supply_energy_start", event_date, f"{event_date}T10:00:00", correlation_id=correlation_id)
+        ))
+    running = asyncio.create_task(stream.run())
+
+    while len(websocket.sent) < 2 and not running.done():
+        await asyncio.sleep(0.01)
+    acks = {ack["correlation_id"]: ack for ack in websocket.sent}
+    assert acks["bad"] == {"correlation_id": "bad", "status": "error",
+                           "message": "Event could not be processed, send it again."}
+    assert acks["good"]["status"] == "accepted"
+
+    websocket.incoming.put_nowait(None)
+    with pytest.raises(WebSocketDisconnect):
+        await running
@@ -0,0 +1,186 @@
+import json
+import uuid
+
+import pytest
+
+from app.config import settings
+from app.db.models import ImportJob, ImportJobResult
+from app.jobs.runner import job_runner, run_job
+from tests.conftest import TestSessionLocal
+
+
+@pytest.fixture(autouse=True)
+def jobs_dir(tmp_path, monkeypatch):
+    """Keep uploaded files out of the working tree."""
+    monkeypatch.setattr(settings, "JOBS_DIR", tmp_path)
+    return tmp_path
+
+
+def _ndjson(*records) -> bytes:
+    return "".join(
+        (record if isinstance(record, str) else json.dumps(record)) + "\n" for record in records
+    ).encode()
+
+
+async def _upload(async_client, kind: str, body: bytes) -> str:
+    response = await async_client.post(
+        f"/jobs/{kind}", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    await job_runner.wait(uuid.UUID(job_id))
+    return job_id
+
+
+async def _results(async_client, job_id: str) -> list[dict]:
+    response = await async_client.get(f"/jobs/{job_id}/results")
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+# Test: Event import applies the lifecycle rules and reports progress
+@pytest.mark.asyncio
+async def test_event_import_job(async_client, jobs_dir):
+    """Test that an uploaded events file is validated like POST /event."""
+    await async_client.post(
+        "/contract/",
+        json={"contract_number": "JOB001", "components": ["energy_supply"]},
+    )
+    body = _ndjson(
+        {"type": "supply_energy_start", "contract_number": "JOB001", "date": "2024-02-01",
+         "created_at": "2024-02-01T10:00:00"},
+        {"type": "supply_energy_end", "contract_number": "JOB001", "date": "2024-01-01",
+         "created_at": "2024-02-02T10:00:00"},
+        {"type": "supply_energy_end", "contract_number": "JOB001", "date": "2024-03-01",
+         "created_at": "2024-03-01T10:00:00"},
+    )
+    job_id = await _upload(async_client, "events", body)
+
+    response = await async_client.get(f"/jobs/{job_id}")
+    assert response.status_code == 200
+    progress = response.json()
+    assert progress["status"] == "completed"
+    assert (progress["total"], progress["processed"]) == (3, 3)
+    assert (progress["accepted"], progress["rejected"]) == (2, 1)
+    assert progress["eta_seconds"] == 0
+
+    results = await _results(async_client, job_id)
+    assert [(r["line"], r["status"]) for r in results] == [
+        (1, "accepted"), (2, "rejected"), (3, "accepted"),
+    ]
+    assert results[1]["message"] == "End event cannot occur before start event."
+    # The uploaded file is gone once the job is done
+    assert not any(jobs_dir.iterdir())
+
+
+# Test: Contract import creates contracts
+@pytest.mark.asyncio
+async def test_contract_import_job(async_client):
+    """Test that an uploaded contracts file creates the contracts, once."""
+    body = _ndjson(
+        {"contract_number": "JOB010", "components": ["energy_supply"]},
+        {"contract_number": "JOB010", "components": ["battery_optimization"]},
+    )
+    job_id = await _upload(async_client, "contracts", body)
+
+    results = await _results(async_client, job_id)
+    assert [r["status"] for r in results] == ["accepted", "rejected"]
+    response = await async_client.get("/contract/JOB010")
+    assert response.status_code == 200
+
+
+# Test: Malformed lines are rejected individually
+@pytest.mark.asyncio
+async def test_import_job_rejects_malformed_lines(async_client):
+    """Test that invalid JSON lines are reported without failing the job."""
+    job_id = await _upload(async_client, "events", _ndjson("{not json", "[1, 2]", ""))
+
+    progress = (await async_client.get(f"/jobs/{job_id}")).json()
+    assert progress["status"] == "completed"
+    assert (progress["total"], progress["rejected"]) == (2, 2)
+    messages = [r["message"] for r in await _results(async_client, job_id)]
+    assert messages == ["Invalid JSON.", "Expected a JSON object."]
+
+
+# Test: Unknown job kinds and ids
+@pytest.mark.asyncio
+async def test_import_job_not_found(async_client):
+    """Test that unknown kinds and job ids return 404."""
+    response = await async_client.post("/jobs/invoices", content=b"{}\n")
+    assert response.status_code == 404
+    response = await async_client.get(f"/jobs/{uuid.uuid4()}")
+    assert response.status_code == 404
+    response = await async_client.get(f"/jobs/{uuid.uuid4()}/results")
+    assert response.status_code == 404
+
+
+# Test: An interrupted job resumes from its last committed chunk
+@pytest.mark.asyncio
+async def test_import_job_resumes_after_restart(async_client, jobs_dir):
+    """Test that a running job continues at next_line/next_offset."""
+    await async_client.post(
+        "/contract/",
+        json={"contract_number": "JOB020", "components": ["energy_supply"]},
+    )
+    first = _ndjson({"type": "supply_energy_start", "contract_number": "JOB020",
+                     "date": "2024-02-01", "created_at": "2024-02-01T10:00:00"})
+    rest = _ndjson({"type": "supply_energy_end", "contract_number": "JOB020",
+                    "date": "2024-03-01", "created_at": "2024-03-01T10:00:00"})
+    path = jobs_dir / "resume.ndjson"
+    path.write_bytes(first + rest)
+
+    # The process stopped after committing the first line only
+    await async_client.post("/event", json=json.loads(first))
+    async with TestSessionLocal() as db:
+        job = ImportJob(
+            kind="events", status="running", source_path=str(path), total=2,
+            next_line=2, next_offset=len(first), processed=1, accepted=1,
+        )
+        db.add(job)
+        await db.commit()
+        job_id = job.id
+
+    await run_job(TestSessionLocal, job_id)
+
+    progress = (await async_client.get(f"/jobs/{job_id}")).json()
+    assert progress["status"] == "completed"
+    assert (progress["processed"], progress["accepted"]) == (2, 2)
+    # Only the resumed line produced a new result
+    assert [r["line"] for r in await _results(async_client, str(job_id))] == [2]
+
+
+# Test: A replayed chunk keeps the verdicts given before the restart
+@pytest.mark.asyncio
+async def test_import_job_replay_keeps_verdicts(async_client, jobs_dir):
+    """Test that lines with a stored result are skipped and stored events are answered by their key."""
+    await async_client.post(
+        "/contract/",
+        json={"contract_number": "JOB030", "components": ["energy_supply"]},
+    )
+    end = {"type": "supply_energy_end", "contract_number": "JOB030",
+           "date": "2024-03-01", "created_at": "2024-01-01T10:00:00"}
+    start = {"type": "supply_energy_start", "contract_number": "JOB030",
+             "date": "2024-02-01", "created_at": "2024-01-02T10:00:00"}
+    path = jobs_dir / "replay.ndjson"
+    path.write_bytes(_ndjson(end, start))
+
+    # The process stopped in the middle of the first chunk: the end was
+    # rejected without a start, the start stored without its result
+    await async_client.post("/event", json=start)
+    async with TestSessionLocal() as db:
+        job = ImportJob(kind="events", status="running", source_path=str(path), total=2)
+        db.add(job)
+        await db.commit()
+        db.add(ImportJobResult(job_id=job.id, line=1, status="rejected", message="Rejected before the restart."))
+        await db.commit()
+        job_id = job.id
+
+    await run_job(TestSessionLocal, job_id)
+
+    progress = (await async_client.get(f"/jobs/{job_id}")).json()
+    assert (progress["processed"], progress["accepted"], progress["rejected"]) == (2, 1, 1)
+    results = await _results(async_client, str(job_id))
+    assert [(r["line"], r["status"]) for r in results] == [(1, "rejected"), (2, "accepted")]
+    timeline = (await async_client.get("/JOB030/contract_timeline")).json()
+    assert timeline["components"]["energy_supply"] == {"start": "2024-02-01", "end": None}
+    assert not path.exists()
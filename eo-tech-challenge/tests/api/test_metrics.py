@@ -0,0 +1,120 @@
+import pytest
+
+from app.core.metrics import (
+    DB_QUERIES_TOTAL,
+    EVENTS_TOTAL,
+    HTTP_REQUEST_DURATION,
+    Counter,
+    Histogram,
+    _Metric,
+)
+
+
+# Test: Metrics endpoint exposes Prometheus text format
+@pytest.mark.asyncio
+async def test_metrics_endpoint_format(async_client):
+    """Test that /metrics returns the Prometheus text format."""
+    response = await async_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
+    assert "# TYPE db_queries_total counter" in response.text
+
+
+# Test: Requests are recorded per route template, not raw path
+@pytest.mark.asyncio
+async def test_request_latency_recorded_per_route_template(async_client):
+    """Test that latency is labelled with the route template."""
+    route = "/{contract_number}/contract_timeline"
+    before = HTTP_REQUEST_DURATION.count("GET", route)
+
+    await async_client.get("/ABC/contract_timeline")
+    await async_client.get("/XYZ/contract_timeline")
+
+    assert HTTP_REQUEST_DURATION.count("GET", route) == before + 2
+    response = await async_client.get("/metrics")
+    assert 'route="/ABC/contract_timeline"' not in response.text
+
+
+# Test: Event verdicts and DB statements are counted
+@pytest.mark.asyncio
+async def test_event_verdicts_and_queries_counted(async_client):
+    """Test that accepted/rejected events and SQL statements are counted."""
+    await async_client.post("/contract/", json={
+        "contract_number": "MET001",
+        "components": ["energy_supply"],
+    })
+    accepted = EVENTS_TOTAL.value("supply_energy_start", "accepted", "")
+    rejected = EVENTS_TOTAL.value("supply_energy_end", "rejected", "end_without_start")
+    inserts = DB_QUERIES_TOTAL.value("INSERT")
+
+    await async_client.post("/event", json={
+        "type": "supply_energy_end",
+        "contract_number": "MET001",
+        "date": "2024-02-01",
+        "created_at": "2024-02-01T10:00:00",
+    })
+    await async_client.post("/event", json={
+        "type": "supply_energy_start",
+        "contract_number": "MET001",
+        "date": "2024-02-01",
+        "created_at": "2024-02-02T10:00:00",
+    })
+
+    assert EVENTS_TOTAL.value("supply_energy_end", "rejected", "end_without_start") == rejected + 1
+    assert EVENTS_TOTAL.value("supply_energy_start", "accepted", "") == accepted + 1
+    assert DB_QUERIES_TOTAL.value("INSERT") == inserts + 1
+
+
+# Test: Unknown event types do not create new label values
+@pytest.mark.asyncio
+async def test_invalid_event_type_label_is_bounded(async_client):
+    """Test that arbitrary event types are folded into a single label value."""
+    before = EVENTS_TOTAL.value("invalid", "rejected", "invalid_type")
+
+    await async_client.post("/event", json={
+        "type": "something_random",
+        "contract_number": "MET002",
+        "date": "2024-02-01",
+        "created_at": "2024-02-01T10:00:00",
+    })
+
+    assert EVENTS_TOTAL.value("invalid", "rejected", "invalid_type") == before + 1
+
+
+# Test: Histogram rendering is cumulative
+def test_histogram_render():
+    """Test that histogram buckets are rendered cumulatively with sum and count."""
+    histogram = Histogram("test_seconds", "Test histogram.", ("kind",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "a")
+    histogram.observe(0.5, "a")
+    histogram.observe(5, "a")
+
+    lines = histogram.render()
+    assert 'test_seconds_bucket{kind="a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{kind="a",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{kind="a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{kind="a"} 3' in lines
+    assert 'test_seconds_sum{kind="a"} 5.55' in lines
+
+
+# Test: Label values are escaped
+def test_counter_label_escaping():
+    """Test that quotes and backslashes in label values are escaped."""
+    counter = Counter("test_total", "Test counter.", ("name",))
+    counter.inc('a"b\\c')
+    assert counter.render()[-1] == 'test_total{name="a\\"b\\\\c"} 1.0'
+
+
+# Test: Metric families must implement rendering and clearing
+def test_metric_family_requires_render_and_clear():
+    """Test that a family missing render or clear cannot be instantiated."""
+
+    class Incomplete(_Metric):
+        type_name = "gauge"
+
+        def render(self) -> list[str]:
+            return self._header()
+
+    with pytest.raises(TypeError, match="clear"):
+        Incomplete("test_incomplete", "Test family.")
@@ -0,0 +1,72 @@
+import pytest
+from loguru import logger
+
+from app.config import settings
+
+
+@pytest.fixture
+def profiling_enabled(monkeypatch, tmp_path):
+    """Enable request profiling and write artifacts to a temporary directory."""
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILING_OUTPUT_DIR", tmp_path)
+    return tmp_path
+
+
+# Test: Profiling header produces a downloadable artifact
+@pytest.mark.asyncio
+async def test_profiled_request_artifact(async_client, profiling_enabled):
+    """Test that a profiled request exposes its SQL statements and CPU samples."""
+    await async_client.post("/contract/", json={
+        "contract_number": "PROF001",
+        "components": ["energy_supply"],
+    })
+
+    response = await async_client.get(
+        "/PROF001/contract_timeline", headers={"X-Profile": "1"}
+    )
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+    assert (profiling_enabled / f"{profile_id}.json").is_file()
+
+    artifact = (await async_client.get(f"/debug/profiles/{profile_id}")).json()
+    assert artifact["path"] == "/PROF001/contract_timeline"
+    assert artifact["status"] == 200
+    assert [s["kind"] for s in artifact["statements"]] == ["SELECT", "SELECT"]
+    assert "FROM contract" in artifact["statements"][0]["statement"]
+    assert artifact["samples"] == sum(artifact["stacks"].values())
+
+
+# Test: Requests without the header are not profiled
+@pytest.mark.asyncio
+async def test_request_without_header_not_profiled(async_client, profiling_enabled):
+    """Test that profiling is opt-in per request."""
+    response = await async_client.get("/")
+    assert "x-profile-id" not in response.headers
+    assert list(profiling_enabled.iterdir()) == []
+
+
+# Test: Profiles cannot be downloaded while profiling is disabled
+@pytest.mark.asyncio
+async def test_profile_download_disabled(async_client):
+    """Test that the download endpoint is hidden when profiling is disabled."""
+    response = await async_client.get(f"/debug/profiles/{'a' * 32}")
+    assert response.status_code == 404
+
+
+# Test: Slow requests are logged with their statements
+@pytest.mark.asyncio
+async def test_slow_request_logged_with_statements(async_client, monkeypatch):
+    """Test that requests above the threshold are logged with their SQL."""
+    monkeypatch.setattr(settings, "SLOW_REQUEST_THRESHOLD_MS", 0.0)
+    records = []
+    handler_id = logger.add(lambda message: records.append(message.record), level="WARNING")
+    try:
+        await async_client.get("/UNKNOWN/contract_timeline")
+    finally:
+        logger.remove(handler_id)
+
+    slow = [r for r in records if r["message"] == "Slow request"]
+    assert len(slow) == 1
+    assert slow[0]["extra"]["route"] == "/{contract_number}/contract_timeline"
+    assert slow[0]["extra"]["status"] == 404
+    assert len(slow[0]["extra"]["statements"]) == 1
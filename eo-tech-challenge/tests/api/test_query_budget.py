@@ -0,0 +1,177 @@
+import pytest
+
+from app.config import settings
+from app.core.query_budget import QUERY_BUDGETS, budget_for
+
+CONTRACT = {"contract_number": "QB001", "components": ["energy_supply"]}
+
+
+def _event(event_type, day, created_at):
+    return {
+        "type": event_type,
+        "contract_number": "QB001",
+        "date": day,
+        "created_at": created_at,
+    }
+
+
+def assert_within_budget(method, route, statements, items=0):
+    budget = budget_for(method, route)
+    assert budget is not None, f"No query budget declared for {method} {route}"
+    limit = budget.limit(items)
+    assert len(statements) <= limit, (
+        f"{method} {route} issued {len(statements)} statements, budget is {limit}:\n"
+        + "\n".join(s.statement for s in statements)
+    )
+
+
+# Test: Contract CRUD endpoints stay within their budgets
+@pytest.mark.asyncio
+async def test_contract_endpoints_query_budget(async_client, count_queries):
+    """Test statement counts of contract create, retrieve and delete."""
+    _, statements = await count_queries(async_client.post("/contract/", json=CONTRACT))
+    assert_within_budget("POST", "/contract/", statements)
+
+    _, statements = await count_queries(async_client.get("/contract/QB001"))
+    assert_within_budget("GET", "/contract/{contract_number}", statements)
+
+    _, statements = await count_queries(async_client.delete("/contract/QB001"))
+    assert_within_budget("DELETE", "/contract/{contract_number}", statements)
+
+
+# Test: Event ingest stays within its budget, independent of history length
+@pytest.mark.asyncio
+async def test_event_ingest_query_budget(async_client, count_queries):
+    """Test that accepted and rejected events do not exceed the ingest budget."""
+    await async_client.post("/contract/", json=CONTRACT)
+
+    for day in range(1, 6):
+        response, statements = await count_queries(async_client.post(
+            "/event",
+            json=_event("supply_energy_start", f"2024-02-0{day}", f"2024-02-0{day}T10:00:00"),
+        ))
+        assert response.json()["status"] == "accepted"
+        assert [s.kind for s in statements] == ["SELECT", "SELECT", "SELECT", "INSERT"]
+        assert_within_budget("POST", "/event", statements)
+
+    response, statements = await count_queries(async_client.post(
+        "/event", json=_event("supply_energy_end", "2024-01-01", "2024-03-01T10:00:00")
+    ))
+    assert response.json()["status"] == "rejected"
+    assert_within_budget("POST", "/event", statements)
+
+
+# Test: Rejections that need no data issue no statements
+@pytest.mark.asyncio
+async def test_invalid_event_type_issues_no_queries(async_client, count_queries):
+    """Test that an invalid event type is rejected without touching the DB."""
+    response, statements = await count_queries(async_client.post(
+        "/event", json=_event("bogus_start", "2024-02-01", "2024-02-01T10:00:00")
+    ))
+    assert response.json()["status"] == "rejected"
+    assert statements == []
+
+
+# Test: Batch ingest budget scales with the number of events only
+@pytest.mark.asyncio
+async def test_event_batch_query_budget(async_client, count_queries):
+    """Test the per-item budget of the batch endpoint."""
+    await async_client.post("/contract/", json=CONTRACT)
+    batch = [
+        _event("supply_energy_start", "2024-02-01", "2024-02-01T10:00:00"),
+        _event("supply_energy_end", "2024-03-01", "2024-03-01T10:00:00"),
+        _event("supply_energy_end", "2024-03-05", "2024-03-05T10:00:00"),
+    ]
+    _, statements = await count_queries(async_client.post("/event/batch", json=batch))
+    assert_within_budget("POST", "/event/batch", statements, items=len(batch))
+
+
+# Test: Timeline retrieval stays within its budget
+@pytest.mark.asyncio
+async def test_timeline_query_budget(async_client, count_queries):
+    """Test statement count of the timeline endpoint."""
+    await async_client.post("/contract/", json=CONTRACT)
+    await async_client.post(
+        "/event", json=_event("supply_energy_start", "2024-02-01", "2024-02-01T10:00:00")
+    )
+
+    _, statements = await count_queries(async_client.get("/QB001/contract_timeline"))
+    assert_within_budget("GET", "/{contract_number}/contract_timeline", statements)
+
+
+# Test: Every API route declares a budget
+def test_every_route_has_a_budget():
+    """Test that new endpoints cannot be added without a query budget."""
+    from fastapi.routing import APIRoute
+
+    from app.main import app
+
+    exempt = {"/", "/metrics", "/debug/profiles/{profile_id}", "/debug/memory"}
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.path not in exempt:
+            for method in route.methods:
+                assert (method, route.path) in QUERY_BUDGETS, f"{method} {route.path}"
+
+
+# Test: Debug header reports the statement count
+@pytest.mark.asyncio
+async def test_query_count_header(async_client, monkeypatch):
+    """Test that X-DB-Query-Count is added when enabled."""
+    monkeypatch.setattr(settings, "QUERY_COUNT_HEADER", True)
+    response = await async_client.get("/contract/UNKNOWN")
+    assert response.headers["x-db-query-count"] == "1"
+
+    monkeypatch.setattr(settings, "QUERY_COUNT_HEADER", False)
+    response = await async_client.get("/contract/UNKNOWN")
+    assert "x-db-query-count" not in response.headers
+
+
+# Test: Rejected payloads never open a session
+@pytest.mark.asyncio
+async def test_invalid_events_open_no_session(async_client):
+    """Test that events refused for their type or shape are answered without a session."""
+    from app.db.session import get_session_factory
+    from app.main import app
+    from tests.conftest import get_test_session_factory
+
+    opened = []
+
+    def counting_factory():
+        factory = get_test_session_factory()
+
+        def open_session():
+            opened.append(1)
+            return factory()
+
+        return open_session
+
+    app.dependency_overrides[get_session_factory] = counting_factory
+    event = {"contract_number": "QB404", "date": "2024-01-01", "created_at": "2024-01-01T10:00:00"}
+
+    response = await async_client.post("/event", json={**event, "type": "unknown_event"})
+    assert response.json() == {"status": "rejected", "message": "Invalid event type: unknown_event"}
+    response = await async_client.post("/event", json={**event, "type": "supply_energy_start", "date": "2024/01/01"})
+    assert response.json()["status"] == "rejected"
+    response = await async_client.post("/event/batch", json=[{**event, "type": "unknown_event"}])
+    assert response.status_code == 422
+    assert opened == []
+
+    await async_client.post("/event", json={**event, "type": "supply_energy_start"})
+    assert opened == [1]
+
+
+# Test: Component updates never read the contract's history
+@pytest.mark.asyncio
+async def test_contract_components_update_query_budget(async_client, count_queries):
+    """Test that the PATCH budget holds whatever the length of the history."""
+    await async_client.post("/contract/", json=CONTRACT)
+    for day in range(1, 10):
+        await async_client.post(
+            "/event", json=_event("supply_energy_start", f"2024-02-0{day}", f"2024-02-0{day}T10:00:00")
+        )
+    await async_client.post("/event", json=_event("supply_energy_end", "2024-03-01", "2024-03-01T10:00:00"))
+
+    payload = {"add": ["battery_optimization"], "remove": ["energy_supply"]}
+    response, statements = await count_queries(async_client.patch("/contract/QB001", json=payload))
+    assert response.status_code == 200
+    assert_within_budget("PATCH", "/contract/{contract_number}", statements, items=2)
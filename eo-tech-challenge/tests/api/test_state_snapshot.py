@@ -0,0 +1,200 @@
+import os
+import subprocess
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+
+from app.archive.archiver import archive_terminated
+from app.config import settings
+from app.core.change_feed import ChangeFeed
+from app.state.coherence import CacheCoherence
+from app.state.contract_filter import ContractFilter
+from app.state.snapshot import SnapshotError, load_or_warm, load_snapshot, write_snapshot
+from app.state.store import state_store
+from tests.conftest import TEST_DATABASE_URL, TestSessionLocal, get_test_shard_set
+
+MAX_BYTES = 1024 * 1024
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Another worker: its own process, writing through the API to the test database
+OTHER_WORKER = """
+import asyncio
+from httpx import ASGITransport, AsyncClient
+from app.main import app
+
+async def main():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        await client.post("/contract/", json={"contract_number": "SNAP003", "components": ["energy_supply"]})
+        response = await client.post("/event", json={"type": "supply_energy_start", "contract_number": "SNAP003",
+                                                     "date": "2024-01-01", "created_at": "2024-01-01T10:00:00"})
+        assert response.json()["status"] == "accepted"
+
+asyncio.run(main())
+"""
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def store(async_client, tmp_path, monkeypatch):
+    """Warm the state store from the freshly emptied test database."""
+    monkeypatch.setattr(settings, "ARCHIVE_DIR", tmp_path / "archive")
+    await state_store.warm(get_test_shard_set(), MAX_BYTES)
+    yield state_store
+    state_store.clear()
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "state.snapshot"
+
+
+async def _contract(async_client, contract_number: str) -> None:
+    await async_client.post(
+        "/contract/",
+        json={"contract_number": contract_number, "components": ["energy_supply", "battery_optimization"]},
+    )
+
+
+async def _post(async_client, contract_number: str, event_type: str, event_date: str, created_at: str) -> None:
+    response = await async_client.post(
+        "/event",
+        json={"type": event_type, "contract_number": contract_number, "date": event_date,
+              "created_at": created_at},
+    )
+    assert response.json()["status"] == "accepted"
+
+
+async def _timelines(async_client, *numbers: str) -> list[dict]:
+    return [(await async_client.get(f"/{number}/contract_timeline")).json() for number in numbers]
+
+
+# Test: Loading a snapshot and replaying what came after it
+@pytest.mark.asyncio
+async def test_snapshot_round_trip_with_replay(async_client, store, path):
+    """Test that the snapshot plus events beyond its high-water mark give the current state."""
+    await _contract(async_client, "SNAP001")
+    await _post(async_client, "SNAP001", "supply_energy_start", "2024-01-01", "2024-01-01T10:00:00")
+    assert await write_snapshot(store, get_test_shard_set(), path)
+
+    # Stored after the snapshot
+    await _post(async_client, "SNAP001", "supply_energy_end", "2024-02-01", "2024-01-02T10:00:00")
+    await _contract(async_client, "SNAP002")
+    await _post(async_client, "SNAP002", "battery_optimization_start", "2024-03-01", "2024-01-03T10:00:00")
+    expected = await _timelines(async_client, "SNAP001", "SNAP002")
+
+    store.clear()
+    info = await load_snapshot(store, get_test_shard_set(), path, MAX_BYTES)
+    assert info == (1, 1, 2)
+    assert store.complete and len(store) == 2
+    assert await _timelines(async_client, "SNAP001", "SNAP002") == expected
+    assert expected[0]["components"]["energy_supply"] == {"start": "2024-01-01", "end": "2024-02-01"}
+
+
+# Test: Corrupt snapshots are detected
+@pytest.mark.asyncio
+async def test_snapshot_corruption_falls_back(async_client, store, path):
+    """Test that a damaged snapshot is rejected and the store is rebuilt instead."""
+    await _contract(async_client, "SNAP001")
+    await _post(async_client, "SNAP001", "supply_energy_start", "2024-01-01", "2024-01-01T10:00:00")
+    await write_snapshot(store, get_test_shard_set(), path)
+    expected = await _timelines(async_client, "SNAP001")
+
+    data = bytearray(path.read_bytes())
+    data[-5] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(SnapshotError, match="checksum"):
+        await load_snapshot(store, get_test_shard_set(), path, MAX_BYTES)
+    assert len(store) == 0
+
+    path.write_bytes(bytes(data[:10]))
+    with pytest.raises(SnapshotError, match="truncated"):
+        await load_snapshot(store, get_test_shard_set(), path, MAX_BYTES)
+
+    path.write_bytes(b"")
+    with pytest.raises(SnapshotError, match="empty"):
+        await load_snapshot(store, get_test_shard_set(), path, MAX_BYTES)
+
+    await load_or_warm(store, get_test_shard_set(), path, MAX_BYTES)
+    assert len(store) == 1
+    assert await _timelines(async_client, "SNAP001") == expected
+
+
+# Test: Removals since the snapshot make it stale
+@pytest.mark.asyncio
+async def test_snapshot_stale_after_removals(async_client, store, path):
+    """Test that deleting a contract, archiving events or changing components invalidates the snapshot."""
+    await _contract(async_client, "SNAP001")
+    await _contract(async_client, "SNAP002")
+    await _post(async_client, "SNAP002", "supply_energy_start", "2024-01-01", "2024-01-01T10:00:00")
+    await _post(async_client, "SNAP002", "supply_energy_end", "2024-02-01", "2024-01-02T10:00:00")
+
+    await write_snapshot(store, get_test_shard_set(), path)
+    await async_client.delete("/contract/SNAP001")
+    with pytest.raises(SnapshotError, match="stale"):
+        await load_snapshot(store, get_test_shard_set(), path, MAX_BYTES)
+
+    await store.warm(get_test_shard_set(), MAX_BYTES)
+    await write_snapshot(store, get_test_shard_set(), path)
+    await archive_terminated(TestSessionLocal)
+    with pytest.raises(SnapshotError, match="stale"):
+        await load_snapshot(store, get_test_shard_set(), path, MAX_BYTES)
+
+    # A snapshot written after the archiving keeps the archived components
+    await store.warm(get_test_shard_set(), MAX_BYTES)
+    await write_snapshot(store, get_test_shard_set(), path)
+    await load_snapshot(store, get_test_shard_set(), path, MAX_BYTES)
+    assert store.get("SNAP002").archived == {"energy_supply"}
+    assert store.get("SNAP001") is None
+
+    await async_client.patch("/contract/SNAP002", json={"remove": ["battery_optimization"]})
+    with pytest.raises(SnapshotError, match="stale"):
+        await load_snapshot(store, get_test_shard_set(), path, MAX_BYTES)
+
+
+# Test: Contracts with many components fit in the snapshot
+@pytest.mark.asyncio
+async def test_snapshot_wide_contract(async_client, store, path):
+    """Test that 300 components and archived components past the eighth round-trip."""
+    components = [f"component_{index}" for index in range(300)]
+    store.put_contract("WIDE001", components)
+    store.mark_archived("WIDE001", {"component_0", "component_8", "component_299"})
+    store.apply_event("WIDE001", "component_299", "component_start", date(2024, 1, 1), datetime(2024, 1, 1, 10))
+    assert await write_snapshot(store, get_test_shard_set(), path)
+
+    store.clear()
+    await load_snapshot(store, get_test_shard_set(), path, MAX_BYTES)
+    state = store.get("WIDE001")
+    assert state.components == tuple(components)
+    assert state.archived == {"component_0", "component_8", "component_299"}
+    assert state.component("component_299").start == date(2024, 1, 1)
+
+
+# Test: Snapshots of one worker hold what the other workers wrote up to its stamps
+@pytest.mark.asyncio
+async def test_snapshot_covers_other_workers(async_client, store, path):
+    """Test that writes of another process below the stamps are applied before the snapshot is encoded."""
+    coherence = CacheCoherence(store, ContractFilter(), ChangeFeed(100))
+    await coherence.mark(get_test_shard_set())
+    await _contract(async_client, "SNAP001")
+    subprocess.run(
+        [sys.executable, "-c", OTHER_WORKER],
+        cwd=ROOT,
+        env={
+            **os.environ,
+            "PYTHONPATH": str(ROOT),
+            "LOG_LEVEL": "ERROR",
+            "ASYNC_DATABASE_URL": TEST_DATABASE_URL,
+            "CACHE_COHERENCE_INTERVAL_SECONDS": "0.5",
+        },
+        check=True,
+    )
+    assert store.get("SNAP003") is None
+    assert await write_snapshot(store, get_test_shard_set(), path, coherence)
+
+    store.clear()
+    info = await load_snapshot(store, get_test_shard_set(), path, MAX_BYTES)
+    assert info == (2, 0, 0)
+    assert store.get("SNAP003").component("energy_supply").start == date(2024, 1, 1)
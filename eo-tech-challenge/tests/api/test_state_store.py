@@ -0,0 +1,204 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+
+from app.archive.archiver import archive_terminated
+from app.config import settings
+from app.state.store import state_store
+from tests.conftest import TEST_DATABASE_URL, TestSessionLocal, get_test_shard_set
+
+# Every event rule test runs again, validated by the state store
+from tests.api.test_event import *  # noqa: F401,F403
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def store(async_client, tmp_path, monkeypatch):
+    """Warm the state store from the freshly emptied test database."""
+    monkeypatch.setattr(settings, "ARCHIVE_DIR", tmp_path)
+    await state_store.warm(get_test_shard_set(), settings.STATE_STORE_MAX_BYTES)
+    yield state_store
+    state_store.clear()
+
+
+def _event(event_type: str, event_date: str, created_at: str, contract_number: str = "STATE001") -> dict:
+    return {"type": event_type, "contract_number": contract_number, "date": event_date,
+            "created_at": created_at}
+
+
+async def _contract(async_client, contract_number: str = "STATE001") -> None:
+    await async_client.post(
+        "/contract/",
+        json={"contract_number": contract_number, "components": ["energy_supply", "battery_optimization"]},
+    )
+
+
+# Test: Accepted events and timelines skip the database reads
+@pytest.mark.asyncio
+async def test_store_serves_validation_and_timelines(async_client, count_queries, store):
+    """Test that an accepted event costs its insert only and a timeline no query at all."""
+    await _contract(async_client)
+    assert store.get("STATE001").components == ("energy_supply", "battery_optimization")
+
+    start = _event("supply_energy_start", "2024-01-01", "2024-01-01T10:00:00")
+    response, statements = await count_queries(async_client.post("/event", json=start))
+    assert response.json()["status"] == "accepted"
+    assert len(statements) == 1
+
+    response, statements = await count_queries(async_client.get("/STATE001/contract_timeline"))
+    assert len(statements) == 0
+    from_db = await async_client.get("/STATE001/contract_timeline", params={"full_history": "true"})
+    assert response.json() == from_db.json()
+    assert response.json()["components"]["energy_supply"] == {"start": "2024-01-01", "end": None}
+
+    # Unknown contracts are answered without asking the database
+    unknown = _event("supply_energy_start", "2024-01-01", "2024-01-01T10:00:00", "NOPE")
+    response, statements = await count_queries(async_client.post("/event", json=unknown))
+    assert response.json()["status"] == "rejected"
+    assert len(statements) == 0
+    assert (await async_client.get("/NOPE/contract_timeline")).status_code == 404
+
+
+# Test: Retries of accepted events are not rejected by the rules
+@pytest.mark.asyncio
+async def test_store_retry_after_termination(async_client):
+    """Test that a retried start is a duplicate, even once the component terminated."""
+    await _contract(async_client)
+    start = _event("supply_energy_start", "2024-01-01", "2024-01-01T10:00:00")
+    await async_client.post("/event", json=start)
+    await async_client.post("/event", json=_event("supply_energy_end", "2024-02-01", "2024-01-02T10:00:00"))
+
+    response = await async_client.post("/event", json=start)
+    assert response.json() == {"status": "accepted", "message": "Event processed successfully."}
+    restart = _event("supply_energy_start", "2024-01-05", "2024-01-03T10:00:00")
+    assert (await async_client.post("/event", json=restart)).json()["status"] == "rejected"
+
+
+# Test: Warming up from stored events and archive summaries
+@pytest.mark.asyncio
+async def test_store_warm_matches_database(async_client, store):
+    """Test that a warmed store gives the timelines the database gives."""
+    await _contract(async_client)
+    await _contract(async_client, "STATE002")
+    state_store.clear()
+    for event in (
+        _event("supply_energy_start", "2024-01-01", "2024-01-01T10:00:00"),
+        # Created earlier, so it does not replace the start above
+        _event("supply_energy_start", "2023-12-01", "2023-12-31T10:00:00"),
+        _event("supply_energy_end", "2024-03-01", "2024-01-02T10:00:00"),
+        _event("battery_optimization_start", "2024-02-01", "2024-01-03T10:00:00"),
+        _event("battery_optimization_start", "2024-02-01", "2024-01-03T10:00:00", "STATE002"),
+    ):
+        assert (await async_client.post("/event", json=event)).json()["status"] == "accepted"
+    await archive_terminated(TestSessionLocal)
+    numbers = ("STATE001", "STATE002")
+    expected = [(await async_client.get(f"/{number}/contract_timeline")).json() for number in numbers]
+
+    await store.warm(get_test_shard_set(), settings.STATE_STORE_MAX_BYTES)
+    assert len(store) == 2 and store.complete
+    assert store.get("STATE001").archived == {"energy_supply"}
+    assert [(await async_client.get(f"/{number}/contract_timeline")).json() for number in numbers] == expected
+    assert expected[0]["components"]["energy_supply"] == {"start": "2024-01-01", "end": "2024-03-01"}
+
+    # The archived end is still recognized as a duplicate
+    archived_end = _event("supply_energy_end", "2024-03-01", "2024-01-02T10:00:00")
+    assert (await async_client.post("/event", json=archived_end)).json()["status"] == "accepted"
+    history = (await async_client.get("/STATE001/history", params={"full_history": "true"})).json()
+    assert len(history["events"]) == 4
+
+
+# Test: Events archived by the CLI are recognized before the store learns of it
+@pytest.mark.asyncio
+async def test_store_retry_archived_by_other_process(async_client, store, tmp_path):
+    """Test that retries of events archived by another process stay duplicates."""
+    await _contract(async_client)
+    start = _event("supply_energy_start", "2024-01-01", "2024-01-01T10:00:00")
+    end = _event("supply_energy_end", "2024-03-01", "2024-01-02T10:00:00")
+    for event in (start, end):
+        assert (await async_client.post("/event", json=event)).json()["status"] == "accepted"
+    subprocess.run(
+        [sys.executable, "-m", "app.cli.archive"],
+        cwd=ROOT,
+        env={
+            **os.environ,
+            "PYTHONPATH": str(ROOT),
+            "LOG_LEVEL": "ERROR",
+            "ASYNC_DATABASE_URL": TEST_DATABASE_URL,
+            "ARCHIVE_DIR": str(tmp_path),
+        },
+        capture_output=True,
+        check=True,
+    )
+    assert store.get("STATE001").archived == frozenset()
+
+    # The end passes the rules, the start breaks them; both are retries
+    for event in (end, start):
+        assert (await async_client.post("/event", json=event)).json()["status"] == "accepted"
+    history = (await async_client.get("/STATE001/history", params={"full_history": "true"})).json()
+    assert len(history["events"]) == 2
+
+
+# Test: Memory cap
+@pytest.mark.asyncio
+async def test_store_memory_cap(async_client, store):
+    """Test that contracts beyond the cap are served from the database."""
+    await _contract(async_client)
+    per_contract = store.nbytes
+    assert 0 < per_contract < 1024
+
+    await store.warm(get_test_shard_set(), per_contract)
+    await _contract(async_client, "STATE002")
+    assert store.get("STATE002") is None and not store.complete
+
+    event = _event("battery_optimization_start", "2024-02-01", "2024-01-03T10:00:00", "STATE002")
+    assert (await async_client.post("/event", json=event)).json()["status"] == "accepted"
+    timeline = (await async_client.get("/STATE002/contract_timeline")).json()
+    assert timeline["components"]["battery_optimization"] == {"start": "2024-02-01", "end": None}
+
+
+# Test: Deleted contracts
+@pytest.mark.asyncio
+async def test_store_deleted_contract_falls_back(async_client, store):
+    """Test that a deleted and recreated contract is read from the database."""
+    await _contract(async_client)
+    await async_client.post("/event", json=_event("supply_energy_start", "2024-01-01", "2024-01-01T10:00:00"))
+    await async_client.delete("/contract/STATE001")
+    assert store.get("STATE001") is None
+    assert (await async_client.get("/STATE001/contract_timeline")).status_code == 404
+
+    await _contract(async_client)
+    assert store.get("STATE001") is None
+    timeline = (await async_client.get("/STATE001/contract_timeline")).json()
+    assert timeline["components"]["energy_supply"]["start"] == "2024-01-01"
+
+
+# Test: Component updates change the held contract in place
+@pytest.mark.asyncio
+async def test_store_component_updates(async_client, count_queries, store):
+    """Test that a PATCH checks removals in memory and loads only re-added components."""
+    await _contract(async_client)
+    for event in (
+        _event("supply_energy_start", "2024-01-01", "2024-01-01T10:00:00"),
+        _event("battery_optimization_start", "2024-01-01", "2024-01-01T10:00:00"),
+        _event("battery_optimization_end", "2024-02-01", "2024-02-01T10:00:00"),
+    ):
+        await async_client.post("/event", json=event)
+
+    response, statements = await count_queries(
+        async_client.patch("/contract/STATE001", json={"remove": ["energy_supply"]})
+    )
+    assert response.status_code == 409
+    assert len(statements) == 1
+
+    await async_client.patch("/contract/STATE001", json={"remove": ["battery_optimization"]})
+    assert store.get("STATE001").components == ("energy_supply",)
+    await async_client.patch("/contract/STATE001", json={"add": ["battery_optimization"]})
+    assert store.get("STATE001").component("battery_optimization").end.isoformat() == "2024-02-01"
+    from_store = await async_client.get("/STATE001/contract_timeline")
+    from_db = await async_client.get("/STATE001/contract_timeline", params={"full_history": "true"})
+    assert from_store.json() == from_db.json()
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from app.core import tracing
+
+
+@pytest.fixture
+def exporter():
+    """Collect spans in memory for the duration of a test."""
+    memory = tracing.InMemoryExporter()
+    tracing.set_exporter(memory)
+    yield memory
+    tracing.set_exporter(None)
+
+
+# Test: Accepted event produces the full span tree
+@pytest.mark.asyncio
+async def test_event_creation_span_tree(async_client, exporter):
+    """Test that router, service, CRUD and DB spans share one trace."""
+    await async_client.post("/contract/", json={
+        "contract_number": "TRACE001",
+        "components": ["energy_supply"],
+    })
+    exporter.spans.clear()
+
+    response = await async_client.post("/event", json={
+        "type": "supply_energy_start",
+        "contract_number": "TRACE001",
+        "date": "2024-02-01",
+        "created_at": "2024-02-01T10:00:00",
+    })
+    assert response.json()["status"] == "accepted"
+
+    spans = {span.span_id: span for span in exporter.spans}
+    by_name = {span.name: span for span in exporter.spans}
+    root = by_name["POST /event"]
+    assert response.headers["x-trace-id"] == root.trace_id
+    assert all(span.trace_id == root.trace_id for span in exporter.spans)
+
+    def parent_name(name):
+        return spans[by_name[name].parent_id].name
+
+    assert parent_name("handle_event_creation") == "POST /event"
+    assert parent_name("get_contract") == "handle_event_creation"
+    assert parent_name("get_events_for_contract") == "handle_event_creation"
+    assert parent_name("build_timeline") == "handle_event_creation"
+    assert parent_name("create_event") == "handle_event_creation"
+    assert by_name["get_events_for_contract"].attributes["rows"] == 0
+
+    db_spans = [span for span in exporter.spans if span.name == "db"]
+    assert {spans[span.parent_id].name for span in db_spans} >= {
+        "get_contract", "get_events_for_contract", "create_event"
+    }
+    inserts = [span for span in db_spans if span.attributes["kind"] == "INSERT"]
+    assert inserts[0].attributes["rowcount"] == 1
+
+
+# Test: Incoming traceparent header continues the caller's trace
+@pytest.mark.asyncio
+async def test_traceparent_is_continued(async_client, exporter):
+    """Test that the root span joins the trace from the traceparent header."""
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    await async_client.get(
+        "/", headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"}
+    )
+    root = exporter.spans[-1]
+    assert root.trace_id == trace_id
+    assert root.parent_id == "00f067aa0ba902b7"
+
+
+# Test: Nothing is recorded while tracing is disabled
+@pytest.mark.asyncio
+async def test_tracing_disabled_records_nothing(async_client):
+    """Test that no trace header is returned when tracing is off."""
+    response = await async_client.get("/")
+    assert "x-trace-id" not in response.headers
+
+
+# Test: JSON lines exporter writes one span per line
+def test_json_lines_exporter(tmp_path):
+    """Test that spans are appended to the JSON lines file."""
+    path = tmp_path / "traces.jsonl"
+    tracing.set_exporter(tracing.JsonLinesExporter(path))
+    try:
+        with tracing.start_span("outer", contract_number="1234"):
+            with tracing.start_span("inner"):
+                pass
+    finally:
+        tracing.set_exporter(None)
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["inner", "outer"]
+    assert lines[0]["parent_id"] == lines[1]["span_id"]
+    assert lines[1]["attributes"] == {"contract_number": "1234"}
@@ -0,0 +1,79 @@
+import pytest
+
+from benchmarks.compare import compare
+from benchmarks.run import SuiteConfig, percentile, run_suite
+from benchmarks.workload import WorkloadConfig, generate_workload, request_body
+
+
+# Test: Workload generation is deterministic for a seed
+def test_workload_is_deterministic():
+    """Test that the same seed yields the same workload."""
+    config = WorkloadConfig(contracts=5, events_per_contract=10, seed=42)
+    assert generate_workload(config) == generate_workload(config)
+
+
+# Test: Violation rate controls the share of rejected events
+def test_workload_violation_rate():
+    """Test that no events are expected to be rejected at a zero violation rate."""
+    clean = generate_workload(WorkloadConfig(contracts=10, events_per_contract=20, violation_rate=0.0))
+    assert {event["expected"] for event in clean.events} == {"accepted"}
+
+    dirty = generate_workload(WorkloadConfig(contracts=10, events_per_contract=20, violation_rate=0.5))
+    rejected = sum(event["expected"] == "rejected" for event in dirty.events)
+    assert 0.3 < rejected / len(dirty.events) < 0.6
+
+
+# Test: Expected verdicts match the API
+@pytest.mark.asyncio
+async def test_workload_verdicts_match_api(async_client):
+    """Test that replaying a workload yields exactly the generated verdicts."""
+    workload = generate_workload(
+        WorkloadConfig(contracts=5, events_per_contract=15, violation_rate=0.3, seed=7)
+    )
+    for contract in workload.contracts:
+        await async_client.post("/contract/", json=contract)
+
+    for event in workload.events:
+        response = await async_client.post("/event", json=request_body(event))
+        assert response.json()["status"] == event["expected"], event
+
+
+# Test: The suite runs end to end and reports every benchmark
+@pytest.mark.asyncio
+async def test_suite_smoke():
+    """Test that a tiny suite run produces all result sections."""
+    config = SuiteConfig(
+        contracts=3,
+        events_per_contract=5,
+        batch_size=4,
+        history_lengths=[2, 5],
+        timeline_contracts=2,
+        timeline_reads=4,
+        startup_runs=1,
+    )
+    report = await run_suite(config)
+
+    results = report["results"]
+    assert results["single_ingest"]["verdict_mismatches"] == 0
+    assert results["batch_ingest"]["verdict_mismatches"] == 0
+    assert results["rejection"]["verdict_mismatches"] == 0
+    assert results["rejection"]["sessions_opened"] == 0
+    assert set(results["timeline_read"]) == {"2", "5"}
+    assert results["memory"]["bytes_per_contract"] > 0
+    assert results["startup"]["time_to_first_request_ms"] > results["startup"]["import_ms"] > 0
+    assert results["startup"]["slowest_imports"][0]["module"] == "app.main"
+    assert report["meta"]["config"]["contracts"] == 3
+
+
+# Test: Percentiles and comparisons
+def test_percentile_and_compare():
+    """Test nearest-rank percentiles and the result comparison rows."""
+    samples = list(range(1, 101))
+    assert percentile(samples, 50) == 50
+    assert percentile(samples, 99) == 99
+
+    rows = compare(
+        {"results": {"a": {"b": 10}, "c": 1}},
+        {"results": {"a": {"b": 15}, "d": 2}},
+    )
+    assert rows == [("a.b", 10, 15, 50.0), ("c", 1, None, None), ("d", None, 2, None)]
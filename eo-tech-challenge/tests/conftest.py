@@ -1,17 +1,21 @@
 from typing import AsyncGenerator
 
+import pytest
 import pytest_asyncio
 from _pytest.monkeypatch import MonkeyPatch
 from httpx import AsyncClient, ASGITransport
 from sqlalchemy import delete
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
+from app.core.db_instrumentation import capture_statements, instrument_engine
 from app.main import app
-from app.db.models import Base, Contract, Event
+from app.db.models import ArchivedEventKey, Base, Contract, ContractChange, Event, EventLogState, ImportJob, ImportJobResult
+from app.db.sharding import ShardSet
 
 # Use a separate test database
 TEST_DATABASE_URL = "sqlite+aiosqlite:///./test_eo_tech_challenge_async.db"
 test_engine = create_async_engine(TEST_DATABASE_URL, echo=False)
+instrument_engine(test_engine)
 
 
 @pytest_asyncio.fixture(scope="session", autouse=True)
@@ -26,30 +30,48 @@ async def setup_test_database():
         await conn.run_sync(Base.metadata.drop_all)
 
 
+TestSessionLocal = async_sessionmaker(
+    bind=test_engine,
+    expire_on_commit=False,
+    autoflush=False,
+    autocommit=False,
+)
+
+
 async def get_test_session() -> AsyncSession:
     """Override the database session to use test database."""
-    from sqlalchemy.ext.asyncio import async_sessionmaker
-    TestSessionLocal = async_sessionmaker(
-        bind=test_engine,
-        expire_on_commit=False,
-        autoflush=False,
-        autocommit=False,
-    )
     async with TestSessionLocal() as session:
         yield session
 
 
+def get_test_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Override the session factory used by background work."""
+    return TestSessionLocal
+
+
+def get_test_shard_set() -> ShardSet:
+    """Override the shards used by fleet-wide queries."""
+    return ShardSet([test_engine])
+
+
 @pytest_asyncio.fixture
 async def async_client():
     """Provide an async HTTP client with clean database before each test."""
     # Delete all data before each test (fast - keeps tables, deletes data only)
     async with test_engine.begin() as conn:
         await conn.execute(delete(Event))
+        await conn.execute(delete(ArchivedEventKey))
         await conn.execute(delete(Contract))
+        await conn.execute(delete(ImportJobResult))
+        await conn.execute(delete(ImportJob))
+        await conn.execute(delete(EventLogState))
+        await conn.execute(delete(ContractChange))
 
     # Override the database dependency to use test database
-    from app.db.session import get_async_session
+    from app.db.session import get_async_session, get_session_factory, get_shard_set
     app.dependency_overrides[get_async_session] = get_test_session
+    app.dependency_overrides[get_session_factory] = get_test_session_factory
+    app.dependency_overrides[get_shard_set] = get_test_shard_set
 
     # Create test client
     transport = ASGITransport(app=app)
@@ -58,3 +80,18 @@ async def async_client():
 
     # Clean up dependency override
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def count_queries():
+    """
+    Return a helper awaiting a request and returning (response, statements).
+
+    Only statements executed while the request runs are recorded.
+    """
+    async def run(request):
+        with capture_statements() as statements:
+            response = await request
+        return response, statements
+
+    return run
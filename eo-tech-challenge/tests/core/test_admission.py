@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from app.core.admission import AdmissionController, AdmissionRejected, admission_controller
+
+
+def _controller(**overrides) -> AdmissionController:
+    options = dict(
+        initial_limit=2, min_limit=1, max_limit=8, queue_size=2, queue_timeout=0.05, latency_tolerance=2.0
+    )
+    return AdmissionController(**{**options, **overrides})
+
+
+async def _rejection(controller: AdmissionController, client: str) -> AdmissionRejected:
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await controller.acquire(client)
+    return exc_info.value
+
+
+# Test: Slots, queue and shedding
+@pytest.mark.asyncio
+async def test_limit_queue_and_shedding():
+    """Test that requests beyond the limit queue briefly and are shed once the queue is full."""
+    controller = _controller()
+    await controller.acquire("a")
+    await controller.acquire("b")
+    assert controller.in_flight == 2
+
+    waiting = [asyncio.create_task(controller.acquire(client)) for client in ("c", "d")]
+    await asyncio.sleep(0)
+    assert controller.queued == 2
+    rejected = await _rejection(controller, "e")
+    assert (rejected.status_code, rejected.reason) == (503, "queue_full")
+    assert rejected.retry_after >= 1
+
+    # Slots are handed to the queue in order
+    controller.release("a")
+    await waiting[0]
+    assert not waiting[1].done()
+
+    # The second one waits too long
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await waiting[1]
+    assert exc_info.value.reason == "queue_timeout"
+    assert (controller.in_flight, controller.queued) == (2, 0)
+
+
+# Test: Fair share while saturated
+@pytest.mark.asyncio
+async def test_noisy_client_gets_429():
+    """Test that a client holding its share is refused while other clients still queue."""
+    controller = _controller(initial_limit=4, queue_size=4, queue_timeout=1.0)
+    for _ in range(4):
+        await controller.acquire("noisy")
+
+    # Alone, a client may use every slot; with a second client its share is two
+    quiet = asyncio.create_task(controller.acquire("quiet"))
+    await asyncio.sleep(0)
+    rejected = await _rejection(controller, "noisy")
+    assert (rejected.status_code, rejected.reason) == (429, "client_quota")
+
+    controller.release("noisy")
+    await quiet
+    assert controller.in_flight == 4
+
+
+# Test: The limit follows latency
+def test_limit_adapts_to_latency():
+    """Test that the limit shrinks while latency is high and grows back while it is normal."""
+    controller = _controller(initial_limit=4, min_limit=2, max_limit=8)
+    controller.in_flight = 4
+
+    def complete(latency: float, times: int) -> None:
+        for _ in range(times):
+            controller._observe(latency)
+
+    complete(0.005, 20)
+    assert controller.capacity > 4
+
+    complete(0.100, 200)
+    assert controller.capacity == 2
+
+    complete(0.005, 400)
+    assert controller.capacity > 2
+
+
+# Test: Saturated ingest endpoints answer immediately
+@pytest.mark.asyncio
+async def test_middleware_sheds_ingest_only(async_client, monkeypatch):
+    """Test that a saturated controller sheds POST /event with Retry-After and leaves reads alone."""
+    monkeypatch.setattr(admission_controller, "queue_size", 0)
+    holders = admission_controller.capacity
+    for _ in range(holders):
+        await admission_controller.acquire("other")
+    try:
+        event = {"type": "supply_energy_start", "contract_number": "ADM001", "date": "2024-01-01",
+                 "created_at": "2024-01-01T10:00:00"}
+        response = await async_client.post("/event", json=event)
+        assert response.status_code == 503
+        assert int(response.headers["retry-after"]) >= 1
+
+        response = await async_client.post("/event", json=event, headers={"X-Client-Id": "other"})
+        assert response.status_code == 429
+
+        assert (await async_client.get("/events")).status_code == 200
+    finally:
+        for _ in range(holders):
+            admission_controller.release("other")
+
+    response = await async_client.post("/event", json=event)
+    assert response.status_code == 200
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from app.core import capture
+from app.core.capture import CaptureWriter
+from benchmarks.replay import build_report, read_capture, replay
+
+EVENTS = [
+    {"type": "supply_energy_start", "contract_number": "CAP001", "date": "2024-01-01",
+     "created_at": "2024-01-01T10:00:00"},
+    {"type": "supply_energy_end", "contract_number": "CAP001", "date": "2023-01-01",
+     "created_at": "2024-02-01T10:00:00"},
+]
+
+
+async def _capture_traffic(async_client, path):
+    capture.set_writer(CaptureWriter(path, max_bytes=1 << 20))
+    try:
+        await async_client.post(
+            "/contract/",
+            json={"contract_number": "CAP001", "components": ["energy_supply"]},
+            headers={"Authorization": "Bearer secret", "X-Client-Id": "producer-1"},
+        )
+        for event in EVENTS:
+            await async_client.post("/event", json=event)
+        await async_client.get("/CAP001/contract_timeline")
+        await async_client.get("/metrics")
+    finally:
+        capture.set_writer(None)
+
+
+# Test: Captured requests are sanitized
+@pytest.mark.asyncio
+async def test_capture_records_sanitized_requests(async_client, tmp_path):
+    """Test that captures keep bodies, status and timing but drop unlisted headers and operational routes."""
+    path = tmp_path / "capture.ndjson"
+    await _capture_traffic(async_client, path)
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(record["method"], record["route"]) for record in records] == [
+        ("POST", "/contract/"),
+        ("POST", "/event"),
+        ("POST", "/event"),
+        ("GET", "/{contract_number}/contract_timeline"),
+    ]
+    first = records[0]
+    assert first["headers"] == {"content-type": "application/json", "x-client-id": "producer-1"}
+    assert json.loads(first["body"])["contract_number"] == "CAP001"
+    assert first["status"] == 201
+    assert json.loads(records[2]["response"])["status"] == "rejected"
+    assert all(record["duration_ms"] >= 0 for record in records)
+
+
+# Test: Replaying a capture reports divergences
+@pytest.mark.asyncio
+async def test_replay_reports_divergences(async_client, tmp_path):
+    """Test that a replay on the captured state matches, and one on changed state diverges."""
+    path = tmp_path / "capture.ndjson"
+    await _capture_traffic(async_client, path)
+    await async_client.delete("/contract/CAP001")
+    records, skipped = read_capture(path)
+
+    outcomes, elapsed = await replay(async_client, records, speed=0, concurrency=1)
+    report = build_report(outcomes, elapsed, skipped, speed=0)
+    assert (report["requests"], report["skipped"], report["errors"]) == (4, 0, 0)
+    assert (report["status_divergences"], report["verdict_divergences"]) == (0, 0)
+    assert report["routes"]["POST /event"]["latency"]["count"] == 2
+    assert report["latency"]["p99_ms"] >= report["latency"]["p50_ms"]
+
+    # Without the contract the timeline is gone; a captured verdict that differs is reported too
+    await async_client.delete("/contract/CAP001")
+    records[1][1]["response"] = json.dumps({"status": "rejected", "message": "Contract CAP001 not found."})
+    outcomes, elapsed = await replay(async_client, records[1:], speed=0, concurrency=2)
+    report = build_report(outcomes, elapsed, skipped, speed=0)
+    assert (report["status_divergences"], report["verdict_divergences"]) == (1, 1)
+    assert [divergence["request"] for divergence in report["divergences"]] == [
+        "POST /event",
+        "GET /CAP001/contract_timeline",
+    ]
+    assert report["divergences"][0]["replayed"] == {"status": 200, "verdicts": ["accepted"]}
@@ -0,0 +1,49 @@
+import pytest
+from loguru import logger
+
+from app.core import logging as app_logging
+
+
+@pytest.fixture
+def records():
+    """Collect emitted loguru records in a list."""
+    collected = []
+    handler_id = logger.add(lambda message: collected.append(message.record), level="INFO")
+    yield collected
+    logger.remove(handler_id)
+
+
+# Test: Structured fields are attached to the record instead of the message
+def test_info_sampled_keeps_structured_fields(records, monkeypatch):
+    """Test that keyword fields are exposed in the record's extra dict."""
+    monkeypatch.setattr(app_logging, "_info_sample_rate", 1.0)
+
+    app_logging.info_sampled("Event accepted", contract_number="1234", verdict="accepted")
+
+    assert len(records) == 1
+    assert records[0]["message"] == "Event accepted"
+    assert records[0]["extra"] == {"contract_number": "1234", "verdict": "accepted"}
+    assert records[0]["function"] == "test_info_sampled_keeps_structured_fields"
+
+
+# Test: Sampling drops records before they reach loguru
+def test_info_sampled_drops_records_when_rate_is_zero(records, monkeypatch):
+    """Test that a zero sample rate emits nothing."""
+    monkeypatch.setattr(app_logging, "_info_sample_rate", 0.0)
+
+    for _ in range(100):
+        app_logging.info_sampled("Event accepted", contract_number="1234")
+
+    assert records == []
+
+
+# Test: Partial sampling keeps roughly the configured fraction
+def test_info_sampled_partial_rate(records, monkeypatch):
+    """Test that a 0.5 sample rate keeps about half of the records."""
+    monkeypatch.setattr(app_logging, "_info_sample_rate", 0.5)
+    monkeypatch.setattr(app_logging.random, "random", iter([0.1, 0.9] * 50).__next__)
+
+    for _ in range(100):
+        app_logging.info_sampled("Event accepted")
+
+    assert len(records) == 50
@@ -0,0 +1,61 @@
+import pytest
+
+from app.config import settings
+from app.core.memory import sample_memory, start_tracemalloc, stop_tracemalloc
+from app.core.metrics import HISTORY_LOADS_OVERSIZED, MEMORY_RSS, MEMORY_STRUCTURE_ITEMS
+
+
+# Test: The memory endpoint reports RSS, structures and allocation sites
+@pytest.mark.asyncio
+async def test_memory_endpoint(async_client, monkeypatch):
+    """Test that /debug/memory is gated and reports sizes, top sites and diffs between calls."""
+    assert (await async_client.get("/debug/memory")).status_code == 404
+    monkeypatch.setattr(settings, "MEMORY_DIAGNOSTICS_ENABLED", True)
+
+    report = (await async_client.get("/debug/memory")).json()
+    assert report["rss_bytes"] > 0
+    assert {"state_store", "contract_filter", "change_feed", "admission_queue"} <= report["structures"].keys()
+    assert report["tracemalloc"] is None
+
+    start_tracemalloc(5)
+    try:
+        first = (await async_client.get("/debug/memory", params={"top": 3, "diff": True})).json()
+        retained = [bytearray(1024) for _ in range(100)]
+        second = (await async_client.get("/debug/memory", params={"top": 3, "diff": True})).json()
+    finally:
+        stop_tracemalloc()
+    assert len(first["tracemalloc"]["top"]) == 3
+    assert first["tracemalloc"]["diff"] is None
+    assert any(entry["bytes_diff"] >= 100 * 1024 for entry in second["tracemalloc"]["diff"])
+    assert len(retained) == 100
+
+
+# Test: The sampler exports memory metrics
+def test_sample_memory_sets_gauges():
+    """Test that a sample sets the RSS and structure gauges."""
+    sample_memory()
+    assert MEMORY_RSS.value() > 0
+    assert MEMORY_STRUCTURE_ITEMS.value("change_feed") >= 0
+
+
+# Test: Oversized history listings are cut to the newest events
+@pytest.mark.asyncio
+async def test_history_load_guard(async_client, monkeypatch):
+    """Test that listings keep the newest events and timelines still see every event."""
+    monkeypatch.setattr(settings, "HISTORY_LOAD_MAX_EVENTS", 2)
+    await async_client.post("/contract/", json={"contract_number": "MEM001", "components": ["energy_supply"]})
+    for event_type, day in (("supply_energy_start", "2024-01-01"), ("supply_energy_end", "2024-02-01"),
+                            ("supply_energy_end", "2024-03-01")):
+        await async_client.post("/event", json={"type": event_type, "contract_number": "MEM001", "date": day,
+                                                "created_at": f"{day}T10:00:00"})
+    truncated = HISTORY_LOADS_OVERSIZED.value("truncated")
+    logged = HISTORY_LOADS_OVERSIZED.value("logged")
+
+    history = (await async_client.get("/MEM001/history")).json()
+    assert history["truncated"] is True
+    assert [event["date"] for event in history["events"]] == ["2024-02-01", "2024-03-01"]
+    assert HISTORY_LOADS_OVERSIZED.value("truncated") == truncated + 1
+
+    timeline = (await async_client.get("/MEM001/contract_timeline")).json()
+    assert timeline["components"]["energy_supply"] == {"start": "2024-01-01", "end": "2024-03-01"}
+    assert HISTORY_LOADS_OVERSIZED.value("logged") == logged + 1
@@ -0,0 +1,35 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def _modules_after_import(**env: str) -> set[str]:
+    result = subprocess.run(
+        [sys.executable, "-c", "import json, sys, app.main; print(json.dumps(sorted(sys.modules)))"],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONPATH": str(ROOT), "LOG_LEVEL": "ERROR", **env},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(json.loads(result.stdout.splitlines()[-1]))
+
+
+# Test: Startup does not import what the first request does not need
+def test_startup_defers_unneeded_imports():
+    """Test that tools and single-shard-irrelevant modules stay unimported."""
+    modules = _modules_after_import(DB_SHARD_COUNT="1")
+    assert "app.main" in modules
+    deferred = {
+        "sqlalchemy.ext.horizontal_shard",
+        "app.archive.archiver",
+        "app.cli.archive",
+        "app.cli.migrate",
+        "app.cli.rebalance",
+        "benchmarks",
+    }
+    assert not deferred & modules
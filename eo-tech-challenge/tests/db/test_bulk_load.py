@@ -0,0 +1,98 @@
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+from app.cli.load import SECONDARY_INDEXES, load
+from benchmarks.workload import WorkloadConfig, generate_workload, request_body
+from tests.conftest import TEST_DATABASE_URL
+
+
+def _write_lines(path, items):
+    path.write_text("".join(json.dumps(item) + "\n" for item in items))
+    return path
+
+
+def _database():
+    return sqlite3.connect(TEST_DATABASE_URL.split("///", 1)[1])
+
+
+# Test: The loader gives the verdicts of the API
+@pytest.mark.asyncio
+async def test_load_matches_api_rules(async_client, tmp_path):
+    """Test that a loaded workload keeps exactly the events the API would accept."""
+    workload = generate_workload(
+        WorkloadConfig(contracts=6, events_per_contract=15, violation_rate=0.3, seed=3)
+    )
+    contracts = _write_lines(tmp_path / "contracts.ndjson", workload.contracts)
+    malformed = [
+        {"type": "unknown_event", "contract_number": "BENCH000000", "date": "2024-01-01",
+         "created_at": "2024-01-01T10:00:00"},
+        {"type": "supply_energy_start", "contract_number": "NOPE", "date": "2024-01-01",
+         "created_at": "2024-01-01T10:00:00"},
+    ]
+    events = _write_lines(tmp_path / "events.ndjson", [request_body(e) for e in workload.events] + malformed)
+    rejected_path = tmp_path / "rejected.ndjson"
+
+    report = await asyncio.to_thread(
+        load, [events], contracts, [TEST_DATABASE_URL], workers=2, chunk_size=7,
+        drop_indexes=True, rejected=rejected_path,
+    )
+
+    expected = sum(event["expected"] == "accepted" for event in workload.events)
+    assert report.contracts == len(workload.contracts)
+    assert (report.accepted, report.duplicates) == (expected, 0)
+    assert report.rejected == len(workload.events) - expected + len(malformed)
+    messages = [json.loads(line)["message"] for line in rejected_path.read_text().splitlines()]
+    assert {"Invalid event type: unknown_event", "Contract NOPE not found."} <= set(messages)
+
+    with _database() as db:
+        sequences = [row[0] for row in db.execute("SELECT sequence FROM event ORDER BY rowid")]
+        indexes = {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert sequences == list(range(1, expected + 1))
+    assert {index.name for index in SECONDARY_INDEXES} <= indexes
+
+    # The API reads what the loader wrote and sees the same timeline rules
+    response = await async_client.get("/events", params={"limit": 10000})
+    assert len(response.json()["events"]) == expected
+    first = workload.contracts[0]["contract_number"]
+    assert (await async_client.get(f"/{first}/contract_timeline")).status_code == 200
+
+    # Accepted events loaded again are duplicates
+    accepted = _write_lines(
+        tmp_path / "accepted.ndjson",
+        [request_body(e) for e in workload.events if e["expected"] == "accepted"],
+    )
+    again = await asyncio.to_thread(load, [accepted], None, [TEST_DATABASE_URL], chunk_size=50)
+    assert (again.accepted, again.duplicates) == (0, expected)
+
+
+# Test: A reused idempotency key does not change the state
+@pytest.mark.asyncio
+async def test_load_rejects_reused_key_before_rules(async_client, tmp_path):
+    """Test that an event reusing a key is refused without moving the timeline the next events are judged against."""
+    contracts = _write_lines(
+        tmp_path / "contracts.ndjson", [{"contract_number": "LOAD001", "components": ["energy_supply"]}]
+    )
+    events = _write_lines(
+        tmp_path / "events.ndjson",
+        [
+            {"type": "supply_energy_start", "contract_number": "LOAD001", "date": "2024-01-01",
+             "created_at": "2024-01-01T10:00:00", "idempotency_key": "K1"},
+            {"type": "supply_energy_start", "contract_number": "LOAD001", "date": "2024-06-01",
+             "created_at": "2024-06-01T10:00:00", "idempotency_key": "K1"},
+            {"type": "supply_energy_end", "contract_number": "LOAD001", "date": "2024-03-01",
+             "created_at": "2024-03-01T10:00:00"},
+        ],
+    )
+    rejected_path = tmp_path / "rejected.ndjson"
+
+    report = await asyncio.to_thread(load, [events], contracts, [TEST_DATABASE_URL], rejected=rejected_path)
+
+    assert (report.accepted, report.rejected, report.duplicates) == (2, 1, 0)
+    rejection = json.loads(rejected_path.read_text())
+    assert rejection["line"] == 2
+    assert rejection["message"] == "Idempotency key 'K1' was already used for a different event."
+    timeline = (await async_client.get("/LOAD001/contract_timeline")).json()
+    assert timeline["components"]["energy_supply"] == {"start": "2024-01-01", "end": "2024-03-01"}
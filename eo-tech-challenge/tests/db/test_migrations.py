@@ -0,0 +1,122 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.migrations import (
+    LATEST_VERSION,
+    SchemaVersionError,
+    check_schema,
+    migrate,
+    schema_versions,
+)
+from app.db.sharding import ShardSet
+
+
+@pytest_asyncio.fixture
+async def shards(tmp_path):
+    shard_set = ShardSet(
+        [create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/shard{n}.db") for n in range(2)]
+    )
+    yield shard_set
+    await shard_set.dispose()
+
+
+async def _tables(engine) -> set[str]:
+    async with engine.connect() as conn:
+        return set(await conn.run_sync(lambda sync: inspect(sync).get_table_names()))
+
+
+async def _columns(engine, table: str) -> set[str]:
+    async with engine.connect() as conn:
+        columns = await conn.run_sync(lambda sync: inspect(sync).get_columns(table))
+    return {column["name"] for column in columns}
+
+
+# Test: Migrating empty databases
+@pytest.mark.asyncio
+async def test_migrate_fresh_databases(shards):
+    """Test that every shard reaches the latest version with its tables."""
+    assert await schema_versions(shards) == [0, 0]
+
+    applied = await migrate(shards)
+    assert applied[0] == list(range(1, LATEST_VERSION + 1))
+    assert await schema_versions(shards) == [LATEST_VERSION, LATEST_VERSION]
+    assert {"contract", "event", "import_job"} <= await _tables(shards.engines[0])
+    # Unsharded tables live on shard 0 only
+    assert "import_job" not in await _tables(shards.engines[1])
+
+    # Running again is a no-op
+    assert await migrate(shards) == {0: [], 1: []}
+
+
+# Test: Databases created before versioning
+@pytest.mark.asyncio
+async def test_migrate_legacy_database(shards):
+    """Test that columns added since the original schema are created."""
+    for engine in shards.engines:
+        async with engine.begin() as conn:
+            await conn.execute(text(
+                "CREATE TABLE contract (id CHAR(32) PRIMARY KEY, contract_number VARCHAR NOT NULL, "
+                "components JSON NOT NULL, created_at DATETIME NOT NULL)"
+            ))
+            await conn.execute(text(
+                "CREATE TABLE event (id CHAR(32) PRIMARY KEY, contract_number VARCHAR NOT NULL, "
+                "component_name VARCHAR NOT NULL, type VARCHAR NOT NULL, date DATE NOT NULL, "
+                "created_at DATETIME NOT NULL)"
+            ))
+
+    await migrate(shards)
+    assert {"idempotency_key", "payload_digest"} <= await _columns(shards.engines[1], "event")
+    assert "archive_summary" in await _columns(shards.engines[1], "contract")
+
+
+# Test: Startup schema check
+@pytest.mark.asyncio
+async def test_check_schema(shards):
+    """Test that startup refuses outdated schemas unless auto-migrating."""
+    with pytest.raises(SchemaVersionError, match="app.cli.migrate"):
+        await check_schema(shards)
+
+    await check_schema(shards, auto_migrate=True)
+    await check_schema(shards)
+
+    async with shards.engines[1].begin() as conn:
+        await conn.execute(text(
+            f"INSERT INTO schema_version VALUES ({LATEST_VERSION + 1}, 'future', '2030-01-01')"
+        ))
+    with pytest.raises(SchemaVersionError, match="newer"):
+        await check_schema(shards, auto_migrate=True)
+
+
+
+# Test: Existing events get event log sequences
+@pytest.mark.asyncio
+async def test_migrate_event_sequence_backfill(shards):
+    """Test that events stored before the event log are numbered and new ones follow."""
+    engine = shards.engines[0]
+    insert_event = (
+        "INSERT INTO event (id, contract_number, component_name, type, date, created_at) "
+        "VALUES ('{id}', 'LEGACY', 'energy_supply', 'supply_energy_start', '2024-01-01', "
+        "'2024-01-01 10:00:00')"
+    )
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "CREATE TABLE event (id CHAR(32) PRIMARY KEY, contract_number VARCHAR NOT NULL, "
+            "component_name VARCHAR NOT NULL, type VARCHAR NOT NULL, date DATE NOT NULL, "
+            "created_at DATETIME NOT NULL)"
+        ))
+        for n in range(3):
+            await conn.execute(text(insert_event.format(id=f"old{n}")))
+
+    await migrate(shards)
+    async with engine.begin() as conn:
+        await conn.execute(text(insert_event.format(id="new")))
+        sequences = (await conn.scalars(text("SELECT sequence FROM event ORDER BY rowid"))).all()
+        plan = " ".join(
+            row[-1] for row in await conn.execute(
+                text("EXPLAIN QUERY PLAN SELECT * FROM event WHERE sequence > 2 ORDER BY sequence")
+            )
+        )
+    assert sequences == [1, 2, 3, 4]
+    assert "ux_event_sequence" in plan
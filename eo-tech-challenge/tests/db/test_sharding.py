@@ -0,0 +1,162 @@
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.cli.rebalance import rebalance
+from app.core.db_instrumentation import instrument_engine
+from app.db.models import Base, Contract, Event
+from app.db.session import get_async_session, get_session_factory, get_shard_set
+from app.db.sharding import ShardSet
+from app.main import app
+
+CONTRACTS = [f"SHARD{index:03d}" for index in range(12)]
+
+
+def _shard_set(directory, count: int) -> ShardSet:
+    engines = [create_async_engine(f"sqlite+aiosqlite:///{directory}/shard{n}.db") for n in range(count)]
+    for engine in engines:
+        instrument_engine(engine)
+    return ShardSet(engines)
+
+
+@pytest_asyncio.fixture
+async def shards(tmp_path):
+    shard_set = _shard_set(tmp_path, 3)
+    await shard_set.create_all(Base.metadata)
+    yield shard_set
+    await shard_set.dispose()
+
+
+@pytest_asyncio.fixture
+async def sharded_client(shards):
+    """An API client whose sessions are routed over three shards."""
+    session_factory = shards.sessionmaker(expire_on_commit=False, autoflush=False)
+
+    async def get_sharded_session():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_session] = get_sharded_session
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+    app.dependency_overrides[get_shard_set] = lambda: shards
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.clear()
+
+
+async def _populate(client: AsyncClient) -> None:
+    for number in CONTRACTS:
+        await client.post("/contract/", json={"contract_number": number, "components": ["energy_supply"]})
+        response = await client.post(
+            "/event",
+            json={"type": "supply_energy_start", "contract_number": number,
+                  "date": "2024-02-01", "created_at": "2024-02-01T10:00:00"},
+        )
+        assert response.json()["status"] == "accepted"
+
+
+async def _numbers_per_shard(shard_set: ShardSet) -> list[set[str]]:
+    async def numbers(db):
+        contracts = set((await db.scalars(select(Contract.contract_number))).all())
+        events = set((await db.scalars(select(Event.contract_number))).all())
+        assert contracts == events
+        return contracts
+
+    return await shard_set.fan_out(numbers)
+
+
+# Test: Contracts and events are stored on the shard of their contract_number
+@pytest.mark.asyncio
+async def test_rows_are_routed_by_contract_number(sharded_client, shards):
+    """Test that every contract lives on exactly one shard, with its events."""
+    await _populate(sharded_client)
+
+    per_shard = await _numbers_per_shard(shards)
+    assert all(per_shard), "every shard should receive some contracts"
+    for shard, numbers in enumerate(per_shard):
+        assert all(shards.shard_for(number) == shard for number in numbers)
+    assert set().union(*per_shard) == set(CONTRACTS)
+
+
+# Test: Per-contract endpoints query a single shard
+@pytest.mark.asyncio
+async def test_per_contract_reads_hit_one_shard(sharded_client, count_queries):
+    """Test that routed reads run one statement each instead of one per shard."""
+    await _populate(sharded_client)
+
+    response, statements = await count_queries(sharded_client.get(f"/{CONTRACTS[0]}/contract_timeline"))
+    assert response.status_code == 200
+    assert len(statements) == 2
+
+    response, statements = await count_queries(sharded_client.get(f"/contract/{CONTRACTS[1]}"))
+    assert response.status_code == 200
+    assert len(statements) == 1
+
+
+# Test: Unrouted queries are merged across shards
+@pytest.mark.asyncio
+async def test_unrouted_query_reads_all_shards(sharded_client, shards):
+    """Test that a query without a contract_number returns rows of all shards."""
+    await _populate(sharded_client)
+
+    session_factory = shards.sessionmaker()
+    async with session_factory() as db:
+        numbers = (await db.scalars(select(Contract.contract_number))).all()
+    assert sorted(numbers) == CONTRACTS
+
+    counts = await shards.fan_out(lambda db: db.scalar(select(func.count()).select_from(Event)))
+    assert sum(counts) == len(CONTRACTS)
+
+
+# Test: Rebalancing moves contracts to their shard for a new shard count
+@pytest.mark.asyncio
+async def test_rebalance_to_more_shards(sharded_client, shards, tmp_path):
+    """Test that growing from 3 to 5 shards moves rows and keeps the API working."""
+    await _populate(sharded_client)
+
+    grown = _shard_set(tmp_path, 5)
+    try:
+        report = await rebalance(shards, grown)
+        assert report.contracts_scanned == len(CONTRACTS)
+        assert report.rows_moved == 2 * report.contracts_moved > 0
+
+        per_shard = await _numbers_per_shard(grown)
+        for shard, numbers in enumerate(per_shard):
+            assert all(grown.shard_for(number) == shard for number in numbers)
+        assert set().union(*per_shard) == set(CONTRACTS)
+
+        # Running it again finds nothing left to move
+        assert (await rebalance(grown, grown)).contracts_moved == 0
+    finally:
+        await grown.dispose()
+
+
+# Test: The event log pages over all shards with a position per shard
+@pytest.mark.asyncio
+async def test_event_log_across_shards(sharded_client, count_queries):
+    """Test that every event is listed once and the cursor tracks each shard."""
+    await _populate(sharded_client)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 5, **({"cursor": cursor} if cursor else {})}
+        response, statements = await count_queries(sharded_client.get("/events", params=params))
+        assert len(statements) == 3
+        page = response.json()
+        seen += page["events"]
+        cursor = page["cursor"]
+        if not page["has_more"]:
+            break
+
+    assert sorted(event["contract_number"] for event in seen) == CONTRACTS
+    assert len(cursor.split(".")) == 3
+    assert (await sharded_client.get("/events", params={"cursor": "1"})).status_code == 400
+
+    # A contract filter reads its own shard only
+    response, statements = await count_queries(
+        sharded_client.get("/events", params={"contract_number": "SHARD004"})
+    )
+    assert [event["contract_number"] for event in response.json()["events"]] == ["SHARD004"]
+    assert len(statements) == 1